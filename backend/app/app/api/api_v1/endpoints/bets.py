@@ -1,153 +1,124 @@
 import logging
-from datetime import datetime, timedelta, timezone
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app import schemas
+from app import crud, schemas
 from app.api import deps
-from app.core.config import settings
-from app.models.bet import Bet
-from app.models.race import Race
-from app.models.raceday_refresh_log import RaceDayRefreshLog
-from app.raceday.bet_strategy.bet_strategies import BetStrategyType, BetType
-from app.schemas.bet_result import (
-    BetGetResponse,
-    BetResultConverter,
-    BetsQueryResponse,
-    MultiBetResult,
-    SingleBetResult,
+from app.api.bet_facets import bet_facets_cache
+from app.api.bet_feed import bet_feed_snapshot_cache, etag_matches
+from app.api.bet_stream import BetFeedFilter, bet_feed_stream, parse_resume_token
+from app.crud.bet_facets import calc_next_refresh_ts
+from app.crud.bet_feed import (
+    DEFAULT_BET_STRAT_TYPES,
+    DEFAULT_BET_TYPES,
+    DEFAULT_TRACK_CODES,
+    bet_feed_slice_key,
+    build_bets_query_response,
 )
+from app.crud.crud_bet import BetCursorException
+from app.models.bet import Bet
+from app.schemas.bet_result import BetGetResponse, BetResultConverter
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# DEFAULT_TRACK_CODES = ["kee", "cd", "mrn"]
-DEFAULT_TRACK_CODES = []
-DEFAULT_BET_STRAT_TYPES = list(
-    map(
-        str,
-        [
-            BetStrategyType.BOOK_ALL_WIN_ARB,
-            BetStrategyType.BOOK_BOX_WIN_ARB,
-            BetStrategyType.BOOK_DR_Z_PLACE_SHOW_ARB,
-            BetStrategyType.BOOK_DR_Z_PLACE_BET,
-            BetStrategyType.BOOK_DR_Z_SHOW_BET,
-        ],
-    )
-)
-DEFAULT_BET_TYPES = list(
-    map(
-        str,
-        [
-            BetType.ALL_WIN_ARB,
-            BetType.BOX_WIN_ARB,
-            BetType.WIN_BET,
-            BetType.PLACE_BET,
-            BetType.SHOW_BET,
-            BetType.PLACE_SHOW_ARB,
-        ],
-    )
-)
-
 
 def get_next_refresh_ts(db: Session) -> int:
-    # Get the time to next refresh from the latest processor refresh log.
-    # It may be in the past depending on when the processor last ran;
-    # use the max sleep time in that case.
-    latest_refresh_log: Optional[RaceDayRefreshLog] = db.query(
-        RaceDayRefreshLog
-    ).order_by(RaceDayRefreshLog.next_check_time.desc()).first()
-
-    now = datetime.now(timezone.utc)
-
-    print(settings.EXPECTED_PROCESS_TIME_SECS)
-
-    if latest_refresh_log and latest_refresh_log.next_check_time >= now:
-        nct: datetime = latest_refresh_log.next_check_time
-        next_refresh_ts = int(nct.timestamp() * 1000)
-        # Add some time to account for the time to run the job
-        next_refresh_ts += settings.EXPECTED_PROCESS_TIME_SECS * 1000
-    else:
-        next_refresh_ts = int(
-            (now + timedelta(seconds=settings.MAX_SLEEP_TIME_SECS)).timestamp() * 1000
-        )
-
-    return next_refresh_ts
+    return calc_next_refresh_ts(bet_facets_cache.get(db).next_check_time)
 
 
 @router.get("/", response_model=schemas.BetsQueryResponse)
 @router.get("", response_model=schemas.BetsQueryResponse, include_in_schema=False)
 def read_bets(
+    request: Request,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     track_codes: List[str] = Query(default=DEFAULT_TRACK_CODES),
     bet_strat_types: List[str] = Query(default=DEFAULT_BET_STRAT_TYPES),
     bet_types: List[str] = Query(default=DEFAULT_BET_TYPES),
+    after: Optional[str] = None,
 ) -> Any:
     """
-    Retrieve items.
+    Retrieve bets, newest first.
+
+    Pass the `next_cursor` of a page as `after` to get the page after it;
+    unlike `skip`, cursors don't skip or repeat bets as new bets come in.
+
+    The default feed, and its per track and per strategy slices, are served
+    from the snapshots the processor publishes each cycle, with an `ETag`;
+    a matching `If-None-Match` gets a 304.
     """
-    all_bets_q = db.query(Bet).filter(Bet.parent_id == None)
+    facets = bet_facets_cache.get(db)
+    slice_key = bet_feed_slice_key(
+        skip=skip,
+        limit=limit,
+        after=after,
+        track_codes=track_codes,
+        bet_strat_types=bet_strat_types,
+        bet_types=bet_types,
+    )
+    snapshot = slice_key and bet_feed_snapshot_cache.get(db, facets, slice_key)
 
-    if len(bet_types) > 0:
-        print(bet_types)
-        all_bets_q = all_bets_q.filter(Bet.bet_type.in_(bet_types))
+    if snapshot:
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
 
-    if len(track_codes) > 0:
-        all_bets_q = all_bets_q.filter(Bet.race.has(Race.track_code.in_(track_codes)))
+        if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+            return Response(status_code=304, headers=headers)
 
-    if len(bet_strat_types) > 0:
-        all_bets_q = all_bets_q.filter(Bet.bet_strategy_type.in_(bet_strat_types))
+        return Response(
+            content=snapshot.body, media_type="application/json", headers=headers
+        )
 
-    all_bets: List[Bet] = all_bets_q.order_by(Bet.id.desc()).offset(skip).limit(
-        limit
-    ).all()
-    single_bets: List[SingleBetResult] = []
-    multi_bets: List[MultiBetResult] = []
-    bet_conv = BetResultConverter()
+    try:
+        return build_bets_query_response(
+            db,
+            facets,
+            skip=skip,
+            limit=limit,
+            after=after,
+            track_codes=track_codes,
+            bet_strat_types=bet_strat_types,
+            bet_types=bet_types,
+        )
+    except BetCursorException as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    for i, bet in enumerate(all_bets):
-        if i > limit - 1:
-            break
 
-        if bet.race:
-            single_bets.append(bet_conv.create_single_bet_result(bet))
-        else:
-            multi_bets.append(bet_conv.create_multi_bet_result(bet))
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_bets(
+    request: Request,
+    track_codes: List[str] = Query(default=DEFAULT_TRACK_CODES),
+    bet_strat_types: List[str] = Query(default=DEFAULT_BET_STRAT_TYPES),
+    bet_types: List[str] = Query(default=DEFAULT_BET_TYPES),
+    resume: Optional[str] = None,
+) -> Any:
+    """
+    Stream the changes to the bets made by each processor cycle, as
+    server-sent events, instead of polling for them.
+
+    Each `bets` event has the added and updated bets matching the filters,
+    and the ids of removed ones. Its id is the feed version; pass the
+    `feed_version` of GET /bets as `resume` to only get the changes since
+    then (reconnecting EventSources resume from their Last-Event-ID). A
+    `reset` event means the changes can't be resumed, and the bets should
+    be refetched.
+    """
+    bet_feed_stream.start()
 
-    result_track_codes = list(
-        set([bet.race.track_code for bet in all_bets if bet.race])
+    bet_filter = BetFeedFilter(
+        track_codes=track_codes, bet_strat_types=bet_strat_types, bet_types=bet_types
     )
-    result_bet_strat_types = list(set([bet.bet_strategy_type for bet in all_bets]))
-    result_bet_types = list(set([bet.bet_type for bet in all_bets]))
-
-    # TODO: Cache this (or make static)
-    all_track_codes = [
-        race.track_code for race in db.query(Race).distinct(Race.track_code).all()
-    ]
-    all_bet_strat_types = [
-        str(BetStrategyType[bet_strat_type.name]) for bet_strat_type in BetStrategyType
-    ]
-    all_bet_types = [str(BetType[bet_type.name]) for bet_type in BetType]
+    resume_token = request.headers.get("last-event-id") or resume
 
-    next_refresh_ts = get_next_refresh_ts(db)
-
-    return BetsQueryResponse(
-        single_bets=single_bets,
-        multi_bets=multi_bets,
-        track_codes=result_track_codes,
-        bet_strat_types=result_bet_strat_types,
-        bet_types=result_bet_types,
-        all_track_codes=all_track_codes,
-        all_bet_strat_types=all_bet_strat_types,
-        all_bet_types=all_bet_types,
-        limit=limit,
-        skip=skip,
-        next_refresh_ts=next_refresh_ts,
+    return StreamingResponse(
+        bet_feed_stream.listen(request, bet_filter, parse_resume_token(resume_token)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -156,7 +127,7 @@ def read_bet(*, db: Session = Depends(deps.get_db), id: int,) -> Any:
     """
     Get a bet by ID.
     """
-    bet: Bet = db.query(Bet).filter(Bet.id == id).first()
+    bet: Optional[Bet] = crud.bet.get(db, id=id)
 
     if not bet:
         raise HTTPException(status_code=404, detail="Bet not found")
@@ -0,0 +1,47 @@
+import logging
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.crud.bet_facets import BetFacets, build_bet_facets, get_latest_refresh_log_id
+
+logger = logging.getLogger(__name__)
+
+
+class BetFacetsCache:
+    """
+    In-process cache of the bet filter values, counts and refresh time, which
+    only change when the processor finishes a refresh.
+
+    Each lookup checks the latest RaceDayRefreshLog id (a primary key lookup)
+    and rebuilds the facets when a new log has landed since they were built,
+    whichever process wrote it.
+    """
+
+    def __init__(self) -> None:
+        self._facets: Optional[BetFacets] = None
+        self._lock = Lock()
+
+    def get(self, db: Session) -> BetFacets:
+        refresh_log_id = get_latest_refresh_log_id(db)
+        facets = self._facets
+
+        if facets is not None and facets.refresh_log_id == refresh_log_id:
+            return facets
+
+        with self._lock:
+            # Another request may have rebuilt them meanwhile
+            facets = self._facets
+
+            if facets is None or facets.refresh_log_id != refresh_log_id:
+                facets = self._facets = build_bet_facets(db, refresh_log_id)
+                logger.debug("Rebuilt bet facets for refresh log %s", refresh_log_id)
+
+        return facets
+
+    def invalidate(self) -> None:
+        self._facets = None
+
+
+bet_facets_cache = BetFacetsCache()
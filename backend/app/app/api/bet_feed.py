@@ -0,0 +1,102 @@
+import logging
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.crud.bet_facets import BetFacets
+from app.models.bet_feed_snapshot import BetFeedSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class CachedBetFeedSnapshot(BaseModel):
+    etag: str
+    body: bytes
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    etag = etag[2:] if etag.startswith("W/") else etag
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        candidate = candidate[2:] if candidate.startswith("W/") else candidate
+
+        if candidate == etag:
+            return True
+
+    return False
+
+
+class BetFeedSnapshotCache:
+    """
+    In-process copy of the bet feed snapshots of the latest processor cycle,
+    loaded (in one query) the first time they're asked for.
+
+    Snapshots aren't served once the refresh time they were built with has
+    passed, as it would then be stale; nor when the latest cycle hasn't
+    published any (yet), which is retried on the next lookup.
+    """
+
+    def __init__(self) -> None:
+        self._refresh_log_id: Optional[int] = None
+        self._snapshots: Dict[str, CachedBetFeedSnapshot] = {}
+        self._lock = Lock()
+
+    def get(
+        self, db: Session, facets: BetFacets, slice_key: str
+    ) -> Optional[CachedBetFeedSnapshot]:
+        refresh_log_id = facets.refresh_log_id
+
+        if refresh_log_id is None:
+            return None
+
+        now = datetime.now(timezone.utc)
+
+        if facets.next_check_time is None or facets.next_check_time < now:
+            return None
+
+        if self._refresh_log_id != refresh_log_id:
+            with self._lock:
+                if self._refresh_log_id != refresh_log_id:
+                    self._load(db, refresh_log_id)
+
+        if self._refresh_log_id != refresh_log_id:
+            return None
+
+        return self._snapshots.get(slice_key)
+
+    def _load(self, db: Session, refresh_log_id: int) -> None:
+        rows = (
+            db.query(
+                BetFeedSnapshot.slice_key, BetFeedSnapshot.etag, BetFeedSnapshot.body
+            )
+            .filter(BetFeedSnapshot.refresh_log_id == refresh_log_id)
+            .all()
+        )
+
+        if len(rows) < 1:
+            return
+
+        self._snapshots = {
+            slice_key: CachedBetFeedSnapshot(etag=etag, body=body)
+            for (slice_key, etag, body) in rows
+        }
+        self._refresh_log_id = refresh_log_id
+        logger.debug("Loaded bet feed snapshots for refresh log %s", refresh_log_id)
+
+    def invalidate(self) -> None:
+        self._refresh_log_id = None
+        self._snapshots = {}
+
+
+bet_feed_snapshot_cache = BetFeedSnapshotCache()
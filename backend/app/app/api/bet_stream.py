@@ -0,0 +1,325 @@
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncGenerator, Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.crud.bet_facets import calc_next_refresh_ts, get_latest_refresh_log_id
+from app.crud.crud_bet import bet_load_options
+from app.db.session import SessionLocal
+from app.models.bet import Bet
+from app.models.raceday_refresh_log import RaceDayRefreshLog
+from app.schemas.bet_result import BetFeedItem, BetResultConverter
+
+logger = logging.getLogger(__name__)
+
+
+class BetFeedEntry(BaseModel):
+    id: int
+    # None for multi-bets, which span races
+    track_code: Optional[str]
+    bet_strategy_type: str
+    bet_type: str
+    # Serialized BetFeedItem
+    payload: str
+
+
+class BetFeedDelta(BaseModel):
+    version: int
+    previous_version: int
+    next_refresh_ts: int
+    added: List[BetFeedEntry]
+    updated: List[BetFeedEntry]
+    # As they were before being removed, to be matched against filters
+    removed: List[BetFeedEntry]
+
+
+class BetFeedFilter(BaseModel):
+    """Same filters as GET /bets, an empty list matching any value."""
+
+    track_codes: List[str] = []
+    bet_strat_types: List[str] = []
+    bet_types: List[str] = []
+
+    def matches(self, entry: BetFeedEntry) -> bool:
+        if self.track_codes and entry.track_code not in self.track_codes:
+            return False
+
+        if self.bet_strat_types and entry.bet_strategy_type not in self.bet_strat_types:
+            return False
+
+        if self.bet_types and entry.bet_type not in self.bet_types:
+            return False
+
+        return True
+
+
+def load_bet_feed_entries(db: Session) -> Dict[int, BetFeedEntry]:
+    """All top level bets, by id, serialized as they are returned by the API."""
+    bets = (
+        db.query(Bet)
+        .filter(Bet.parent_id == None)  # noqa: E711
+        .options(*bet_load_options())
+        .all()
+    )
+    bet_conv = BetResultConverter()
+    entries: Dict[int, BetFeedEntry] = {}
+
+    for bet in bets:
+        if bet.race:
+            item = BetFeedItem(
+                data=bet_conv.create_single_bet_result(bet), result_type="single"
+            )
+        else:
+            item = BetFeedItem(
+                data=bet_conv.create_multi_bet_result(bet), result_type="multi"
+            )
+
+        entries[bet.id] = BetFeedEntry(
+            id=bet.id,
+            track_code=bet.race.track_code if bet.race else None,
+            bet_strategy_type=bet.bet_strategy_type,
+            bet_type=bet.bet_type,
+            payload=item.json(),
+        )
+
+    return entries
+
+
+def diff_bet_feed(
+    previous: Dict[int, BetFeedEntry],
+    current: Dict[int, BetFeedEntry],
+    *,
+    version: int,
+    previous_version: int,
+    next_refresh_ts: int,
+) -> BetFeedDelta:
+    added = [entry for (id, entry) in current.items() if id not in previous]
+    updated = [
+        entry
+        for (id, entry) in current.items()
+        if id in previous and previous[id].payload != entry.payload
+    ]
+    removed = [entry for (id, entry) in previous.items() if id not in current]
+
+    return BetFeedDelta(
+        version=version,
+        previous_version=previous_version,
+        next_refresh_ts=next_refresh_ts,
+        added=added,
+        updated=updated,
+        removed=removed,
+    )
+
+
+def sse_message(event: str, data: str, event_id: Optional[int] = None) -> str:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.extend([f"event: {event}", f"data: {data}"])
+
+    return "\n".join(lines) + "\n\n"
+
+
+def delta_message(delta: BetFeedDelta, bet_filter: BetFeedFilter) -> str:
+    """
+    A `bets` event with the changes of `delta` matching `bet_filter`. The
+    payloads are serialized once per cycle and only joined here, as every
+    connection gets its own filtered copy.
+    """
+
+    def payloads(entries: List[BetFeedEntry]) -> str:
+        return "[%s]" % ",".join(
+            entry.payload for entry in entries if bet_filter.matches(entry)
+        )
+
+    removed = ",".join(
+        str(entry.id) for entry in delta.removed if bet_filter.matches(entry)
+    )
+    data = (
+        '{"version":%d,"previous_version":%d,"next_refresh_ts":%d,'
+        '"added":%s,"updated":%s,"removed":[%s]}'
+        % (
+            delta.version,
+            delta.previous_version,
+            delta.next_refresh_ts,
+            payloads(delta.added),
+            payloads(delta.updated),
+            removed,
+        )
+    )
+
+    return sse_message("bets", data, event_id=delta.version)
+
+
+def reset_message(version: int, next_refresh_ts: int) -> str:
+    data = '{"version":%d,"next_refresh_ts":%d}' % (version, next_refresh_ts)
+
+    return sse_message("reset", data, event_id=version)
+
+
+def parse_resume_token(token: Optional[str]) -> Optional[int]:
+    try:
+        return int(token) if token else None
+    except ValueError:
+        return None
+
+
+class BetFeedStream:
+    """
+    Pushes the changes to the bet feed made by each processor cycle to any
+    number of listeners (the SSE connections of this process).
+
+    A single poller checks for a new RaceDayRefreshLog every `poll_secs`, and
+    diffs the serialized top level bets against those of the previous cycle.
+    The feed version, and so the resume token of the stream, is the refresh
+    log id. The last `max_deltas` deltas are kept so that a reconnecting
+    listener only gets what it missed; one that's further behind (or new)
+    gets a `reset` event, telling it to refetch the bets.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Session] = SessionLocal,
+        poll_secs: float = settings.BET_STREAM_POLL_SECS,
+        max_deltas: int = settings.BET_STREAM_MAX_DELTAS,
+        keepalive_secs: float = settings.BET_STREAM_KEEPALIVE_SECS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.poll_secs = poll_secs
+        self.keepalive_secs = keepalive_secs
+
+        self.version: Optional[int] = None
+        self.next_refresh_ts: int = 0
+        self._entries: Dict[int, BetFeedEntry] = {}
+        self._deltas: Deque[BetFeedDelta] = deque(maxlen=max_deltas)
+
+        # Created lazily in the running loop
+        self._updated: Optional[asyncio.Event] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def refresh(self, db: Session) -> bool:
+        """Load the bets of a new processor cycle, if any, and record the delta."""
+        version = get_latest_refresh_log_id(db)
+
+        if version is None or version == self.version:
+            return False
+
+        next_check_time = db.query(func.max(RaceDayRefreshLog.next_check_time)).scalar()
+        next_refresh_ts = calc_next_refresh_ts(next_check_time)
+        entries = load_bet_feed_entries(db)
+
+        if self.version is not None:
+            delta = diff_bet_feed(
+                self._entries,
+                entries,
+                version=version,
+                previous_version=self.version,
+                next_refresh_ts=next_refresh_ts,
+            )
+            self._deltas.append(delta)
+            logger.debug(
+                "Bet feed %d -> %d: %d added, %d updated, %d removed",
+                delta.previous_version,
+                version,
+                len(delta.added),
+                len(delta.updated),
+                len(delta.removed),
+            )
+
+        self._entries = entries
+        self.next_refresh_ts = next_refresh_ts
+        self.version = version
+
+        return True
+
+    def deltas_since(self, version: Optional[int]) -> Optional[List[BetFeedDelta]]:
+        """The deltas after `version`, or None if they're no longer all kept."""
+        if version is None:
+            return None
+
+        deltas = list(self._deltas)
+
+        for (i, delta) in enumerate(deltas):
+            if delta.previous_version == version:
+                return deltas[i:]
+
+        return [] if version == self.version else None
+
+    def _updated_event(self) -> asyncio.Event:
+        if self._updated is None:
+            self._updated = asyncio.Event()
+
+        return self._updated
+
+    def notify(self) -> None:
+        """Wake up the listeners, from the running loop."""
+        updated = self._updated_event()
+        self._updated = asyncio.Event()
+        updated.set()
+
+    def start(self) -> None:
+        """Start the poller in the running loop, if it isn't running."""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll())
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                if await run_in_threadpool(self._refresh_in_session):
+                    self.notify()
+            except Exception as e:
+                logger.exception("Failed refreshing the bet feed stream (%s).", e)
+
+            await asyncio.sleep(self.poll_secs)
+
+    def _refresh_in_session(self) -> bool:
+        db = self.session_factory()
+
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    async def listen(
+        self, request: Request, bet_filter: BetFeedFilter, resume: Optional[int] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        SSE messages for the changes after feed version `resume`, until the
+        client of `request` disconnects. The StreamingResponse doesn't stop
+        the generator when it does, so it's checked after every message.
+        """
+        version = resume
+
+        while True:
+            if await request.is_disconnected():
+                return
+
+            if self.version is not None and version != self.version:
+                deltas = self.deltas_since(version)
+
+                if deltas is None:
+                    version = self.version
+                    yield reset_message(version, self.next_refresh_ts)
+                    continue
+
+                for delta in deltas:
+                    version = delta.version
+                    yield delta_message(delta, bet_filter)
+
+                continue
+
+            updated = self._updated_event()
+
+            try:
+                await asyncio.wait_for(updated.wait(), timeout=self.keepalive_secs)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+
+bet_feed_stream = BetFeedStream()
@@ -0,0 +1,263 @@
+"""
+Benchmark suite for bet generation and strategy evaluation.
+
+Builds synthetic races with pool totals (using the generators in
+app.lib.clients.demo_race_data) for fields of 6-20 starters, and reports ops/sec
+and peak memory for each stage of the bet generation hot path.
+
+Run with: python -m app.benchmarks.bet_generation [--save | --compare]
+
+--save writes the results to the baseline file, --compare fails (exit code 1)
+if any case is slower than the baseline by more than --tolerance. Baseline
+ops/sec are scaled by a pure-Python calibration workload timed in each run,
+to absorb some of the difference between machines (and load on the same one).
+
+This is a manual tool, run before and after changes to the hot path; it isn't
+part of scripts/test.sh, as timings on shared test hosts are too noisy to gate
+every run on. Baselines are recorded on the project stack (see pyproject.toml).
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+from app.lib.clients.demo_race_data import create_race_with_pool_totals
+from app.models.bet import Bet
+from app.models.bet_tag import BetTag
+from app.models.race import Race
+from app.raceday.bet_strategy.bet_strategies import (
+    BetTypeImpl,
+    DrZPlaceShowArbBet,
+    calc_avg_show_reward,
+)
+from app.raceday.bet_strategy.bet_tagger import BetTagger
+from app.raceday.bet_strategy.generator import BetGen, DefaultBetStrategy
+from app.raceday.bet_strategy.race_snapshot import RaceSnapshot
+
+FIELD_SIZES = [6, 8, 10, 12, 14, 16, 18, 20]
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "bet_generation.json"
+DEFAULT_TOLERANCE = 0.35
+# Timing samples per case; each runs for at least 0.2s (see Timer.autorange)
+SAMPLES = 3
+
+
+class BenchRace(NamedTuple):
+    race: Race
+    snapshot: RaceSnapshot
+    bets: List[BetTypeImpl]
+    db_bets: List[Bet]
+    tagger: BetTagger
+
+
+class CaseResult(NamedTuple):
+    ops_per_sec: float
+    peak_mem_kb: float
+
+
+def prepare(field_size: int) -> BenchRace:
+    race = create_race_with_pool_totals(field_size, seed=field_size)
+    bet_gen = BetGen(race=race, use_pool_totals=True)
+    # Win box bets (not generated by all_bets() for now) give the sort,
+    # to_bet_db and tagging cases a population that grows with the field
+    bets = bet_gen.all_bets() + bet_gen.win_box_bet_gen(max_depth=2)
+    tag_map = {name: BetTag(name=name) for name in ("free", "good value")}
+
+    return BenchRace(
+        race=race,
+        snapshot=RaceSnapshot.from_race(race),
+        bets=bets,
+        db_bets=[bet.result().to_bet_db() for bet in bets],
+        tagger=BetTagger(None, tag_map=tag_map),
+    )
+
+
+def _tag_all(bench: BenchRace) -> None:
+    for bet in bench.db_bets:
+        bet.tags = []
+        bench.tagger.assign_tags(bet)
+
+
+# Case name -> factory for the callable to benchmark
+CASES: Dict[str, Callable[[BenchRace], Callable[[], Any]]] = {
+    "snapshot": lambda b: lambda: RaceSnapshot.from_race(b.race),
+    "all_bets": lambda b: lambda: BetGen(race=b.race, use_pool_totals=True).all_bets(),
+    "win_box_bet_gen": lambda b: lambda: BetGen(race=b.race).win_box_bet_gen(
+        max_depth=3
+    ),
+    "dr_z_place_show_arb": lambda b: lambda: DrZPlaceShowArbBet(
+        snapshot=b.snapshot,
+        entries=b.snapshot.active,
+        selection=b.snapshot.active,
+        strategy=DefaultBetStrategy,
+    ).result(),
+    "calc_avg_show_reward": lambda b: lambda: calc_avg_show_reward(b.race),
+    "sort": lambda b: lambda: DefaultBetStrategy.sort_strategy.sort(b.bets),
+    "to_bet_db": lambda b: lambda: [bet.result().to_bet_db() for bet in b.bets],
+    "tagging": lambda b: lambda: _tag_all(b),
+}
+
+
+def measure(func: Callable[[], Any]) -> CaseResult:
+    # Warm up lazy imports and caches before timing
+    func()
+    timer = timeit.Timer(func)
+    (number, _) = timer.autorange()
+    best = min(timer.repeat(repeat=SAMPLES, number=number)) / number
+
+    tracemalloc.start()
+    func()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return CaseResult(ops_per_sec=1 / best, peak_mem_kb=peak / 1024)
+
+
+def _calibration_workload() -> List[int]:
+    return sorted([(i * 7919) % 1000 for i in range(2000)])
+
+
+def calibrate(rounds: int = 5) -> float:
+    """
+    Best ops/sec of a fixed pure-Python workload, used to scale baselines.
+    The best of several rounds is used as the first ones tend to run before
+    the CPU has settled.
+    """
+    return max(measure(_calibration_workload).ops_per_sec for _ in range(rounds))
+
+
+def run(field_sizes: List[int], cases: List[str]) -> Dict[str, Dict[str, CaseResult]]:
+    results: Dict[str, Dict[str, CaseResult]] = {case: {} for case in cases}
+
+    for field_size in field_sizes:
+        bench = prepare(field_size)
+
+        for case in cases:
+            results[case][str(field_size)] = measure(CASES[case](bench))
+
+    return results
+
+
+def print_results(
+    results: Dict[str, Dict[str, CaseResult]],
+    baseline: Dict[str, Any] = None,
+    scale: float = 1.0,
+) -> None:
+    header = "%-22s %6s %14s %12s" % ("case", "field", "ops/sec", "peak KiB")
+
+    if baseline:
+        header += " %10s" % "vs base"
+
+    print(header)
+
+    for (case, by_size) in results.items():
+        for (field_size, result) in by_size.items():
+            line = "%-22s %6s %14.1f %12.1f" % (
+                case,
+                field_size,
+                result.ops_per_sec,
+                result.peak_mem_kb,
+            )
+
+            base = (baseline or {}).get(case, {}).get(field_size)
+
+            if base:
+                line += " %9.0f%%" % (
+                    (result.ops_per_sec / (base["ops_per_sec"] * scale) - 1) * 100
+                )
+
+            print(line)
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, CaseResult]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    scale: float = 1.0,
+) -> List[str]:
+    regressions = []
+
+    for (case, by_size) in results.items():
+        for (field_size, result) in by_size.items():
+            base = baseline.get(case, {}).get(field_size)
+
+            if not base:
+                continue
+
+            expected = base["ops_per_sec"] * scale
+
+            if result.ops_per_sec < expected * (1 - tolerance):
+                regressions.append(
+                    "%s (field of %s): %.1f ops/sec, scaled baseline %.1f"
+                    % (case, field_size, result.ops_per_sec, expected)
+                )
+
+    return regressions
+
+
+def to_json(
+    results: Dict[str, Dict[str, CaseResult]], calibration: float
+) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "calibration_ops_per_sec": calibration,
+        },
+        "results": {
+            case: {size: result._asdict() for (size, result) in by_size.items()}
+            for (case, by_size) in results.items()
+        },
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=FIELD_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save", action="store_true", help="save results as baseline")
+    mode.add_argument("--compare", action="store_true", help="compare to baseline")
+    args = parser.parse_args(argv)
+
+    calibration = calibrate()
+    results = run(args.sizes, args.cases)
+    calibration = max(calibration, calibrate())
+
+    if args.save:
+        print_results(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(to_json(results, calibration), indent=2) + "\n"
+        )
+        print("Saved baseline to %s" % args.baseline)
+        return 0
+
+    if not args.compare:
+        print_results(results)
+        return 0
+
+    saved = json.loads(args.baseline.read_text())
+    baseline = saved["results"]
+    scale = calibration / saved["meta"]["calibration_ops_per_sec"]
+
+    print("Calibration: %.2fx baseline machine speed" % scale)
+    print_results(results, baseline, scale)
+    regressions = find_regressions(results, baseline, args.tolerance, scale)
+
+    for regression in regressions:
+        print("REGRESSION: %s" % regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark for building RacePredictor feature frames.
+
+Compares the per-entry `RaceEntryDf` records (validated one entry at a time)
+against the columnar builder used by `create_race_entry_df_from_race(s)`,
+per race for fields of 6-20 starters, and for a card of races in one frame.
+
+Run with: python -m app.benchmarks.feature_frame
+"""
+import timeit
+from typing import List
+
+import pandas as pd
+
+from app.benchmarks.bet_generation import FIELD_SIZES
+from app.lib.clients.demo_race_data import create_race_with_pool_totals
+from app.ml.predictor.data_utils import (
+    create_race_entry_df_from_race,
+    create_race_entry_df_from_races,
+    race_entry_records,
+)
+from app.models.race import Race
+
+NUM_RUNS = 200
+CARD_SIZE = 60
+
+
+def make_race(field_size: int, seed: int) -> Race:
+    race = create_race_with_pool_totals(field_size, seed)
+    race.id = seed + 1
+
+    for (i, entry) in enumerate(race.entries):
+        entry.id = i + 1
+
+    return race
+
+
+def records_frame(races: List[Race]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [record for race in races for record in race_entry_records(race)]
+    )
+
+
+def time_ms(func, number: int = NUM_RUNS) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main() -> None:
+    print("%6s %14s %14s %8s" % ("field", "records ms", "columnar ms", "speedup"))
+
+    for field_size in FIELD_SIZES:
+        race = make_race(field_size, seed=field_size)
+        records_ms = time_ms(lambda: records_frame([race]))
+        columnar_ms = time_ms(lambda: create_race_entry_df_from_race(race))
+
+        print(
+            "%6d %14.3f %14.3f %7.1fx"
+            % (field_size, records_ms, columnar_ms, records_ms / columnar_ms)
+        )
+
+    card = [
+        make_race(FIELD_SIZES[i % len(FIELD_SIZES)], seed=i) for i in range(CARD_SIZE)
+    ]
+    records_ms = time_ms(lambda: records_frame(card), number=10)
+    columnar_ms = time_ms(lambda: create_race_entry_df_from_races(card), number=10)
+
+    print(
+        "card of %d races: records %.3f ms, columnar %.3f ms (%.1fx)"
+        % (CARD_SIZE, records_ms, columnar_ms, records_ms / columnar_ms)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for per-cycle race identity work in RaceDayProcessor.
+
+Compares recomputing each race's md5 for every watcher lookup (and keying
+watchers by it) against reading the cached `Race.identity_key` and keying
+watchers by race id, on a card of 300 races.
+
+Run with: python -m app.benchmarks.race_identity
+"""
+import timeit
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+from app.models.race import Race
+from app.raceday.race_scheduler import RaceWatcher, RaceWatcherScheduler
+
+NUM_RACES = 300
+NUM_CYCLES = 200
+
+
+def make_races(num_races: int = NUM_RACES) -> List[Race]:
+    now = datetime.now(timezone.utc)
+    races = []
+
+    for i in range(num_races):
+        race = Race(
+            race_date=date.today(),
+            track_code="T%02d" % (i // 12),
+            race_number=i % 12 + 1,
+            race_type="Thoroughbred",
+            post_time=now + timedelta(minutes=i),
+        )
+        race.id = i + 1
+        races.append(race)
+
+    return races
+
+
+def legacy_cycle(races: List[Race], watchers: Dict[str, RaceWatcher]) -> None:
+    """One refresh cycle keyed by md5, recomputed at each lookup."""
+    now = datetime.now(timezone.utc)
+
+    for race in races:
+        # shallow upsert, _update_watcher (get + set) and bet hashing
+        race.md5_hash().hexdigest()
+        watcher = watchers.get(race.md5_hash().hexdigest())
+        watchers[race.md5_hash().hexdigest()] = RaceWatcher(
+            race_id=race.id,
+            race_md5=race.md5_hash().hexdigest(),
+            post_time=race.post_time,
+            next_check_time=watcher.next_check_time if watcher else now,
+        )
+
+
+def cached_cycle(races: List[Race], watchers: RaceWatcherScheduler) -> None:
+    """One refresh cycle keyed by race id, reading the cached identity key."""
+    now = datetime.now(timezone.utc)
+
+    for race in races:
+        race.identity_key
+        watcher = watchers.get(race.id)
+        watchers[race.id] = RaceWatcher.from_race(
+            race, watcher.next_check_time if watcher else now
+        )
+
+
+def main() -> None:
+    races = make_races()
+    legacy_watchers: Dict[str, RaceWatcher] = {}
+    scheduler = RaceWatcherScheduler()
+
+    legacy = timeit.timeit(
+        lambda: legacy_cycle(races, legacy_watchers), number=NUM_CYCLES
+    )
+    cached = timeit.timeit(lambda: cached_cycle(races, scheduler), number=NUM_CYCLES)
+
+    legacy_ms = legacy / NUM_CYCLES * 1000
+    cached_ms = cached / NUM_CYCLES * 1000
+
+    print("races per cycle: %d, cycles: %d" % (NUM_RACES, NUM_CYCLES))
+    print("legacy (md5 recomputed): %.3f ms/cycle" % legacy_ms)
+    print("cached (identity_key):   %.3f ms/cycle" % cached_ms)
+    print(
+        "saved: %.3f ms/cycle (%.1fx)"
+        % (legacy_ms - cached_ms, legacy_ms / cached_ms if cached_ms else 0)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -89,9 +89,34 @@ class Settings(BaseSettings):
     RMQ_PASS: str
     RMQ_CRAWLER_DOWNLOAD_QUEUE: str
     RMQ_CRAWLER_DOWNLOAD_EXCHANGE: str
+    # Messages published (and confirmed) together by PikaClient.queue_msg
+    RMQ_PUBLISH_BATCH_SIZE: int = 50
 
     MAX_SLEEP_TIME_SECS: Optional[int] = 60 * 5
     EXPECTED_PROCESS_TIME_SECS: Optional[int] = 5
+    # Bets per page of the bet feed snapshots published each processor cycle
+    BET_FEED_SNAPSHOT_LIMIT: int = 100
+    # How often the bet stream checks for a new processor cycle
+    BET_STREAM_POLL_SECS: float = 2.0
+    # Cycles of bet deltas kept for reconnecting bet stream clients
+    BET_STREAM_MAX_DELTAS: int = 20
+    # Idle time after which a comment is sent to keep bet streams open
+    BET_STREAM_KEEPALIVE_SECS: float = 15.0
+    # Number of concurrent live data fetches per RaceDayProcessor refresh
+    RACE_REFRESH_WORKERS: int = 1
+    # Race model file, or a directory of versioned model files (latest by name)
+    RACE_MODEL_PATH: str = "./race_model2.dump"
+    # How often the race model path is checked for a new model
+    RACE_MODEL_POLL_SECS: int = 30
+    # Local cache of the ClickHouse training data, see app.ml.training_cache
+    TRAINING_CACHE_DIR: str = "./training_cache"
+    # Days before the watermark re-fetched on each refresh, for late results
+    TRAINING_CACHE_LOOKBACK_DAYS: int = 7
+    # Number of concurrent chart downloads when crawling historical results
+    HISTORICAL_CRAWL_WORKERS: int = 1
+    # Retries of a failed chart download, backing off exponentially
+    HISTORICAL_CRAWL_RETRIES: int = 3
+    HISTORICAL_CRAWL_BACKOFF_SECS: float = 1.0
 
     class Config:
         case_sensitive = True
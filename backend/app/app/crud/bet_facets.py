@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.bet import Bet
+from app.models.race import Race
+from app.models.raceday_refresh_log import RaceDayRefreshLog
+from app.raceday.bet_strategy.bet_strategies import BetStrategyType, BetType
+from app.schemas.bet_result import BetFacetCountsResult
+
+
+class BetFacets(BaseModel):
+    # Latest refresh log when built, None if there's none yet
+    refresh_log_id: Optional[int]
+    next_check_time: Optional[datetime]
+    all_track_codes: List[str]
+    all_bet_strat_types: List[str]
+    all_bet_types: List[str]
+    counts: BetFacetCountsResult
+
+
+def get_latest_refresh_log_id(db: Session) -> Optional[int]:
+    return db.query(func.max(RaceDayRefreshLog.id)).scalar()
+
+
+def calc_next_refresh_ts(
+    next_check_time: Optional[datetime], now: Optional[datetime] = None
+) -> int:
+    # Get the time to next refresh from the latest processor refresh log.
+    # It may be in the past depending on when the processor last ran;
+    # use the max sleep time in that case.
+    now = now or datetime.now(timezone.utc)
+
+    if next_check_time and next_check_time >= now:
+        next_refresh_ts = int(next_check_time.timestamp() * 1000)
+        # Add some time to account for the time to run the job
+        next_refresh_ts += settings.EXPECTED_PROCESS_TIME_SECS * 1000
+    else:
+        next_refresh_ts = int(
+            (now + timedelta(seconds=settings.MAX_SLEEP_TIME_SECS)).timestamp() * 1000
+        )
+
+    return next_refresh_ts
+
+
+def _group_counts(rows: Iterable[Tuple[Optional[str], int]]) -> Dict[str, int]:
+    return {key: count for (key, count) in rows if key is not None}
+
+
+def build_bet_facets(db: Session, refresh_log_id: Optional[int]) -> BetFacets:
+    next_check_time = db.query(func.max(RaceDayRefreshLog.next_check_time)).scalar()
+
+    all_track_codes = sorted(
+        track_code for (track_code,) in db.query(Race.track_code).distinct()
+    )
+
+    top_level_bets = db.query(Bet).filter(Bet.parent_id == None)  # noqa: E711
+    counts = BetFacetCountsResult(
+        track_codes=_group_counts(
+            top_level_bets.join(Bet._race)
+            .with_entities(Race.track_code, func.count(Bet.id))
+            .group_by(Race.track_code)
+        ),
+        bet_types=_group_counts(
+            top_level_bets.with_entities(Bet.bet_type, func.count(Bet.id)).group_by(
+                Bet.bet_type
+            )
+        ),
+        bet_strat_types=_group_counts(
+            top_level_bets.with_entities(
+                Bet.bet_strategy_type, func.count(Bet.id)
+            ).group_by(Bet.bet_strategy_type)
+        ),
+    )
+
+    return BetFacets(
+        refresh_log_id=refresh_log_id,
+        next_check_time=next_check_time,
+        all_track_codes=all_track_codes,
+        all_bet_strat_types=[
+            str(BetStrategyType[bet_strat_type.name])
+            for bet_strat_type in BetStrategyType
+        ],
+        all_bet_types=[str(BetType[bet_type.name]) for bet_type in BetType],
+        counts=counts,
+    )
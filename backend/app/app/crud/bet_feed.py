@@ -0,0 +1,237 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.crud.bet_facets import BetFacets, build_bet_facets, calc_next_refresh_ts
+from app.models.bet_feed_snapshot import BetFeedSnapshot
+from app.raceday.bet_strategy.bet_strategies import BetStrategyType, BetType
+from app.schemas.bet_result import (
+    BetResultConverter,
+    BetsQueryResponse,
+    MultiBetResult,
+    SingleBetResult,
+)
+
+logger = logging.getLogger(__name__)
+
+# DEFAULT_TRACK_CODES = ["kee", "cd", "mrn"]
+DEFAULT_TRACK_CODES: List[str] = []
+DEFAULT_BET_STRAT_TYPES = list(
+    map(
+        str,
+        [
+            BetStrategyType.BOOK_ALL_WIN_ARB,
+            BetStrategyType.BOOK_BOX_WIN_ARB,
+            BetStrategyType.BOOK_DR_Z_PLACE_SHOW_ARB,
+            BetStrategyType.BOOK_DR_Z_PLACE_BET,
+            BetStrategyType.BOOK_DR_Z_SHOW_BET,
+        ],
+    )
+)
+DEFAULT_BET_TYPES = list(
+    map(
+        str,
+        [
+            BetType.ALL_WIN_ARB,
+            BetType.BOX_WIN_ARB,
+            BetType.WIN_BET,
+            BetType.PLACE_BET,
+            BetType.SHOW_BET,
+            BetType.PLACE_SHOW_ARB,
+        ],
+    )
+)
+
+ALL_BETS_SLICE_KEY = "all"
+
+
+def track_slice_key(track_code: str) -> str:
+    return f"track:{track_code}"
+
+
+def strategy_slice_key(bet_strat_type: str) -> str:
+    return f"strategy:{bet_strat_type}"
+
+
+class BetFeedSlice(BaseModel):
+    key: str
+    track_codes: List[str]
+    bet_strat_types: List[str]
+
+
+def build_bets_query_response(
+    db: Session,
+    facets: BetFacets,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    track_codes: List[str] = DEFAULT_TRACK_CODES,
+    bet_strat_types: List[str] = DEFAULT_BET_STRAT_TYPES,
+    bet_types: List[str] = DEFAULT_BET_TYPES,
+) -> BetsQueryResponse:
+    """
+    A page of filtered bets as returned by GET /bets. Raises a
+    BetCursorException for a bad `after` cursor.
+    """
+    (all_bets, next_cursor) = crud.bet.get_page(
+        db,
+        skip=skip,
+        limit=limit,
+        after=after,
+        track_codes=track_codes,
+        bet_strat_types=bet_strat_types,
+        bet_types=bet_types,
+    )
+
+    single_bets: List[SingleBetResult] = []
+    multi_bets: List[MultiBetResult] = []
+    bet_conv = BetResultConverter()
+
+    for i, bet in enumerate(all_bets):
+        if i > limit - 1:
+            break
+
+        if bet.race:
+            single_bets.append(bet_conv.create_single_bet_result(bet))
+        else:
+            multi_bets.append(bet_conv.create_multi_bet_result(bet))
+
+    result_track_codes = list(
+        set([bet.race.track_code for bet in all_bets if bet.race])
+    )
+    result_bet_strat_types = list(set([bet.bet_strategy_type for bet in all_bets]))
+    result_bet_types = list(set([bet.bet_type for bet in all_bets]))
+
+    return BetsQueryResponse(
+        single_bets=single_bets,
+        multi_bets=multi_bets,
+        track_codes=result_track_codes,
+        bet_strat_types=result_bet_strat_types,
+        bet_types=result_bet_types,
+        all_track_codes=facets.all_track_codes,
+        all_bet_strat_types=facets.all_bet_strat_types,
+        all_bet_types=facets.all_bet_types,
+        facet_counts=facets.counts,
+        limit=limit,
+        skip=skip,
+        next_cursor=next_cursor,
+        next_refresh_ts=calc_next_refresh_ts(facets.next_check_time),
+        feed_version=facets.refresh_log_id,
+    )
+
+
+def bet_feed_slices(facets: BetFacets) -> List[BetFeedSlice]:
+    """
+    The filters snapshots are published for: the default feed, and the
+    default feed narrowed to each track or to each strategy with bets.
+    """
+    slices = [
+        BetFeedSlice(
+            key=ALL_BETS_SLICE_KEY,
+            track_codes=DEFAULT_TRACK_CODES,
+            bet_strat_types=DEFAULT_BET_STRAT_TYPES,
+        )
+    ]
+    slices.extend(
+        BetFeedSlice(
+            key=track_slice_key(track_code),
+            track_codes=[track_code],
+            bet_strat_types=DEFAULT_BET_STRAT_TYPES,
+        )
+        for track_code in sorted(facets.counts.track_codes)
+    )
+    slices.extend(
+        BetFeedSlice(
+            key=strategy_slice_key(bet_strat_type),
+            track_codes=[],
+            bet_strat_types=[bet_strat_type],
+        )
+        for bet_strat_type in sorted(facets.counts.bet_strat_types)
+    )
+
+    return slices
+
+
+def bet_feed_slice_key(
+    *,
+    skip: int,
+    limit: int,
+    after: Optional[str],
+    track_codes: List[str],
+    bet_strat_types: List[str],
+    bet_types: List[str],
+) -> Optional[str]:
+    """Key of the snapshot for a GET /bets query, if one is published for it."""
+    if skip != 0 or after or limit != settings.BET_FEED_SNAPSHOT_LIMIT:
+        return None
+
+    if set(bet_types) != set(DEFAULT_BET_TYPES):
+        return None
+
+    if set(bet_strat_types) == set(DEFAULT_BET_STRAT_TYPES):
+        if len(track_codes) < 1:
+            return ALL_BETS_SLICE_KEY
+
+        if len(set(track_codes)) == 1:
+            return track_slice_key(track_codes[0])
+    elif len(track_codes) < 1 and len(set(bet_strat_types)) == 1:
+        return strategy_slice_key(bet_strat_types[0])
+
+    return None
+
+
+def bet_feed_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def publish_bet_feed_snapshots(
+    db: Session, refresh_log_id: int
+) -> List[BetFeedSnapshot]:
+    """
+    Serialize the feed of each slice for the processor cycle of
+    `refresh_log_id`, and replace the snapshots of earlier cycles with them.
+    """
+    facets = build_bet_facets(db, refresh_log_id)
+    created_at = datetime.now(timezone.utc)
+    snapshots: List[BetFeedSnapshot] = []
+
+    for feed_slice in bet_feed_slices(facets):
+        response = build_bets_query_response(
+            db,
+            facets,
+            limit=settings.BET_FEED_SNAPSHOT_LIMIT,
+            track_codes=feed_slice.track_codes,
+            bet_strat_types=feed_slice.bet_strat_types,
+            bet_types=DEFAULT_BET_TYPES,
+        )
+        body = response.json().encode()
+        snapshots.append(
+            BetFeedSnapshot(
+                refresh_log_id=refresh_log_id,
+                slice_key=feed_slice.key,
+                etag=bet_feed_etag(body),
+                body=body,
+                created_at=created_at,
+            )
+        )
+
+    db.add_all(snapshots)
+    db.query(BetFeedSnapshot).filter(
+        BetFeedSnapshot.refresh_log_id < refresh_log_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    logger.info(
+        "Published %d bet feed snapshots for refresh log %s",
+        len(snapshots),
+        refresh_log_id,
+    )
+
+    return snapshots
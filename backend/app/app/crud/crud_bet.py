@@ -0,0 +1,155 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from sqlalchemy.orm.strategy_options import Load
+
+from app.crud.base import CRUDBase
+from app.models.bet import Bet
+from app.models.race import Race
+
+
+class BetCursorException(ValueError):
+    pass
+
+
+def encode_bet_cursor(bet_id: int) -> str:
+    """Opaque cursor for the bets after (older than) the bet with `bet_id`."""
+    payload = json.dumps({"id": bet_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_bet_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        bet_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise BetCursorException(f"Invalid cursor {cursor!r}") from e
+
+    if not isinstance(bet_id, int):
+        raise BetCursorException(f"Invalid cursor {cursor!r}")
+
+    return bet_id
+
+
+def bet_load_options() -> List[Load]:
+    """
+    Loader options for everything BetResultConverter reads from a bet: its
+    race (joined, as it's many-to-one), tags and entries (each selectin
+    loaded in one query for all bets), and the same for its sub-bets. A page
+    of bets is then loaded in a fixed number of queries, whatever its size.
+    """
+    single_bet_options = [
+        joinedload(Bet._race),
+        selectinload(Bet.tags),
+        selectinload(Bet._active_entries),
+        selectinload(Bet.inactive_entries),
+    ]
+
+    return single_bet_options + [
+        selectinload(Bet._sub_bets).options(*single_bet_options)
+    ]
+
+
+class CRUDBet(CRUDBase[Bet, BaseModel, BaseModel]):
+    def get(self, db: Session, id: int) -> Optional[Bet]:
+        return (
+            db.query(Bet).options(*bet_load_options()).filter(Bet.id == id).first()
+        )
+
+    def query_filtered(
+        self,
+        db: Session,
+        *,
+        track_codes: List[str] = [],
+        bet_strat_types: List[str] = [],
+        bet_types: List[str] = [],
+    ) -> Query:
+        """Top level bets (not sub-bets) matching the filters, if any."""
+        query = db.query(Bet).filter(Bet.parent_id == None)  # noqa: E711
+
+        if len(bet_types) > 0:
+            query = query.filter(Bet.bet_type.in_(bet_types))
+
+        if len(track_codes) > 0:
+            query = query.filter(Bet.race.has(Race.track_code.in_(track_codes)))
+
+        if len(bet_strat_types) > 0:
+            query = query.filter(Bet.bet_strategy_type.in_(bet_strat_types))
+
+        return query
+
+    def get_multi_filtered(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        track_codes: List[str] = [],
+        bet_strat_types: List[str] = [],
+        bet_types: List[str] = [],
+    ) -> List[Bet]:
+        """
+        Newest first page of filtered bets, with their graphs loaded. With
+        `after_id`, the page starts after that bet (seeking by the primary
+        key, rather than counting past `skip` rows).
+        """
+        query = self.query_filtered(
+            db,
+            track_codes=track_codes,
+            bet_strat_types=bet_strat_types,
+            bet_types=bet_types,
+        )
+
+        if after_id is not None:
+            query = query.filter(Bet.id < after_id)
+
+        return (
+            query.options(*bet_load_options())
+            .order_by(Bet.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_page(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[str] = None,
+        track_codes: List[str] = [],
+        bet_strat_types: List[str] = [],
+        bet_types: List[str] = [],
+    ) -> Tuple[List[Bet], Optional[str]]:
+        """
+        A page of filtered bets and the cursor of the next page, if there is
+        one. `skip` is only used without a cursor (`after`), as an offset
+        from the cursor would have the same issues the cursor avoids.
+        """
+        after_id = decode_bet_cursor(after) if after else None
+
+        # One more bet than the page tells if there's a next page
+        bets = self.get_multi_filtered(
+            db,
+            skip=0 if after else skip,
+            limit=limit + 1,
+            after_id=after_id,
+            track_codes=track_codes,
+            bet_strat_types=bet_strat_types,
+            bet_types=bet_types,
+        )
+        next_cursor = None
+
+        if len(bets) > limit:
+            bets = bets[:limit]
+            next_cursor = encode_bet_cursor(bets[-1].id) if bets else None
+
+        return (bets, next_cursor)
+
+
+bet = CRUDBet(Bet)
@@ -2,6 +2,7 @@
 # imported by Alembic
 from app.db.base_class import Base  # noqa
 from app.models.bet import Bet  # noqa
+from app.models.bet_feed_snapshot import BetFeedSnapshot  # noqa
 from app.models.bet_tag import BetTag  # noqa
 from app.models.item import Item  # noqa
 from app.models.raceday_refresh_log import RaceDayRefreshLog  # noqa
@@ -6,19 +6,31 @@ Created on Sun Aug 18 12:17:40 2019
 @author: lee1984
 """
 
+import codecs
 import gzip
 import http.client as client
+import io
+import itertools
 import json
+import threading
 import time
-import urllib
+import urllib.parse
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
 
 import pandas
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
 
 name = "clickhouse2pandas"
 version = "0.0.3"
 
+# Binary formats `select` can convert to DataFrames (with pyarrow)
+ARROW_FORMATS = ["Arrow", "ArrowStream", "Parquet"]
 
-def select(connection_url, query=None, convert_to="DataFrame", settings=None):
+
+def _build_settings(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     updated_settings = {
         "enable_http_compression": 1,
         "send_progress_in_http_headers": 0,
@@ -50,65 +62,62 @@ def select(connection_url, query=None, convert_to="DataFrame", settings=None):
             else updated_settings[i]
         )
 
-    components = urllib.parse.urlparse(connection_url)
-
-    if query is None:
-        conn = client.HTTPConnection(components.hostname, port=components.port)
-        conn.request("GET", "/")
-        ret_value = conn.getresponse().read().decode().replace("\n", "")
-    else:
-        if query.strip(" \n\t").lower().startswith("select") == False:
-            raise ValueError(
-                '"query" should start with "select", while the provided "query" starts with "{0}"'.format(
-                    query.strip(" \n\t").split(" ")[0]
-                )
-            )
+    return updated_settings
 
-    accepted_formats = [
-        "DataFrame",
-        "TabSeparated",
-        "TabSeparatedRaw",
-        "TabSeparatedWithNames",
-        "TabSeparatedWithNamesAndTypes",
-        "CSV",
-        "CSVWithNames",
-        "Values",
-        "Vertical",
-        "JSON",
-        "JSONCompact",
-        "JSONEachRow",
-        "TSKV",
-        "Pretty",
-        "PrettyCompact",
-        "PrettyCompactMonoBlock",
-        "PrettyNoEscapes",
-        "PrettySpace",
-        "XML",
-    ]
 
-    if convert_to.lower() not in [i.lower() for i in accepted_formats]:
+def _check_select(query: str) -> None:
+    if query.strip(" \n\t").lower().startswith("select") == False:
         raise ValueError(
-            '"convert_to" has an invalid value "{0}", it should be one of the following: {1}'.format(
-                convert_to, ", ".join(accepted_formats)
-            )
+            '"query" should start with "select", while the provided "query" '
+            'starts with "{0}"'.format(query.strip(" \n\t").split(" ")[0])
         )
 
-    clickhouse_format = (
-        "JSON"
-        if convert_to is None
-        else "JSONCompact"
-        if convert_to.lower() == "dataframe"
-        else convert_to
-    )
-    query_with_format = (
+
+def _with_format(query: str, clickhouse_format: str) -> str:
+    return (
         (query.rstrip("; \n\t") + " format " + clickhouse_format)
         .replace("\n", " ")
         .strip(" ")
     )
 
+
+_local = threading.local()
+
+
+def _get_connection(components: urllib.parse.ParseResult) -> client.HTTPConnection:
+    """
+    Get this thread's keep-alive connection to the given server, reused across
+    queries. http.client reconnects by itself if the server closed it.
+    """
+    connections: Optional[Dict[Any, client.HTTPConnection]] = getattr(
+        _local, "connections", None
+    )
+
+    if connections is None:
+        connections = _local.connections = {}
+
+    if components.hostname is None:
+        raise ValueError("The connection url has no host")
+
+    key = (components.hostname, components.port)
+
+    if key not in connections:
+        connections[key] = client.HTTPConnection(
+            components.hostname, port=components.port
+        )
+
+    return connections[key]
+
+
+def _post_query(
+    conn: client.HTTPConnection,
+    components: urllib.parse.ParseResult,
+    query_with_format: str,
+    updated_settings: Dict[str, Any],
+) -> client.HTTPResponse:
+    """Send the query, and return the response once its status is checked."""
     http_get_params = {"user": components.username, "password": components.password}
     http_get_params.update(updated_settings)
-    conn = client.HTTPConnection(components.hostname, port=components.port)
 
     if updated_settings["enable_http_compression"] == 1:
         conn.request(
@@ -134,6 +143,7 @@ def select(connection_url, query=None, convert_to="DataFrame", settings=None):
         )
         raise ValueError(error_message)
     elif resp.status == 401:
+        resp.read()
         raise ConnectionRefusedError(resp.reason)
     else:
         if resp.status != 200:
@@ -143,18 +153,203 @@ def select(connection_url, query=None, convert_to="DataFrame", settings=None):
                 )
             )
 
-    total = bytes()
+    return resp
+
+
+def _describe(
+    conn: client.HTTPConnection,
+    components: urllib.parse.ParseResult,
+    query: str,
+    updated_settings: Dict[str, Any],
+) -> Dict[str, str]:
+    """Column name -> ClickHouse type of the query's result, from ClickHouse."""
+    resp = _post_query(
+        conn,
+        components,
+        _with_format("DESCRIBE TABLE (" + query.rstrip("; \n\t") + ")", "JSONCompact"),
+        updated_settings,
+    )
+    body = resp.read()
+
+    if updated_settings["enable_http_compression"] == 1:
+        body = gzip.decompress(body)
+
+    return {row[0]: row[1] for row in json.loads(body)["data"]}
+
+
+def _read_arrow_table(data: bytes, arrow_format: str) -> pyarrow.Table:
+    """Read a whole Arrow/ArrowStream/Parquet result, without copying it."""
+    buffer = pyarrow.py_buffer(data)
+
+    if arrow_format == "Arrow":
+        return pyarrow.ipc.open_file(buffer).read_all()
+    elif arrow_format == "ArrowStream":
+        return pyarrow.ipc.open_stream(buffer).read_all()
+
+    return pyarrow.parquet.read_table(pyarrow.BufferReader(buffer))
+
+
+def _arrow_target_type(
+    clickhouse_type: Optional[str], arrow_type: pyarrow.DataType
+) -> pyarrow.DataType:
+    """
+    The Arrow type a ClickHouse column should have in pandas. ClickHouse
+    writes DateTime as UInt32 seconds, Date as UInt16 days and String as
+    Binary, so the ClickHouse type is needed to convert them back.
+    """
+    base_type = _base_type(clickhouse_type or "")
+
+    if pyarrow.types.is_dictionary(arrow_type):
+        # LowCardinality columns
+        return pyarrow.dictionary(
+            arrow_type.index_type,
+            _arrow_target_type(clickhouse_type, arrow_type.value_type),
+        )
+
+    if pyarrow.types.is_integer(arrow_type):
+        if base_type == "DateTime" or base_type.startswith("DateTime("):
+            # DateTime('<tz>') keeps its time zone; others are UTC
+            tz = base_type[len("DateTime('") : -2] if "(" in base_type else None
+            return pyarrow.timestamp("s", tz=tz)
+        elif base_type == "Date":
+            return pyarrow.date32()
+    elif pyarrow.types.is_binary(arrow_type) or pyarrow.types.is_large_binary(
+        arrow_type
+    ):
+        if base_type == "String" or base_type.startswith("FixedString("):
+            return pyarrow.string()
+
+    return arrow_type
+
+
+def _cast_arrow_column(
+    column: pyarrow.ChunkedArray, target_type: pyarrow.DataType
+) -> pyarrow.ChunkedArray:
+    if column.type == target_type:
+        return column
+
+    if pyarrow.types.is_timestamp(target_type):
+        # Integers only cast to timestamps/dates from signed types of their size
+        column = column.cast(pyarrow.int64())
+    elif pyarrow.types.is_date32(target_type):
+        column = column.cast(pyarrow.int32())
+
+    return column.cast(target_type)
+
+
+def _arrow_to_dataframe(
+    table: pyarrow.Table, column_types: Dict[str, str]
+) -> pandas.DataFrame:
+    """
+    Convert an Arrow table of a ClickHouse result to a DataFrame, with types
+    from the result's ClickHouse `column_types`. Numeric columns without
+    NULLs are converted without copying.
+    """
+    columns = [
+        _cast_arrow_column(
+            column, _arrow_target_type(column_types.get(name), column.type)
+        )
+        for (name, column) in zip(table.column_names, table.columns)
+    ]
+    table = pyarrow.table(columns, names=table.column_names)
+    del columns
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def select(connection_url, query=None, convert_to="DataFrame", settings=None):
+    updated_settings = _build_settings(settings)
+
+    components = urllib.parse.urlparse(connection_url)
+
+    if query is None:
+        conn = client.HTTPConnection(components.hostname, port=components.port)
+        conn.request("GET", "/")
+        ret_value = conn.getresponse().read().decode().replace("\n", "")
+    else:
+        _check_select(query)
+
+    accepted_formats = [
+        "DataFrame",
+        "TabSeparated",
+        "TabSeparatedRaw",
+        "TabSeparatedWithNames",
+        "TabSeparatedWithNamesAndTypes",
+        "CSV",
+        "CSVWithNames",
+        "Values",
+        "Vertical",
+        "JSON",
+        "JSONCompact",
+        "JSONEachRow",
+        "TSKV",
+        "Pretty",
+        "PrettyCompact",
+        "PrettyCompactMonoBlock",
+        "PrettyNoEscapes",
+        "PrettySpace",
+        "XML",
+    ] + ARROW_FORMATS
+
+    if convert_to.lower() not in [i.lower() for i in accepted_formats]:
+        raise ValueError(
+            '"convert_to" has an invalid value "{0}", it should be one of the '
+            "following: {1}".format(convert_to, ", ".join(accepted_formats))
+        )
+
+    # Binary formats are converted to DataFrames too; ClickHouse format
+    # names are case sensitive
+    arrow_format = next(
+        (i for i in ARROW_FORMATS if i.lower() == convert_to.lower()), None
+    )
+
+    clickhouse_format = (
+        "JSON"
+        if convert_to is None
+        else "JSONCompact"
+        if convert_to.lower() == "dataframe"
+        else arrow_format or convert_to
+    )
+    query_with_format = _with_format(query, clickhouse_format)
+
+    conn = _get_connection(components)
+
+    try:
+        if arrow_format is not None:
+            column_types = _describe(conn, components, query, updated_settings)
+
+        resp = _post_query(conn, components, query_with_format, updated_settings)
+    except Exception:
+        conn.close()
+        raise
+
+    # Collect chunks and join once; growing a bytes object is quadratic
+    chunks = []
     bytes_downloaded = 0
     last_time = time.time()
 
-    while not resp.isclosed():
-        bytes_downloaded += 300 * 1024
-        total += resp.read(300 * 1024)
+    while True:
+        chunk = resp.read(300 * 1024)
+
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        bytes_downloaded += len(chunk)
         if time.time() - last_time > 1:
             last_time = time.time()
             print("\rDownloaded: %.1f MB." % (bytes_downloaded / 1024 / 1024), end="\r")
     print()
 
+    total = b"".join(chunks)
+    del chunks
+
+    if arrow_format is not None:
+        if updated_settings["enable_http_compression"] == 1:
+            total = gzip.decompress(total)
+
+        return _arrow_to_dataframe(_read_arrow_table(total, arrow_format), column_types)
+
     ret_value = (
         gzip.decompress(total).decode()
         if updated_settings["enable_http_compression"] == 1
@@ -174,3 +369,304 @@ def select(connection_url, query=None, convert_to="DataFrame", settings=None):
         ret_value = dataframe
 
     return ret_value
+
+
+STREAM_FORMATS = [
+    "JSONCompactEachRowWithNamesAndTypes",
+    "TabSeparatedWithNamesAndTypes",
+    "JSONEachRow",
+    "ArrowStream",
+]
+
+# ClickHouse TabSeparated escape sequences
+_TSV_ESCAPES = {
+    "\\": "\\",
+    "t": "\t",
+    "n": "\n",
+    "r": "\r",
+    "0": "\0",
+    "b": "\b",
+    "f": "\f",
+    "'": "'",
+}
+
+
+def _unescape_tsv(value: str) -> Optional[str]:
+    if value == "\\N":
+        return None
+
+    if "\\" not in value:
+        return value
+
+    result = []
+    chars = iter(value)
+
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            result.append(_TSV_ESCAPES.get(escaped, escaped))
+        else:
+            result.append(char)
+
+    return "".join(result)
+
+
+def _base_type(clickhouse_type: str) -> str:
+    """e.g. "Nullable(DateTime)" -> "DateTime", "LowCardinality(String)" -> "String"."""
+    for wrapper in ("Nullable(", "LowCardinality("):
+        while clickhouse_type.startswith(wrapper):
+            clickhouse_type = clickhouse_type[len(wrapper) : -1]
+
+    return clickhouse_type
+
+
+def _apply_types(
+    dataframe: pandas.DataFrame, names: List[str], types: List[str]
+) -> pandas.DataFrame:
+    """
+    Convert columns by their ClickHouse type, so that every batch of a result
+    gets the same dtypes (e.g. a batch of only NULLs isn't left as objects).
+    """
+    for (name, clickhouse_type) in zip(names, types):
+        base_type = _base_type(clickhouse_type)
+
+        if base_type == "DateTime" or base_type.startswith("DateTime("):
+            dataframe[name] = pandas.to_datetime(dataframe[name])
+        elif base_type.startswith(("Int", "UInt", "Float", "Decimal")):
+            dataframe[name] = pandas.to_numeric(dataframe[name])
+
+    return dataframe
+
+
+class _ResponseReader(io.RawIOBase):
+    """Readable file over a (gzipped) response body, decompressed as it's read."""
+
+    def __init__(
+        self, resp: client.HTTPResponse, compressed: bool, chunk_size: int
+    ) -> None:
+        self.resp = resp
+        self.decompressor = (
+            zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+        )
+        self.chunk_size = chunk_size
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while len(self.pending) < 1:
+            chunk = self.resp.read(self.chunk_size)
+
+            if not chunk:
+                if self.decompressor is None:
+                    return 0
+
+                chunk = self.decompressor.flush()
+                self.decompressor = None
+            elif self.decompressor is not None:
+                chunk = self.decompressor.decompress(chunk)
+
+            self.pending = memoryview(chunk)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+
+        return size
+
+
+def _arrow_stream_batches(
+    body: BinaryIO, column_types: Dict[str, str], batch_size: int
+) -> Iterator[pandas.DataFrame]:
+    """DataFrames of about batch_size rows from an ArrowStream response body."""
+    reader = pyarrow.ipc.open_stream(body)
+    record_batches = []
+    rows = 0
+    batches = 0
+
+    for record_batch in reader:
+        record_batches.append(record_batch)
+        rows += record_batch.num_rows
+
+        if rows >= batch_size:
+            table = pyarrow.Table.from_batches(record_batches, schema=reader.schema)
+            record_batches = []
+            rows = 0
+            batches += 1
+
+            yield _arrow_to_dataframe(table, column_types)
+
+    if len(record_batches) or batches == 0:
+        table = pyarrow.Table.from_batches(record_batches, schema=reader.schema)
+
+        yield _arrow_to_dataframe(table, column_types)
+
+
+def _iter_line_chunks(
+    resp: client.HTTPResponse, compressed: bool, chunk_size: int
+) -> Iterator[List[str]]:
+    """
+    Decompress and decode the response incrementally, yielding the complete
+    text lines read so far as lists.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+
+    while True:
+        chunk = resp.read(chunk_size)
+
+        if not chunk:
+            break
+
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+
+        if len(lines):
+            yield lines
+
+    tail = decompressor.flush() if decompressor is not None else b""
+    pending += decoder.decode(tail, final=True)
+
+    if pending:
+        yield [pending]
+
+
+def _parse_json_lines(lines: List[str]) -> List[Any]:
+    # One json.loads per chunk of lines is much faster than one per line
+    return json.loads("[" + ",".join(lines) + "]")
+
+
+def _parse_tsv_lines(lines: List[str]) -> List[List[Optional[str]]]:
+    return [[_unescape_tsv(value) for value in line.split("\t")] for line in lines]
+
+
+def _parse_batches(
+    line_chunks: Iterator[List[str]], row_format: str, batch_size: int
+) -> Iterator[pandas.DataFrame]:
+    """Parse lines of the given row format into DataFrames of batch_size rows."""
+    names: Optional[List[str]] = None
+    types: Optional[List[str]] = None
+    parse_lines: Callable[[List[str]], List[Any]] = (
+        _parse_tsv_lines
+        if row_format == "TabSeparatedWithNamesAndTypes"
+        else _parse_json_lines
+    )
+    lines: List[str] = []
+
+    if row_format.endswith("WithNamesAndTypes"):
+        # The names and types header lines may be split across reads
+        for chunk in line_chunks:
+            lines.extend(chunk)
+
+            if len(lines) >= 2:
+                break
+
+        (names, types) = parse_lines(lines[:2]) if len(lines) >= 2 else ([], [])
+        lines = lines[2:]
+
+    rows: List[Any] = []
+    batches = 0
+
+    for lines in itertools.chain([lines], line_chunks):
+        if len(lines) < 1:
+            continue
+
+        rows.extend(parse_lines(lines))
+
+        while len(rows) >= batch_size:
+            yield _to_dataframe(rows[:batch_size], names, types)
+            rows = rows[batch_size:]
+            batches += 1
+
+    # An empty result still gives an (empty) frame with its columns, if known
+    if len(rows) or (batches == 0 and names is not None):
+        yield _to_dataframe(rows, names, types)
+
+
+def _to_dataframe(
+    rows: List[Any], names: Optional[List[str]], types: Optional[List[str]]
+) -> pandas.DataFrame:
+    if names is None or types is None:
+        # JSONEachRow; rows are dicts, with values typed by JSON only
+        return pandas.DataFrame.from_records(rows)
+
+    dataframe = pandas.DataFrame.from_records(rows, columns=names)
+
+    return _apply_types(dataframe, names, types)
+
+
+def select_batches(
+    connection_url: str,
+    query: str,
+    batch_size: int = 100000,
+    row_format: str = "JSONCompactEachRowWithNamesAndTypes",
+    settings: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 256 * 1024,
+) -> Iterator[pandas.DataFrame]:
+    """
+    Stream the query's results as DataFrames of up to batch_size rows
+    (about batch_size for ArrowStream, whose batches are whole result blocks).
+
+    The response is decompressed and parsed as it's read, so memory use is
+    bounded by the batch size rather than the result size. Queries reuse this
+    thread's keep-alive connection to the server; if the generator isn't run
+    to completion, the connection is closed rather than reused.
+    """
+    if row_format not in STREAM_FORMATS:
+        raise ValueError(
+            '"row_format" has an invalid value "{0}", it should be one of the '
+            "following: {1}".format(row_format, ", ".join(STREAM_FORMATS))
+        )
+
+    _check_select(query)
+
+    updated_settings = _build_settings(settings)
+    components = urllib.parse.urlparse(connection_url)
+    conn = _get_connection(components)
+    completed = False
+
+    compressed = updated_settings["enable_http_compression"] == 1
+
+    try:
+        if row_format == "ArrowStream":
+            column_types = _describe(conn, components, query, updated_settings)
+
+        resp = _post_query(
+            conn, components, _with_format(query, row_format), updated_settings
+        )
+
+        if row_format == "ArrowStream":
+            body = io.BufferedReader(
+                _ResponseReader(resp, compressed, chunk_size), buffer_size=chunk_size
+            )
+            yield from _arrow_stream_batches(body, column_types, batch_size)
+        else:
+            line_chunks = _iter_line_chunks(resp, compressed, chunk_size)
+            yield from _parse_batches(line_chunks, row_format, batch_size)
+
+        completed = True
+    finally:
+        if not completed:
+            conn.close()
+
+
+def select_stream(connection_url: str, query: str, **kwargs: Any) -> pandas.DataFrame:
+    """
+    `select_batches`, concatenated into a single DataFrame. Peak memory is
+    about twice the result frame (the batches, then their concatenation),
+    rather than several times the raw result as with `select`.
+    """
+    batches = list(select_batches(connection_url, query, **kwargs))
+
+    if len(batches) < 1:
+        return pandas.DataFrame()
+
+    if len(batches) == 1:
+        return batches[0]
+
+    return pandas.concat(batches, ignore_index=True)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from app.lib.clients.live_abstract import AbstractLiveRacingClientException
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHttpPoolException(AbstractLiveRacingClientException):
+    pass
+
+
+class AsyncHttpPool:
+    """
+    A shared, keep-alive HTTP connection pool for async clients.
+
+    A single `aiohttp.ClientSession` is lazily created and reused for every
+    request, so connections are pooled across all in-flight fetches rather than
+    opened per request. The number of open connections is bounded both overall
+    and per host.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+        timeout_secs: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout_secs = timeout_secs
+        self.headers = headers or {}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncHttpPool":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_secs),
+                headers=self.headers,
+            )
+
+        return self._session
+
+    async def get_json(self, url: str, params: Dict[str, Any] = None) -> Any:
+        """GET the given url and decode the response body as json."""
+        try:
+            async with self.session().get(url, params=params) as resp:
+                resp.raise_for_status()
+                return await resp.json(content_type=None)
+        except asyncio.TimeoutError as e:
+            raise AsyncHttpPoolException(f"Timed out requesting {url} - {e}")
+        except aiohttp.ClientError as e:
+            raise AsyncHttpPoolException(f"Failed requesting {url} - {e}")
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
@@ -1,10 +1,17 @@
+import asyncio
 import random
 from datetime import date, datetime, timedelta, timezone
 from typing import Dict, List
 
+from app.lib.clients.demo_race_data import (
+    create_race_and_starter_details,
+    create_race_pool_totals,
+    create_track_with_race_details_n,
+)
 from app.lib.clients.live_abstract import (
     AbstractLiveRacingClient,
     AbstractLiveRacingClientException,
+    AsyncAbstractLiveRacingClient,
 )
 from app.lib.schemas.live_racing import (
     RacePoolTotals,
@@ -12,11 +19,6 @@ from app.lib.schemas.live_racing import (
     StarterDetails,
     TrackWithRaceDetails,
 )
-from app.tests.utils.race_data import (
-    create_race_and_starter_details,
-    create_race_pool_totals,
-    create_track_with_race_details_n,
-)
 
 
 class DemoLiveRacingClientException(AbstractLiveRacingClientException):
@@ -135,3 +137,38 @@ class DemoLiveRacingClient(AbstractLiveRacingClient):
             self.pool_totals[track_code][str(race_no)] = new_totals
 
         return new_totals
+
+
+class AsyncDemoLiveRacingClient(AsyncAbstractLiveRacingClient):
+    """
+    Async wrapper around `DemoLiveRacingClient` for offline use and testing.
+    Each call sleeps for `latency_secs` to simulate a network round trip.
+    """
+
+    host = "demo"
+
+    def __init__(
+        self, *, latency_secs: float = 0, demo_client: DemoLiveRacingClient = None
+    ) -> None:
+        super().__init__()
+        self.latency_secs = latency_secs
+        self.demo_client = demo_client or DemoLiveRacingClient()
+
+    async def _simulate_latency(self) -> None:
+        await asyncio.sleep(self.latency_secs)
+
+    async def get_race_entries(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> List[StarterDetails]:
+        await self._simulate_latency()
+        return self.demo_client.get_race_entries(track_code, race_no, type=type)
+
+    async def get_races_by_date(self, tdate: date) -> List[TrackWithRaceDetails]:
+        await self._simulate_latency()
+        return self.demo_client.get_races_by_date(tdate)
+
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> RacePoolTotals:
+        await self._simulate_latency()
+        return self.demo_client.get_race_pool_totals(track_code, race_no, type=type)
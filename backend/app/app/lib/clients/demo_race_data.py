@@ -1,4 +1,5 @@
 import random
+import string
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Tuple
 
@@ -16,11 +17,41 @@ from app.lib.schemas.live_racing import (
     TrackWithRaceAndStarterDetails,
     TrackWithRaceDetails,
 )
-from app.tests.utils.utils import random_datetime_in_range, random_lower_string
+from app.models.race import Race
+from app.raceday.race_canonical import LiveRaceExtendedCanonical
 
 rand_word = RandomWord()
 
 
+def random_lower_string(length: int = 32) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def random_datetime_in_range(
+    start: datetime, end: datetime, precision_modifier: str = "hours"
+) -> datetime:
+    delta = end - start
+
+    if precision_modifier == "days":
+        int_delta = delta.days
+    elif precision_modifier == "hours":
+        int_delta = delta.seconds / 60 / 60
+    elif precision_modifier == "minutes":
+        int_delta = delta.seconds / 60
+    elif precision_modifier == "seconds":
+        int_delta = delta.total_seconds()
+    else:
+        raise ValueError(
+            "Invalid precision_modifier provided (%s)." % precision_modifier
+        )
+
+    if int_delta < 1:
+        return start
+
+    random_val = random.randrange(int(int_delta))
+    return start + timedelta(**{precision_modifier: random_val})
+
+
 def create_uniform_range_for_time_unit(n: int, unit: str) -> List[float]:
     max: float = 0
 
@@ -104,8 +135,6 @@ def create_race_details(
 
     post_time = random_datetime_in_range(*dt_range, precision_modifier=precision_mod)
 
-    print(*effective_dt_range, post_time)
-
     return RaceDetails(
         raceNumber=race_number,
         raceDate=random_datetime_in_range(*effective_dt_range).date(),
@@ -239,8 +268,6 @@ def create_race_and_starter_details(
         *effective_dt_range, precision_modifier=precision_mod
     )
 
-    print(*effective_dt_range, post_time)
-
     return RaceWithStarterDetails(
         raceNumber=race_number,
         raceDate=random_datetime_in_range(*effective_dt_range).date(),
@@ -436,3 +463,46 @@ def create_race_pool_totals(
         show_total=show_total,
         entries_to_pools_map=entries_totals,
     )
+
+
+def create_race_with_pool_totals(field_size: int, seed: int) -> Race:
+    """
+    Create a canonical race with `field_size` starters, pool totals and predicted odds.
+
+    The three favourites get short odds and shrunk place/show pools, so that
+    Dr. Z place/show bets (which need value against the win pool) are
+    generated for every field size.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    track = create_track_with_race_and_starter_details()
+    race_details = create_race_and_starter_details(1, current_race=True)
+
+    race_details.starters = create_starters_n(field_size)
+    track.races = [race_details]
+    pool_totals = create_race_pool_totals(race_details)
+
+    race = LiveRaceExtendedCanonical(track, race_details).convert()
+    race.win_pool_total = pool_totals.win_total
+    race.place_pool_total = pool_totals.place_total
+    race.show_pool_total = pool_totals.show_total
+
+    for (i, entry) in enumerate(race.entries):
+        entry_totals = pool_totals.entries_to_pools_map[entry.program_no]
+        entry.id = i + 1
+        entry.win_pool_total = entry_totals.win_total
+        entry.place_pool_total = entry_totals.place_total
+        entry.show_pool_total = entry_totals.show_total
+        entry.predicted_odds = random.uniform(1, 30)
+
+    # Make the entries with the biggest win pools likely (see BetGen.dr_z_bets())
+    # Dr. Z candidates, as the generated odds of large fields rarely are
+    favourites = sorted(race.entries, key=lambda e: e.win_pool_total, reverse=True)
+
+    for (rank, entry) in enumerate(favourites[:3]):
+        entry.live_odds = 2.0 + 2 * rank
+        entry.place_pool_total /= 4
+        entry.show_pool_total /= 4
+
+    return race
@@ -6,6 +6,10 @@ class AbstractHistoricalRacingClientException(Exception):
     pass
 
 
+class HistoricalChartNotAvailableException(AbstractHistoricalRacingClientException):
+    """Raised when there's no chart to download (e.g. no races that day)."""
+
+
 class AbstractHistoricalRacingClient(ABC):
     """Client used to pull historical racing data."""
 
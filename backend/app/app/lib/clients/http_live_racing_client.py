@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from pydantic import ValidationError, parse_obj_as
+
+from app.lib.clients.async_http import AsyncHttpPool
+from app.lib.clients.live_abstract import (
+    AbstractLiveRacingClientException,
+    AsyncAbstractLiveRacingClient,
+)
+from app.lib.schemas.live_racing import (
+    RacePoolTotals,
+    StarterDetails,
+    TrackWithRaceDetails,
+)
+
+
+class AsyncHttpLiveRacingClientException(AbstractLiveRacingClientException):
+    pass
+
+
+class AsyncHttpLiveRacingClient(AsyncAbstractLiveRacingClient):
+    """
+    Async client for a live racing API serving JSON in the shape of the
+    `app.lib.schemas.live_racing` models.
+
+    Each endpoint is a url template, formatted with `date` (ISO format),
+    `track_code`, `race_no` and `type` as they apply. Requests go through
+    `pool`, so connections are kept alive and shared by every in-flight fetch
+    (and by any other client given the same pool).
+    """
+
+    def __init__(
+        self,
+        *,
+        races_url: str,
+        race_entries_url: str,
+        race_pool_totals_url: str,
+        pool: Optional[AsyncHttpPool] = None,
+    ) -> None:
+        super().__init__()
+        self.urls: Dict[str, str] = {
+            "get_races_by_date": races_url,
+            "get_race_entries": race_entries_url,
+            "get_race_pool_totals": race_pool_totals_url,
+        }
+        self.pool = pool or AsyncHttpPool()
+
+    def request_host(self, method: str) -> str:
+        return urlsplit(self.urls[method]).netloc
+
+    async def _get(self, method: str, result_type: Any, **url_args: Any) -> Any:
+        url = self.urls[method].format(**url_args)
+        data = await self.pool.get_json(url)
+
+        try:
+            return parse_obj_as(result_type, data)
+        except ValidationError as e:
+            raise AsyncHttpLiveRacingClientException(
+                f"Unexpected response from {url} - {e}"
+            )
+
+    async def get_race_entries(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> List[StarterDetails]:
+        return await self._get(
+            "get_race_entries",
+            List[StarterDetails],
+            track_code=track_code,
+            race_no=race_no,
+            type=type,
+        )
+
+    async def get_races_by_date(self, tdate: date) -> List[TrackWithRaceDetails]:
+        return await self._get(
+            "get_races_by_date", List[TrackWithRaceDetails], date=tdate.isoformat()
+        )
+
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> RacePoolTotals:
+        return await self._get(
+            "get_race_pool_totals",
+            RacePoolTotals,
+            track_code=track_code,
+            race_no=race_no,
+            type=type,
+        )
+
+    async def close(self) -> None:
+        await self.pool.close()
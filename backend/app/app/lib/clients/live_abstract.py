@@ -47,3 +47,43 @@ class AbstractLiveRacingClient(ABC):
         raise NotImplementedError(
             "get_race_pool_totals() not implemented for %s" % self.__class__.__name__
         )
+
+
+class AsyncAbstractLiveRacingClient(ABC):
+    """Async counterpart to `AbstractLiveRacingClient`."""
+
+    # Host the requests of this client go to, unless `request_host` says otherwise
+    host: str = "default"
+
+    def request_host(self, method: str) -> str:
+        """The host requests of the given client method are sent to."""
+        return self.host
+
+    @abstractmethod
+    async def get_race_entries(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> List[StarterDetails]:
+        """Get all entries for a given race no. and track code."""
+        raise NotImplementedError(
+            "get_race_entries() not implemented for %s" % self.__class__.__name__
+        )
+
+    @abstractmethod
+    async def get_races_by_date(self, tdate: date) -> List[TrackWithRaceDetails]:
+        """Get all races for a given date."""
+        raise NotImplementedError(
+            "get_races_by_date() not implemented for %s" % self.__class__.__name__
+        )
+
+    @abstractmethod
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> RacePoolTotals:
+        """Get the pool totals for a given race and track_code."""
+        raise NotImplementedError(
+            "get_race_pool_totals() not implemented for %s" % self.__class__.__name__
+        )
+
+    async def close(self) -> None:
+        """Release any resources (e.g. pooled connections) held by the client."""
+        return None
@@ -1,16 +1,34 @@
 import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import date
-from typing import Generator, List
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 
+from app.core.config import settings
 from app.lib.clients.historical_abstract import (
     AbstractHistoricalRacingClient,
     AbstractHistoricalRacingClientException,
+    HistoricalChartNotAvailableException,
 )
 
 logger = logging.getLogger(__name__)
 
 
 class HistoricalRacingCrawlerException(Exception):
+    def __init__(
+        self,
+        message: str,
+        *,
+        track_code: Optional[str] = None,
+        tdate: Optional[date] = None,
+    ) -> None:
+        super().__init__(message)
+        self.track_code = track_code
+        self.tdate = tdate
+
+
+class HistoricalChartNotAvailableCrawlerException(HistoricalRacingCrawlerException):
     pass
 
 
@@ -28,9 +46,58 @@ def create_default_err_handler() -> Generator:
     return err_handler
 
 
+def chart_file_name(track_code: str, tdate: date) -> str:
+    return f"{track_code.upper()}-{tdate.isoformat()}-A.pdf"
+
+
 class HistoricalRacingCrawler:
-    def __init__(self, client: AbstractHistoricalRacingClient) -> None:
+    """
+    Downloads race chart files with a pool of `max_workers` threads, retrying
+    failed downloads up to `max_retries` times with exponential backoff (plus
+    jitter) starting at `backoff_secs`.
+    """
+
+    def __init__(
+        self,
+        client: AbstractHistoricalRacingClient,
+        *,
+        max_workers: int = settings.HISTORICAL_CRAWL_WORKERS,
+        max_retries: int = settings.HISTORICAL_CRAWL_RETRIES,
+        backoff_secs: float = settings.HISTORICAL_CRAWL_BACKOFF_SECS,
+    ) -> None:
         self.client = client
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_secs = backoff_secs
+
+    def download_chart(self, file_path: str, track_code: str, tdate: date) -> str:
+        file_name = chart_file_name(track_code, tdate)
+        attempt = 0
+
+        while True:
+            try:
+                self.client.download_chart_to_file(
+                    file_path, file_name, track_code, tdate, race_no="A"
+                )
+                return file_name
+            except HistoricalChartNotAvailableException:
+                raise
+            except AbstractHistoricalRacingClientException as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = self.backoff_secs * (2 ** attempt)
+                delay += random.uniform(0, self.backoff_secs)
+                attempt += 1
+
+                logger.warning(
+                    "Failed downloading file %s (attempt %d), retrying in %.1fs - %s",
+                    file_name,
+                    attempt,
+                    delay,
+                    e,
+                )
+                time.sleep(delay)
 
     def crawl_date(
         self,
@@ -40,15 +107,77 @@ class HistoricalRacingCrawler:
         *,
         err_handler: Generator = create_default_err_handler(),
     ) -> Generator:
-        for track_code in track_codes:
-            file_name = f"{track_code.upper()}-{tdate.isoformat()}-A.pdf"
+        yield from self.crawl_dates(
+            file_path, [(tdate, track_codes)], err_handler=err_handler
+        )
+
+    def crawl_dates(
+        self,
+        file_path: str,
+        dates_track_codes: Iterable[Tuple[date, List[str]]],
+        *,
+        err_handler: Generator = create_default_err_handler(),
+    ) -> Generator:
+        """
+        Download the charts of all (date, track codes) pairs, up to
+        `max_workers` at a time, and yield file names as downloads complete.
+
+        Failed downloads (after retries) are thrown into `err_handler` as a
+        HistoricalRacingCrawlerException, or its NotAvailable subclass for
+        charts that don't exist (which aren't retried); the crawl goes on if
+        the handler swallows it, and stops if it raises.
+        """
+        downloads: Iterator[Tuple[date, str]] = (
+            (tdate, track_code)
+            for (tdate, track_codes) in dates_track_codes
+            for track_code in track_codes
+        )
+        in_flight: Dict[Future, Tuple[date, str]] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="chart-download"
+        ) as executor:
+
+            def submit_next() -> None:
+                for (tdate, track_code) in downloads:
+                    future = executor.submit(
+                        self.download_chart, file_path, track_code, tdate
+                    )
+                    in_flight[future] = (tdate, track_code)
+                    return
 
             try:
-                self.client.download_chart_to_file(
-                    file_path, file_name, track_code, tdate, race_no="A"
-                )
-            except AbstractHistoricalRacingClientException as e:
-                err_handler.throw(e, "Failed downloading file %s" % file_name)
-                continue
+                # Only submit as many downloads as can run, so that a stopped
+                # crawl doesn't leave a backlog of queued ones
+                for _ in range(self.max_workers):
+                    submit_next()
+
+                while in_flight:
+                    (done, _) = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        (tdate, track_code) = in_flight.pop(future)
+                        submit_next()
+
+                        try:
+                            file_name = future.result()
+                        except AbstractHistoricalRacingClientException as e:
+                            exc_class = (
+                                HistoricalChartNotAvailableCrawlerException
+                                if isinstance(e, HistoricalChartNotAvailableException)
+                                else HistoricalRacingCrawlerException
+                            )
+                            exc = exc_class(
+                                "Failed downloading file %s - %s"
+                                % (chart_file_name(track_code, tdate), e),
+                                track_code=track_code,
+                                tdate=tdate,
+                            )
+                            exc.__cause__ = e
+                            err_handler.throw(exc)
+                            continue
 
-            yield file_name
+                        yield file_name
+            finally:
+                for future in in_flight:
+                    future.cancel()
@@ -1,10 +1,12 @@
+import asyncio
 import logging
 from datetime import date
-from typing import List
+from typing import Awaitable, Dict, List, Optional, TypeVar
 
 from app.lib.clients.live_abstract import (
     AbstractLiveRacingClient,
     AbstractLiveRacingClientException,
+    AsyncAbstractLiveRacingClient,
 )
 from app.lib.schemas.live_racing import (
     RacePoolTotals,
@@ -14,6 +16,8 @@ from app.lib.schemas.live_racing import (
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class LiveRacingCrawlerException(Exception):
     pass
@@ -30,7 +34,8 @@ class LiveRacingCrawler:
             return self.client.get_race_entries(track_code, race_no, type=race_type)
         except AbstractLiveRacingClientException as e:
             logger.error(
-                "Error looking up race entries for (track_code=%s, race_no=%d, race_type=%s) - %s",
+                "Error looking up race entries for "
+                "(track_code=%s, race_no=%d, race_type=%s) - %s",
                 track_code,
                 race_no,
                 race_type,
@@ -45,7 +50,8 @@ class LiveRacingCrawler:
             return self.client.get_race_pool_totals(track_code, race_no, type=race_type)
         except AbstractLiveRacingClientException as e:
             logger.error(
-                "Error looking up race pool totals for (track_code=%s, race_no=%d, race_type=%s) - %s",
+                "Error looking up race pool totals for "
+                "(track_code=%s, race_no=%d, race_type=%s) - %s",
                 track_code,
                 race_no,
                 race_type,
@@ -72,3 +78,107 @@ class LiveRacingCrawler:
             )
 
         return track_races_today
+
+
+class AsyncLiveRacingCrawler:
+    """
+    Async counterpart to `LiveRacingCrawler`.
+
+    Requests are bounded to `max_concurrent_per_host` in-flight calls per
+    request host, and each call is cancelled after `timeout_secs`. Connection
+    pooling is left to the client (see `AsyncHttpLiveRacingClient`), so a single
+    crawler can keep many fetches open without a thread per request.
+    """
+
+    def __init__(
+        self,
+        client: AsyncAbstractLiveRacingClient,
+        *,
+        max_concurrent_per_host: int = 10,
+        timeout_secs: float = 30,
+    ) -> None:
+        self.client = client
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self.timeout_secs = timeout_secs
+
+        # Map of request host -> semaphore, created lazily in the running loop
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_semaphore(self, method: str) -> asyncio.Semaphore:
+        host = self.client.request_host(method)
+
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                self.max_concurrent_per_host
+            )
+
+        return self._host_semaphores[host]
+
+    async def _limited(self, method: str, call: Awaitable[T]) -> T:
+        async with self._host_semaphore(method):
+            return await asyncio.wait_for(call, timeout=self.timeout_secs)
+
+    async def get_race_entries(
+        self, track_code: str, race_no: int, race_type: str
+    ) -> List[StarterDetails]:
+        try:
+            return await self._limited(
+                "get_race_entries",
+                self.client.get_race_entries(track_code, race_no, type=race_type),
+            )
+        except (AbstractLiveRacingClientException, asyncio.TimeoutError) as e:
+            logger.error(
+                "Error looking up race entries for "
+                "(track_code=%s, race_no=%d, race_type=%s) - %s",
+                track_code,
+                race_no,
+                race_type,
+                repr(e),
+            )
+            raise LiveRacingCrawlerException(f"Failed to retrieve race entries - {e!r}")
+
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, race_type: str
+    ) -> RacePoolTotals:
+        try:
+            return await self._limited(
+                "get_race_pool_totals",
+                self.client.get_race_pool_totals(track_code, race_no, type=race_type),
+            )
+        except (AbstractLiveRacingClientException, asyncio.TimeoutError) as e:
+            logger.error(
+                "Error looking up race pool totals for "
+                "(track_code=%s, race_no=%d, race_type=%s) - %s",
+                track_code,
+                race_no,
+                race_type,
+                repr(e),
+            )
+            raise LiveRacingCrawlerException(
+                f"Failed to retrieve race pool totals - {e!r}"
+            )
+
+    async def get_all_track_races_shallow(
+        self, *, track_codes: List[str] = [], target_date: Optional[date] = None,
+    ) -> List[TrackWithRaceDetails]:
+        tdate = target_date or date.today()
+
+        try:
+            track_races_today = await self._limited(
+                "get_races_by_date", self.client.get_races_by_date(tdate)
+            )
+        except (AbstractLiveRacingClientException, asyncio.TimeoutError) as e:
+            logger.error("Error looking up track races for date %s - %s", tdate, e)
+            raise LiveRacingCrawlerException(
+                f"Failed to retrieve track races for {tdate} - {e!r}"
+            )
+
+        if track_codes and len(track_codes) > 0:
+            track_races_today = list(
+                filter(lambda track: track.brisCode in track_codes, track_races_today)
+            )
+
+        return track_races_today
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,174 @@
+import logging
+import os
+from datetime import date, datetime, timezone
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillStatus(str, Enum):
+    DOWNLOADED = "downloaded"
+    QUEUED = "queued"
+    FAILED = "failed"
+    NOT_AVAILABLE = "not_available"
+
+
+# Nothing more to do for these, a restarted backfill skips them
+FINISHED_STATUSES = (BackfillStatus.QUEUED, BackfillStatus.NOT_AVAILABLE)
+
+# (track code, date) of a chart
+ChartKey = Tuple[str, date]
+
+
+class BackfillEntry(BaseModel):
+    track_code: str
+    tdate: date
+    status: BackfillStatus
+    file_name: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: datetime
+
+    @property
+    def key(self) -> ChartKey:
+        return (self.track_code, self.tdate)
+
+
+class BackfillSummary(BaseModel):
+    counts: Dict[BackfillStatus, int]
+    # Charts to retry, as "<track code> <date>"
+    failed: List[str]
+
+    def __repr__(self) -> str:
+        return f"<BackfillSummary(counts={self.counts}, failed={len(self.failed)})>"
+
+
+def chart_key(track_code: str, tdate: date) -> ChartKey:
+    return (track_code.upper(), tdate)
+
+
+class BackfillManifest:
+    """
+    Persistent record of the outcome of each (track, date) chart of a
+    backfill, so that a restarted backfill skips finished work.
+
+    Updates are appended to a JSON lines file as they happen, so that nothing
+    but the line being written is lost if the process stops. The file is
+    replayed (the last line for a chart wins) and compacted when loaded.
+    Updates may come from the crawler's threads, so they're locked.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.entries: Dict[ChartKey, BackfillEntry] = {}
+        self._lock = Lock()
+
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+
+        lines = 0
+
+        with open(self.path) as f:
+            for line in f:
+                lines += 1
+
+                try:
+                    entry = BackfillEntry.parse_raw(line)
+                except ValueError:
+                    # A line cut short by the process stopping mid-write
+                    logger.warning("Skipping bad backfill manifest line: %r", line)
+                    continue
+
+                self.entries[entry.key] = entry
+
+        if lines > len(self.entries):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest entry for each chart."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                for entry in self.entries.values():
+                    f.write(entry.json() + "\n")
+
+            os.replace(tmp_path, self.path)
+
+    def get(self, track_code: str, tdate: date) -> Optional[BackfillEntry]:
+        return self.entries.get(chart_key(track_code, tdate))
+
+    def status(self, track_code: str, tdate: date) -> Optional[BackfillStatus]:
+        entry = self.get(track_code, tdate)
+        return entry.status if entry else None
+
+    def is_finished(self, track_code: str, tdate: date) -> bool:
+        return self.status(track_code, tdate) in FINISHED_STATUSES
+
+    def mark(
+        self,
+        track_code: str,
+        tdate: date,
+        status: BackfillStatus,
+        *,
+        file_name: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        self.mark_many(
+            [chart_key(track_code, tdate)], status, file_name=file_name, error=error
+        )
+
+    def mark_many(
+        self,
+        keys: Iterable[ChartKey],
+        status: BackfillStatus,
+        *,
+        file_name: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            entries = []
+
+            for (track_code, tdate) in keys:
+                previous = self.entries.get(chart_key(track_code, tdate))
+                entry = BackfillEntry(
+                    track_code=track_code.upper(),
+                    tdate=tdate,
+                    status=status,
+                    file_name=file_name or (previous and previous.file_name),
+                    error=error,
+                    updated_at=now,
+                )
+                self.entries[entry.key] = entry
+                entries.append(entry)
+
+            if len(entries) < 1:
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+            with open(self.path, "a") as f:
+                f.write("".join(entry.json() + "\n" for entry in entries))
+
+    def summary(self) -> BackfillSummary:
+        counts = {status: 0 for status in BackfillStatus}
+
+        for entry in self.entries.values():
+            counts[entry.status] += 1
+
+        failed = sorted(
+            f"{entry.track_code} {entry.tdate.isoformat()}"
+            for entry in self.entries.values()
+            if entry.status == BackfillStatus.FAILED
+        )
+
+        return BackfillSummary(counts=counts, failed=failed)
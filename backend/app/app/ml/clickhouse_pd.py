@@ -5,27 +5,43 @@ import math
 
 import app.lib.clickhouse2pandas as ch2pd
 from app.core.config import settings
+from app.ml.training_cache import TrainingDataCache
 
 connection_url = settings.CLICKHOUSE_URI
 
+# Pull results as Arrow record batches, rather than JSON text
+RESULT_FORMAT = "ArrowStream"
+
 
 def get_race_dfs():
-    train_df = ch2pd.select(connection_url, "SELECT * FROM race_db.all_races LIMIT 40")
+    train_df = ch2pd.select(
+        connection_url,
+        "SELECT * FROM race_db.all_races LIMIT 40",
+        convert_to=RESULT_FORMAT,
+    )
     test_df = ch2pd.select(
-        connection_url, "SELECT * FROM race_db.all_races OFFSET 10 LIMIT 100"
+        connection_url,
+        "SELECT * FROM race_db.all_races OFFSET 10 LIMIT 100",
+        convert_to=RESULT_FORMAT,
     )
 
     return (train_df, test_df)
 
 
-def get_complete_race_df():
-    train_df = ch2pd.select(connection_url, "SELECT * FROM race_db.all_races")
-    train_df_horse = ch2pd.select(connection_url, "SELECT * FROM race_db.starters")
+def get_complete_race_df(use_cache: bool = True):
+    """
+    Starters joined with their races (an inner join, ordered by race date),
+    split in halves by race date. With `use_cache`, only recent races are
+    pulled from ClickHouse (see TrainingDataCache); without it, the same join
+    is pulled in full.
+    """
+    cache = TrainingDataCache(connection_url=connection_url)
 
-    train_df = train_df.rename(columns={"id": "race_id"})
-    train_df_horse = train_df_horse.rename(columns={"id": "horse_id"})
-
-    train_df_horse = train_df_horse.merge(train_df, how="left", on="race_id")
+    if use_cache:
+        cache.refresh()
+        train_df_horse = cache.load()
+    else:
+        train_df_horse = cache.fetch_entries(None).drop(columns="__race_date")
 
     set_len = len(train_df_horse)
 
@@ -34,8 +50,16 @@ def get_complete_race_df():
 
 
 def get_starters_dfs():
-    train_df = ch2pd.select(connection_url, "SELECT * FROM race_db.starters LIMIT 400")
-    test_df = ch2pd.select(connection_url, "SELECT * FROM race_db.starters OFFSET 401")
+    train_df = ch2pd.select(
+        connection_url,
+        "SELECT * FROM race_db.starters LIMIT 400",
+        convert_to=RESULT_FORMAT,
+    )
+    test_df = ch2pd.select(
+        connection_url,
+        "SELECT * FROM race_db.starters OFFSET 401",
+        convert_to=RESULT_FORMAT,
+    )
 
     test_df = test_df.drop(
         ["winner", "finish_position", "wagering_position", "official_position"], axis=1
@@ -45,6 +69,8 @@ def get_starters_dfs():
 
 
 def get_starters_complete_test():
-    test_df = ch2pd.select(connection_url, "SELECT * FROM race_db.starters")
+    test_df = ch2pd.select_stream(
+        connection_url, "SELECT * FROM race_db.starters", row_format=RESULT_FORMAT
+    )
 
     return test_df
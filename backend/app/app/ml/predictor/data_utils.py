@@ -1,7 +1,7 @@
 import logging
 import re
 from datetime import date
-from typing import Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 from pydantic import BaseModel
@@ -180,6 +180,131 @@ def create_race_entry_df_from_race(race: Race) -> pd.DataFrame:
     converting fields to match the training data source's canonical format
     (RaceEntryDf) where needed.
     """
+    return create_race_entry_df_from_races([race])
+
+
+def create_race_entry_df_from_races(races: List[Race]) -> pd.DataFrame:
+    """
+    Creates a single DataFrame of the entries of all given races (as in
+    `create_race_entry_df_from_race`), in race order, then entry id order.
+
+    Columns are filled directly rather than through a `RaceEntryDf` per
+    entry: race-level features are computed once per race, and values are
+    coerced the way `RaceEntryDf` validation would (see
+    `race_entry_records`, which this must match column for column).
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in RaceEntryDf.__fields__}
+
+    for race in races:
+        _append_race_entry_columns(columns, race)
+
+    return pd.DataFrame(columns)
+
+
+def _opt_int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _opt_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _opt_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _first_last(name: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """("First", "Last") of a full name, as split on single spaces."""
+    if not name:
+        return (None, None)
+
+    return (name.split(" ", 1)[0], name.rsplit(" ", 1)[-1])
+
+
+def _append_race_entry_columns(columns: Dict[str, List[Any]], race: Race) -> None:
+    entries_sorted: List[RaceEntry] = sorted(race.entries, key=lambda e: e.id)
+    n = len(entries_sorted)
+
+    if n < 1:
+        return
+
+    distance_mapping = try_parse_distance(race.distance)
+    number_of_runners = len([entry for entry in race.entries if not entry.scratched])
+
+    # Race-level features, repeated for each entry. Note that RaceEntryDf has
+    # no `type` field, so the `code` feature is always unset.
+    race_features: Dict[str, Any] = {
+        "race_id": _opt_str(race.id),
+        "horse": None,
+        "code": None,
+        "date": race.race_date.isoformat(),
+        "track_canonical": race.track_code.upper(),
+        "track_country": race.track_country.upper(),
+        "number": _opt_int(race.race_number),
+        "age_code": canon_age_code(race),
+        "sexes_code": race.sex_restrictions,
+        "female_only": float(race.sex_restrictions == "F"),
+        "distance_text": race.distance_long,
+        "distance_compact": race.distance,
+        "feet": distance_mapping and distance_mapping.feet,
+        "furlongs": distance_mapping and distance_mapping.furlongs,
+        "surface": race.surface_label,
+        "number_of_runners": number_of_runners,
+    }
+
+    for (name, value) in race_features.items():
+        columns[name].extend([value] * n)
+
+    jockeys = [_first_last(entry.jockey_name) for entry in entries_sorted]
+    trainers = [_first_last(entry.trainer_name) for entry in entries_sorted]
+
+    columns["horse_id"].extend(_opt_str(entry.id) for entry in entries_sorted)
+    columns["last_raced_days_since"].extend(
+        _opt_float(entry.days_off) for entry in entries_sorted
+    )
+    columns["program"].extend(_opt_str(entry.program_no) for entry in entries_sorted)
+    columns["entry"].extend(
+        _opt_int(entry.sortable_program_no) for entry in entries_sorted
+    )
+    columns["jockey_first"].extend(first for (first, _) in jockeys)
+    columns["jockey_last"].extend(last for (_, last) in jockeys)
+    columns["trainer_first"].extend(first for (first, _) in trainers)
+    columns["trainer_last"].extend(last for (_, last) in trainers)
+    columns["owner"].extend(entry.owner_name for entry in entries_sorted)
+    columns["weight"].extend(_opt_int(entry.weight) for entry in entries_sorted)
+    columns["medication_equipment"].extend(
+        _canon_meds_equipment(entry) for entry in entries_sorted
+    )
+    columns["claim_price"].extend(
+        _opt_int(entry.horse_claiming_price) for entry in entries_sorted
+    )
+    columns["pp"].extend(_opt_int(entry.post_pos) for entry in entries_sorted)
+    columns["disqualified"].extend(
+        _opt_int(entry.scratched) for entry in entries_sorted
+    )
+    columns["odds"].extend(_opt_float(entry.latest_odds()) for entry in entries_sorted)
+    columns["favorite"].extend(
+        float(entry.live_odds_fav or entry.morning_line_fav or 0)
+        for entry in entries_sorted
+    )
+    columns["sire"].extend(entry.sire_name for entry in entries_sorted)
+    columns["dam"].extend(entry.dam_name for entry in entries_sorted)
+    columns["where_bred"].extend(entry.where_bred for entry in entries_sorted)
+    columns["color"].extend(entry.color for entry in entries_sorted)
+    columns["sex"].extend(entry.sex for entry in entries_sorted)
+    columns["dob"].extend(
+        date(int(entry.yob), 1, 1).isoformat() if entry.yob else None
+        for entry in entries_sorted
+    )
+
+
+def race_entry_records(race: Race) -> List[Dict[str, Any]]:
+    """
+    RaceEntryDf dicts for the race's entries, sorted by entry id.
+
+    This is the reference (validated per entry) version of the features built
+    by `create_race_entry_df_from_races`, and is much slower.
+    """
     results = []
 
     entries_sorted = sorted(race.entries, key=lambda e: e.id)
@@ -243,4 +368,4 @@ def create_race_entry_df_from_race(race: Race) -> pd.DataFrame:
             ).dict()
         )
 
-    return pd.DataFrame(results)
+    return results
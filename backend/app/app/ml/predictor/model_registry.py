@@ -0,0 +1,178 @@
+import hashlib
+import logging
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from catboost import CatBoostClassifier
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# File suffixes considered model files when watching a versioned directory
+MODEL_SUFFIXES = (".dump", ".cbm")
+
+
+class ModelRegistryException(Exception):
+    pass
+
+
+class LoadedModel(NamedTuple):
+    model: CatBoostClassifier
+    # "<file name>:<sha256 prefix of its contents>"
+    version: str
+
+
+# (path, mtime_ns, size) of a model file, used to detect changes cheaply
+FileSignature = Tuple[str, int, int]
+
+
+def load_catboost_model(path: str) -> CatBoostClassifier:
+    model = CatBoostClassifier()
+    model.load_model(path)
+
+    return model
+
+
+def model_file_version(path: Path) -> str:
+    sha = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+
+    return f"{path.name}:{sha.hexdigest()[:12]}"
+
+
+class ModelRegistry:
+    """
+    Holds the active race model for a model file, or for the latest model file
+    (in name order, e.g. race_model-20220720.cbm) in a versioned directory.
+
+    When watching, the path is polled in a background thread and a changed
+    model is loaded there, then swapped in with a single assignment. Callers
+    read `current()` once per prediction, so a swap never happens mid-batch.
+    If a new model fails to load (e.g. it's still being copied), the active
+    model is kept and loading is retried once the file changes again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        poll_interval_secs: float = settings.RACE_MODEL_POLL_SECS,
+        load_model: Optional[Callable[[str], CatBoostClassifier]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.poll_interval_secs = poll_interval_secs
+        self.load_model = load_model or load_catboost_model
+
+        self._loaded: Optional[LoadedModel] = None
+        self._signature: Optional[FileSignature] = None
+        self._update_lock = Lock()
+        self._stop = Event()
+        self._watcher: Optional[Thread] = None
+
+        self.check_for_update()
+
+        if self._loaded is None:
+            raise ModelRegistryException(f"No loadable model found at {self.path}")
+
+    def current(self) -> LoadedModel:
+        # Always set once __init__ returns, models are only ever replaced
+        assert self._loaded is not None
+        return self._loaded
+
+    def model_file(self) -> Optional[Path]:
+        """The model file to load: the path itself, or its latest model file."""
+        if not self.path.is_dir():
+            return self.path if self.path.exists() else None
+
+        model_files = sorted(
+            p for p in self.path.iterdir() if p.suffix in MODEL_SUFFIXES
+        )
+
+        return model_files[-1] if len(model_files) else None
+
+    def check_for_update(self) -> bool:
+        """Load and swap in the model file if it changed. Returns if swapped."""
+        with self._update_lock:
+            model_file = self.model_file()
+
+            if model_file is None:
+                logger.warning("No model file found at %s", self.path)
+                return False
+
+            stat = model_file.stat()
+            signature = (str(model_file), stat.st_mtime_ns, stat.st_size)
+
+            if signature == self._signature:
+                return False
+
+            self._signature = signature
+
+            try:
+                version = model_file_version(model_file)
+                loaded = LoadedModel(self.load_model(str(model_file)), version)
+            except Exception as e:
+                logger.exception("Failed loading model %s - %s", model_file, e)
+                return False
+
+            previous = self._loaded
+            self._loaded = loaded
+
+        logger.info(
+            "Loaded race model %s (was %s)",
+            loaded.version,
+            previous and previous.version,
+        )
+
+        return True
+
+    def start_watching(self) -> None:
+        if self._watcher is not None:
+            return
+
+        self._watcher = Thread(
+            target=self._watch, name=f"model-registry-{self.path.name}", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+        self._stop.clear()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval_secs):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.exception("Failed checking for model update - %s", e)
+
+
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = Lock()
+
+
+def get_model_registry(path: str = settings.RACE_MODEL_PATH) -> ModelRegistry:
+    """
+    Get the process-wide registry for the given model path, loading the model
+    and starting to watch for updates on first use, so that all processors in
+    a process share one loaded copy.
+    """
+    key = str(Path(path).resolve())
+
+    with _registries_lock:
+        registry = _registries.get(key)
+
+        if registry is None:
+            registry = _registries[key] = ModelRegistry(path)
+            registry.start_watching()
+
+    return registry
@@ -1,13 +1,15 @@
 import logging
-from typing import Dict
+from typing import Dict, List, Optional
 
 import numpy as np
 from catboost import CatBoostClassifier
 from pydantic import BaseModel
 
+from app.core.config import settings
 from app.models.race import Race
 
-from .data_utils import create_race_entry_df_from_race
+from .data_utils import create_race_entry_df_from_races
+from .model_registry import ModelRegistry, get_model_registry
 
 logger = logging.getLogger(__name__)
 
@@ -19,38 +21,75 @@ class HorseProbData(BaseModel):
 class RacePredictResult(BaseModel):
     # Mapping of entry_id -> HorseProbData
     entries_probs: Dict[int, HorseProbData]
+    # Version of the model that made the predictions
+    model_version: Optional[str] = None
 
 
 class RacePredictor:
-    """Predict `Race` outcomes using a pre-trained model."""
-
-    def __init__(self, model_file: str = "./race_model2.dump") -> None:
+    """
+    Predict `Race` outcomes using a pre-trained model.
+
+    The model is held by a `ModelRegistry`, shared by all predictors for the
+    same model path in a process, which reloads it when the file changes.
+    """
+
+    def __init__(
+        self,
+        model_file: str = settings.RACE_MODEL_PATH,
+        registry: Optional[ModelRegistry] = None,
+    ) -> None:
         self.model_file = model_file
-        self.model = CatBoostClassifier()
-        self.refresh_model()
+        self.registry = registry or get_model_registry(model_file)
+
+    @property
+    def model(self) -> CatBoostClassifier:
+        return self.registry.current().model
+
+    @property
+    def model_version(self) -> str:
+        return self.registry.current().version
 
-    def refresh_model(self):
-        self.model.load_model(self.model_file)
+    def refresh_model(self) -> bool:
+        """Reload the model now if it changed, rather than on the next poll."""
+        return self.registry.check_for_update()
 
     def calc_probs(self, race: Race) -> RacePredictResult:
-        result_dct: Dict[int, HorseProbData] = {}
+        return self.calc_probs_many([race])[race.id]
+
+    def calc_probs_many(self, races: List[Race]) -> Dict[int, RacePredictResult]:
+        """
+        Predict the entries of all given races with a single `predict_proba`
+        call over one feature matrix. Returns a mapping of race id to result.
+        """
+        # Use the same model for the whole batch, even if it's swapped meanwhile
+        loaded = self.registry.current()
+
+        results: Dict[int, RacePredictResult] = {
+            race.id: RacePredictResult(entries_probs={}, model_version=loaded.version)
+            for race in races
+        }
+
+        races_df = create_race_entry_df_from_races(races)
 
-        race_df = create_race_entry_df_from_race(race)
-        race_df.fillna(-999, inplace=True)
+        if len(races_df) < 1:
+            return results
 
-        # print(race_df.to_json())
-        # print(race_df.info())
+        races_df.fillna(-999, inplace=True)
 
-        race_results: np.ndarray = self.model.predict_proba(race_df)
+        race_results: np.ndarray = loaded.model.predict_proba(races_df)
 
         # [[x1, y1], [x2, y2], ...] -> [y1, y2, ...]
         # Where x1 = lose probability; y1 = win probability
         winner_probs = race_results[:, 1]
 
-        # Ensure order matches that of race_df
-        entries_sorted = sorted(race.entries, key=lambda e: e.id)
+        # Rows are ordered by race, then entry id (see race_entry_records())
+        entry_keys = [
+            (race.id, entry.id)
+            for race in races
+            for entry in sorted(race.entries, key=lambda e: e.id)
+        ]
 
-        for (entry, prob) in zip(entries_sorted, winner_probs):
-            result_dct[entry.id] = HorseProbData(win_proba=prob)
+        for ((race_id, entry_id), prob) in zip(entry_keys, winner_probs):
+            results[race_id].entries_probs[entry_id] = HorseProbData(win_proba=prob)
 
-        return RacePredictResult(entries_probs=result_dct)
+        return results
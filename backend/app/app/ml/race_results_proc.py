@@ -1,19 +1,29 @@
 import asyncio
 import logging
+import os
 from datetime import date, timedelta
-from typing import Dict, Generator, List, Tuple
+from typing import Dict, Generator, List, Optional, Tuple
 
 from pydantic import BaseModel
 
 from app.core.config import settings
 from app.lib.clients.historical_abstract import AbstractHistoricalRacingClient
 from app.lib.crawlers.historical_racing import (
+    HistoricalChartNotAvailableCrawlerException,
     HistoricalRacingCrawler,
     HistoricalRacingCrawlerException,
+    chart_file_name,
 )
 from app.lib_private.clients.historical_racing import HistoricalRacingClient
 from app.rabbitmq.pika_client import PikaClient, RmqMessage
 
+from .backfill_manifest import (
+    BackfillManifest,
+    BackfillStatus,
+    BackfillSummary,
+    ChartKey,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,6 +84,11 @@ class RaceResultsProcessor:
     """
     Downloads historical race results and sends the resulting file path out
     to rabbitmq to be parsed and uploaded to clickhouse by the parser service.
+
+    The outcome of each (track, date) chart is recorded in a BackfillManifest
+    (by default in the download path), so a rerun skips charts that were
+    queued or aren't available, queues charts downloaded but not queued
+    without downloading them again, and retries failed ones.
     """
 
     def __init__(
@@ -83,11 +98,15 @@ class RaceResultsProcessor:
         rr_search_config: RaceResultSearchConfig,
         *,
         download_path: str = "pdf",
+        manifest_path: Optional[str] = None,
     ) -> None:
         self.start_date = start_date
         self.end_date = end_date
         self.rr_search_config = rr_search_config
         self.download_path = download_path
+        self.manifest = BackfillManifest(
+            manifest_path or os.path.join(download_path, "backfill_manifest.jsonl")
+        )
 
         self.hist_client: AbstractHistoricalRacingClient = HistoricalRacingClient()
         self.hist_crawler = HistoricalRacingCrawler(self.hist_client)
@@ -97,7 +116,7 @@ class RaceResultsProcessor:
         self.event_loop = asyncio.get_event_loop()
 
     async def send_queue_ingest(self, file_name: str) -> None:
-        await self.rmq_client.send_msg(
+        await self.rmq_client.queue_msg(
             self.download_exchange,
             "",
             RmqMessage(
@@ -113,31 +132,142 @@ class RaceResultsProcessor:
         while True:
             try:
                 yield
-            except HistoricalRacingCrawlerException:
+            except HistoricalChartNotAvailableCrawlerException as e:
+                logger.info("Chart not available - %s", e)
+                self.mark_crawl_error(e, BackfillStatus.NOT_AVAILABLE)
+            except HistoricalRacingCrawlerException as e:
                 logger.exception("Failed ingest for item", stack_info=True)
+                self.mark_crawl_error(e, BackfillStatus.FAILED, error=str(e))
             except Exception as e:
                 raise e
 
+    def mark_crawl_error(
+        self,
+        e: HistoricalRacingCrawlerException,
+        status: BackfillStatus,
+        *,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record the outcome of a failed download, if it says which chart."""
+        if e.track_code is None or e.tdate is None:
+            logger.warning("Crawl error without a chart, not recorded - %s", e)
+            return
+
+        self.manifest.mark(e.track_code, e.tdate, status, error=error)
+
+    def get_chart_keys(self) -> List[ChartKey]:
+        return [
+            (track.track_code, dw_track_list.tdate)
+            for dw_track_list in self.get_datewise_track_lists()
+            if self.start_date <= dw_track_list.tdate <= self.end_date
+            for track in dw_track_list.track_list
+        ]
+
+    def downloaded_file_name(self, key: ChartKey) -> Optional[str]:
+        """The file of a chart downloaded by an earlier run, if it's still there."""
+        entry = self.manifest.get(*key)
+
+        if (
+            entry is None
+            or entry.status != BackfillStatus.DOWNLOADED
+            or entry.file_name is None
+            or not os.path.exists(os.path.join(self.download_path, entry.file_name))
+        ):
+            return None
+
+        return entry.file_name
+
+    def get_dates_track_codes(
+        self, keys: List[ChartKey]
+    ) -> List[Tuple[date, List[str]]]:
+        dates_track_codes: Dict[date, List[str]] = {}
+
+        for (track_code, tdate) in keys:
+            dates_track_codes.setdefault(tdate, []).append(track_code)
+
+        return list(dates_track_codes.items())
+
+    def summary(self) -> BackfillSummary:
+        return self.manifest.summary()
+
+    async def start(self) -> int:
+        """
+            Crawl the date range and queue an ingest message for each downloaded
+            file, returning the number of files sent. Downloads run concurrently
+            in the crawler's threads (see HISTORICAL_CRAWL_WORKERS) while batches
+            of messages are published and confirmed.
+        """
+        keys = [k for k in self.get_chart_keys() if not self.manifest.is_finished(*k)]
+        downloaded: Dict[ChartKey, str] = {}
+        to_download: List[ChartKey] = []
+
+        for key in keys:
+            file_name = self.downloaded_file_name(key)
+
+            if file_name is None:
+                to_download.append(key)
+            else:
+                downloaded[key] = file_name
+
+        files_to_keys = {chart_file_name(*k): k for k in to_download}
+
+        logger.info(
+            "Backfilling %d charts (%d already downloaded), skipping %d finished",
+            len(keys),
+            len(downloaded),
+            len(self.get_chart_keys()) - len(keys),
+        )
+
+        err_handler = self.read_and_handle_errors()
+        err_handler.send(None)  # Initialize the error handler generator
+
+        file_names = self.hist_crawler.crawl_dates(
+            self.download_path,
+            self.get_dates_track_codes(to_download),
+            err_handler=err_handler,
+        )
+        loop = asyncio.get_running_loop()
+        # Marked queued once their batch of messages has been confirmed
+        unconfirmed: List[ChartKey] = []
+        sent = 0
+
+        async def queue(key: ChartKey, file_name: str) -> None:
+            nonlocal unconfirmed, sent
+
+            await self.send_queue_ingest(file_name)
+            unconfirmed.append(key)
+            sent += 1
+
+            if len(self.rmq_client.pending) < 1:
+                self.manifest.mark_many(unconfirmed, BackfillStatus.QUEUED)
+                unconfirmed = []
+
+        try:
+            async with self.rmq_client:
+                for (key, file_name) in downloaded.items():
+                    await queue(key, file_name)
+
+                while True:
+                    # Wait for the next download off the event loop
+                    file_name = await loop.run_in_executor(None, next, file_names, None)
+
+                    if file_name is None:
+                        break
+
+                    key = files_to_keys[file_name]
+                    self.manifest.mark(
+                        *key, BackfillStatus.DOWNLOADED, file_name=file_name
+                    )
+                    await queue(key, file_name)
+
+            self.manifest.mark_many(unconfirmed, BackfillStatus.QUEUED)
+        finally:
+            # Stops the crawl (cancelling queued downloads) if publishing failed
+            await loop.run_in_executor(None, file_names.close)
+
+        logger.info("Sent %d race result files for ingest - %s", sent, self.summary())
+
+        return sent
+
     def blocking_start(self) -> None:
-        dw_track_lists = self.get_datewise_track_lists()
-
-        for dw_track_list in dw_track_lists:
-            if (
-                dw_track_list.tdate < self.start_date
-                or dw_track_list.tdate > self.end_date
-            ):
-                continue
-
-            track_codes = [track.track_code for track in dw_track_list.track_list]
-
-            err_handler = self.read_and_handle_errors()
-            err_handler.send(None)  # Initialize the error handler generator
-
-            for file_name in self.hist_crawler.crawl_date(
-                self.download_path,
-                track_codes,
-                dw_track_list.tdate,
-                err_handler=err_handler,
-            ):
-                coroutine = self.send_queue_ingest(file_name)
-                self.event_loop.run_until_complete(coroutine)
+        self.event_loop.run_until_complete(self.start())
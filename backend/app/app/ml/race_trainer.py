@@ -1,56 +1,357 @@
 #!/usr/bin/env python3
+"""
+Race model training pipeline.
+
+Stages: load (starters joined with races, see TrainingDataCache), prepare
+(features, labels and a validation split), fit, cv and export (the model file
+RacePredictor loads). The wall time and peak memory of each stage are logged
+and returned, so retraining can be compared run to run.
+
+Run with: python -m app.ml.race_trainer [--thread-count N] [--cv-folds K]
+    [--cv-workers W] [--output PATH]
+
+CV folds are fitted in a thread pool (CatBoost releases the GIL while
+fitting), each with its share of --thread-count.
+"""
+import argparse
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from catboost import CatBoostClassifier, Pool, cv, metrics
-from sklearn.model_selection import train_test_split
+from catboost import CatBoostClassifier, metrics
+from pydantic import BaseModel
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from app.core.config import settings
 
 from .clickhouse_pd import get_complete_race_df
 
-train_df, test_df = get_complete_race_df()
+logger = logging.getLogger(__name__)
+
+TARGET_COLUMNS = ["winner", "finish_position", "wagering_position", "official_position"]
+# Value of missing features, as filled by RacePredictor
+MISSING_VALUE = -999
+
+
+class TrainerConfig(BaseModel):
+    iterations: int = 500
+    # CatBoost threads for the fit stage, and shared between concurrent CV
+    # folds. -1 is all cores.
+    thread_count: int = -1
+    cv_folds: int = 3
+    # Number of CV folds fitted at the same time
+    cv_workers: int = 1
+    validation_size: float = 0.25
+    random_seed: int = 0
+    use_cache: bool = True
+    # Model file, or a directory to write a new versioned model file into
+    output_path: str = settings.RACE_MODEL_PATH
+    # Optional CSV of the test set's predicted win probabilities
+    predictions_path: Optional[str] = None
+
+
+class StageResult(BaseModel):
+    name: str
+    wall_secs: float
+    # Peak of Python/NumPy allocations during the stage
+    peak_mem_mb: float
+    # Peak resident size of the process so far, including CatBoost's memory
+    max_rss_mb: float
+
+
+class FoldResult(BaseModel):
+    fold: int
+    logloss: float
+    accuracy: float
+    best_iteration: Optional[int] = None
+
+
+class TrainingResult(BaseModel):
+    stages: List[StageResult] = []
+    cv: List[FoldResult] = []
+    model_path: Optional[str] = None
+
+
+class PreparedData(NamedTuple):
+    x: pd.DataFrame
+    y: pd.Series
+    cat_features: List[int]
+    x_train: pd.DataFrame
+    x_validation: pd.DataFrame
+    y_train: pd.Series
+    y_validation: pd.Series
+    x_test: pd.DataFrame
+
+
+def _max_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return max_rss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+class RaceTrainer:
+    def __init__(self, config: Optional[TrainerConfig] = None) -> None:
+        self.config = config or TrainerConfig()
+        self.result = TrainingResult()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # Traced by someone else, the peak is since they started tracing
+        tracing = tracemalloc.is_tracing()
+
+        if not tracing:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            wall_secs = time.perf_counter() - start
+            (_, peak) = tracemalloc.get_traced_memory()
+
+            if not tracing:
+                tracemalloc.stop()
+
+        result = StageResult(
+            name=name,
+            wall_secs=wall_secs,
+            peak_mem_mb=peak / (1 << 20),
+            max_rss_mb=_max_rss_mb(),
+        )
+        self.result.stages.append(result)
+
+        logger.info(
+            "Stage %s took %.2fs, peak %.1f MiB (max RSS %.1f MiB)",
+            name,
+            result.wall_secs,
+            result.peak_mem_mb,
+            result.max_rss_mb,
+        )
+
+    def model_params(self, thread_count: int) -> dict:
+        return dict(
+            iterations=self.config.iterations,
+            loss_function=metrics.Logloss(),
+            eval_metric=metrics.Accuracy(),
+            random_seed=self.config.random_seed,
+            thread_count=thread_count,
+            logging_level="Silent",
+            allow_writing_files=False,
+        )
+
+    def load(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return get_complete_race_df(use_cache=self.config.use_cache)
+
+    def prepare(self, train_df: pd.DataFrame, test_df: pd.DataFrame) -> PreparedData:
+        train_df = train_df.fillna(MISSING_VALUE)
+        x = train_df.drop(TARGET_COLUMNS, axis="columns")
+        y = train_df.winner
+
+        # Everything but floats (ids, codes and names) is categorical
+        cat_features = list(np.where(x.dtypes != float)[0])
+
+        (x_train, x_validation, y_train, y_validation) = train_test_split(
+            x,
+            y,
+            test_size=self.config.validation_size,
+            random_state=self.config.random_seed,
+        )
+
+        x_test = test_df.fillna(MISSING_VALUE).drop(
+            TARGET_COLUMNS, axis="columns", errors="ignore"
+        )
+
+        return PreparedData(
+            x=x,
+            y=y,
+            cat_features=cat_features,
+            x_train=x_train,
+            x_validation=x_validation,
+            y_train=y_train,
+            y_validation=y_validation,
+            x_test=x_test,
+        )
+
+    def fit(self, data: PreparedData) -> CatBoostClassifier:
+        model = CatBoostClassifier(**self.model_params(self.config.thread_count))
+        model.fit(
+            data.x_train,
+            data.y_train,
+            cat_features=data.cat_features,
+            eval_set=(data.x_validation, data.y_validation),
+        )
+
+        return model
+
+    def fold_thread_count(self) -> int:
+        workers = max(1, self.config.cv_workers)
+        thread_count = self.config.thread_count
+
+        if thread_count < 1:
+            thread_count = os.cpu_count() or 1
+
+        return max(1, thread_count // workers)
+
+    def fit_fold(
+        self,
+        data: PreparedData,
+        fold: int,
+        train_index: np.ndarray,
+        test_index: np.ndarray,
+    ) -> FoldResult:
+        model = CatBoostClassifier(**self.model_params(self.fold_thread_count()))
+        model.fit(
+            data.x.iloc[train_index],
+            data.y.iloc[train_index],
+            cat_features=data.cat_features,
+        )
+
+        y_true = data.y.iloc[test_index]
+        probas = model.predict_proba(data.x.iloc[test_index])
+
+        return FoldResult(
+            fold=fold,
+            logloss=log_loss(y_true, probas, labels=model.classes_),
+            accuracy=accuracy_score(y_true, model.classes_[probas.argmax(axis=1)]),
+            best_iteration=model.get_best_iteration(),
+        )
+
+    def cross_validate(self, data: PreparedData) -> List[FoldResult]:
+        k_fold = StratifiedKFold(
+            n_splits=self.config.cv_folds,
+            shuffle=True,
+            random_state=self.config.random_seed,
+        )
+        splits = list(k_fold.split(data.x, data.y))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.cv_workers)) as pool:
+            futures = [
+                pool.submit(self.fit_fold, data, fold, train_index, test_index)
+                for (fold, (train_index, test_index)) in enumerate(splits)
+            ]
+            folds = [future.result() for future in futures]
+
+        logger.info(
+            "CV logloss %.4f, accuracy %.4f over %d folds",
+            np.mean([f.logloss for f in folds]),
+            np.mean([f.accuracy for f in folds]),
+            len(folds),
+        )
+
+        return folds
+
+    def model_file(self) -> Path:
+        output_path = Path(self.config.output_path)
+
+        if not output_path.is_dir():
+            return output_path
+
+        # Picked up by the ModelRegistry watching the directory, see model_file()
+        return output_path / f"race_model-{datetime.now():%Y%m%d%H%M%S}.cbm"
+
+    def export(self, model: CatBoostClassifier, data: PreparedData) -> Path:
+        path = self.model_file()
+        tmp_path = path.with_name(path.name + ".tmp")
+
+        # Swap the file in whole, so a watching ModelRegistry never loads a
+        # partly written model
+        model.save_model(str(tmp_path))
+        os.replace(tmp_path, path)
+
+        logger.info("Saved race model to %s", path)
+
+        if self.config.predictions_path and len(data.x_test):
+            predictions = pd.DataFrame(
+                {
+                    "horse": data.x_test["horse"],
+                    "winner": model.predict_proba(data.x_test)[:, 1],
+                }
+            )
+            predictions.to_csv(self.config.predictions_path, index=False)
+
+        return path
+
+    def run(self) -> TrainingResult:
+        with self.stage("load"):
+            (train_df, test_df) = self.load()
+
+        with self.stage("prepare"):
+            data = self.prepare(train_df, test_df)
+
+        with self.stage("fit"):
+            model = self.fit(data)
+
+        if self.config.cv_folds > 1:
+            with self.stage("cv"):
+                self.result.cv = self.cross_validate(data)
 
-train_df.fillna(-999, inplace=True)
-test_df.fillna(-999, inplace=True)
+        with self.stage("export"):
+            self.result.model_path = str(self.export(model, data))
 
-x = train_df.drop(
-    ["winner", "finish_position", "wagering_position", "official_position"],
-    axis="columns",
-)
-y = train_df.winner
+        return self.result
 
-print(x.dtypes)
 
-categorical_features_indices = np.where(x.dtypes != float)[0]
+def print_result(result: TrainingResult) -> None:
+    print("%-10s %10s %14s %14s" % ("stage", "wall secs", "peak MiB", "max RSS MiB"))
 
-x_train, x_validation, y_train, y_validation = train_test_split(x, y, train_size=0.75)
+    for stage in result.stages:
+        print(
+            "%-10s %10.2f %14.1f %14.1f"
+            % (stage.name, stage.wall_secs, stage.peak_mem_mb, stage.max_rss_mb)
+        )
 
-x_test = test_df
+    for fold in result.cv:
+        print(
+            "fold %d: logloss %.4f, accuracy %.4f"
+            % (fold.fold, fold.logloss, fold.accuracy)
+        )
 
-model = CatBoostClassifier(custom_loss=[metrics.Accuracy()], logging_level="Silent")
+    print("Model saved to %s" % result.model_path)
 
 
-model.fit(
-    x_train,
-    y_train,
-    cat_features=categorical_features_indices,
-    eval_set=(x_validation, y_validation),
-    # logging_level='Verbose',
-    plot=True,
-)
+def main(argv: List[str] = None) -> int:
+    defaults = TrainerConfig()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=defaults.iterations)
+    parser.add_argument("--thread-count", type=int, default=defaults.thread_count)
+    parser.add_argument("--cv-folds", type=int, default=defaults.cv_folds)
+    parser.add_argument("--cv-workers", type=int, default=defaults.cv_workers)
+    parser.add_argument("--seed", type=int, default=defaults.random_seed)
+    parser.add_argument("--output", default=defaults.output_path)
+    parser.add_argument("--predictions", default=None, help="CSV of test predictions")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="pull all training data again"
+    )
+    args = parser.parse_args(argv)
 
-cv_params = model.get_params()
-cv_params.update(
-    {"loss_function": metrics.Logloss(),}
-)
+    logging.basicConfig(level=logging.INFO)
 
-cv_data = cv(
-    Pool(x, y, cat_features=categorical_features_indices), cv_params, plot=True,
-)
+    config = TrainerConfig(
+        iterations=args.iterations,
+        thread_count=args.thread_count,
+        cv_folds=args.cv_folds,
+        cv_workers=args.cv_workers,
+        random_seed=args.seed,
+        use_cache=not args.no_cache,
+        output_path=args.output,
+        predictions_path=args.predictions,
+    )
+    print_result(RaceTrainer(config).run())
 
-submission = pd.DataFrame()
-submission["horse"] = x_test["horse"]
-submission["winner"] = model.predict_proba(x_test)
+    return 0
 
-print("submission", submission)
 
-submission.to_csv("submission.csv", index=False)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow
+import pyarrow.parquet
+from pydantic import BaseModel
+
+import app.lib.clickhouse2pandas as ch2pd
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATABASE = "race_db"
+RACES_TABLE = "all_races"
+STARTERS_TABLE = "starters"
+# Race date column of the races table, used to partition the cache
+DATE_COLUMN = "date"
+
+# (source, alias, ClickHouse type) of a column of starters joined with races
+JoinedColumn = Tuple[str, str, str]
+
+ARROW_NUMERIC_TYPES = {
+    "Int8": pyarrow.int8(),
+    "Int16": pyarrow.int16(),
+    "Int32": pyarrow.int32(),
+    "Int64": pyarrow.int64(),
+    "UInt8": pyarrow.uint8(),
+    "UInt16": pyarrow.uint16(),
+    "UInt32": pyarrow.uint32(),
+    "UInt64": pyarrow.uint64(),
+    "Float32": pyarrow.float32(),
+    "Float64": pyarrow.float64(),
+}
+
+
+class CacheRefreshResult(BaseModel):
+    # Number of date partitions (re)written
+    partitions: int = 0
+    rows: int = 0
+    watermark: Optional[date] = None
+
+
+def joined_columns(
+    starters_columns: Dict[str, str], races_columns: Dict[str, str]
+) -> List[JoinedColumn]:
+    """
+    Columns of starters joined with their races, from the name -> ClickHouse
+    type of each table's columns, named as the pandas merge in
+    `get_complete_race_df` named them: `id`s are renamed to horse_id/race_id,
+    and other names in both tables get _x/_y suffixes.
+    """
+    starters = ["horse_id" if c == "id" else c for c in starters_columns]
+    races = ["race_id" if c == "id" else c for c in races_columns]
+    shared = (set(starters) & set(races)) - {"race_id"}
+
+    result = [
+        (f"s.`{source}`", f"{name}_x" if name in shared else name, type)
+        for ((source, type), name) in zip(starters_columns.items(), starters)
+    ]
+    result.extend(
+        (f"r.`{source}`", f"{name}_y" if name in shared else name, type)
+        for ((source, type), name) in zip(races_columns.items(), races)
+        if name != "race_id"
+    )
+
+    return result
+
+
+def partition_schema(
+    entries_df: pd.DataFrame, columns: List[JoinedColumn]
+) -> pyarrow.Schema:
+    """
+    Schema of the cached partitions. Numeric columns are typed by their
+    ClickHouse type rather than by their values, as pandas has nullable
+    integers as floats only when NULLs are present; partitions written by
+    different refreshes could otherwise not be read together.
+    """
+    schema = pyarrow.Schema.from_pandas(entries_df, preserve_index=False)
+
+    for (_, alias, clickhouse_type) in columns:
+        arrow_type = ARROW_NUMERIC_TYPES.get(ch2pd._base_type(clickhouse_type))
+
+        if arrow_type is not None:
+            schema = schema.set(
+                schema.get_field_index(alias), pyarrow.field(alias, arrow_type)
+            )
+
+    return schema
+
+
+class TrainingDataCache:
+    """
+    On-disk cache of starters joined with their races, for model training.
+
+    Rows are stored as one Parquet file per race date. A watermark (the latest
+    race date fetched) is kept alongside, so `refresh()` only pulls recent
+    races from ClickHouse, which also does the join: those on or after the
+    watermark less `lookback_days`, as results of the last few days may have
+    been incomplete or backfilled since. Older backfills need a `rebuild()`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = settings.TRAINING_CACHE_DIR,
+        connection_url: str = settings.CLICKHOUSE_URI,
+        lookback_days: int = settings.TRAINING_CACHE_LOOKBACK_DAYS,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.connection_url = connection_url
+        self.lookback_days = lookback_days
+        self.partitions_dir = self.cache_dir / "race_entries"
+        self.watermark_file = self.cache_dir / "watermark.json"
+
+    @property
+    def watermark(self) -> Optional[date]:
+        if not self.watermark_file.exists():
+            return None
+
+        watermark = json.loads(self.watermark_file.read_text())
+
+        return date.fromisoformat(watermark["date"])
+
+    def partition_file(self, race_date: date) -> Path:
+        return self.partitions_dir / f"{race_date.isoformat()}.parquet"
+
+    def partition_dates(self) -> List[date]:
+        if not self.partitions_dir.exists():
+            return []
+
+        return sorted(
+            date.fromisoformat(p.stem) for p in self.partitions_dir.glob("*.parquet")
+        )
+
+    def fetch_columns(self) -> List[JoinedColumn]:
+        """Columns of the starters and races tables, as joined in `joined_query`."""
+        columns_df = ch2pd.select(
+            self.connection_url,
+            "SELECT table, name, type FROM system.columns "
+            f"WHERE database = '{DATABASE}' "
+            f"AND table IN ('{STARTERS_TABLE}', '{RACES_TABLE}') "
+            "ORDER BY table, position",
+        )
+
+        (starters_df, races_df) = (
+            columns_df[columns_df["table"] == table]
+            for table in (STARTERS_TABLE, RACES_TABLE)
+        )
+
+        return joined_columns(
+            dict(zip(starters_df["name"], starters_df["type"])),
+            dict(zip(races_df["name"], races_df["type"])),
+        )
+
+    def joined_query(self, columns: List[JoinedColumn], since: Optional[date]) -> str:
+        select_list = ", ".join(
+            f"{source} AS `{alias}`" for (source, alias, _) in columns
+        )
+        where = f"WHERE r.`{DATE_COLUMN}` >= '{since.isoformat()}' " if since else ""
+
+        return (
+            f"SELECT {select_list}, r.`{DATE_COLUMN}` AS `__race_date` "
+            f"FROM {DATABASE}.{STARTERS_TABLE} AS s "
+            f"INNER JOIN {DATABASE}.{RACES_TABLE} AS r ON r.`id` = s.`race_id` "
+            f"{where}"
+            f"ORDER BY r.`{DATE_COLUMN}`, s.`race_id`, s.`id`"
+        )
+
+    def fetch_entries(
+        self, since: Optional[date], columns: Optional[List[JoinedColumn]] = None
+    ) -> pd.DataFrame:
+        return ch2pd.select_stream(
+            self.connection_url,
+            self.joined_query(columns or self.fetch_columns(), since),
+            row_format="ArrowStream",
+        )
+
+    def refresh_since(self) -> Optional[date]:
+        """First race date re-fetched by default, None for everything."""
+        watermark = self.watermark
+
+        if watermark is None:
+            return None
+
+        return watermark - timedelta(days=self.lookback_days)
+
+    def refresh(self, since: Optional[date] = None) -> CacheRefreshResult:
+        """
+        Fetch races on or after `since` (by default, `lookback_days` before the
+        watermark; everything if there's none) and replace their date
+        partitions.
+        """
+        since = since or self.refresh_since()
+        columns = self.fetch_columns()
+        entries_df = self.fetch_entries(since, columns)
+
+        result = CacheRefreshResult(rows=len(entries_df), watermark=self.watermark)
+
+        if len(entries_df) < 1:
+            logger.info("Training data cache is up to date (%s)", since)
+            return result
+
+        race_dates = pd.to_datetime(entries_df.pop("__race_date")).dt.date
+        # One schema for all partitions, rather than inferring it per date
+        schema = partition_schema(entries_df, columns)
+
+        self.partitions_dir.mkdir(parents=True, exist_ok=True)
+
+        for (race_date, partition_df) in entries_df.groupby(race_dates, sort=True):
+            self._write_partition(race_date, partition_df, schema)
+            result.partitions += 1
+
+        result.watermark = max(max(race_dates), result.watermark or date.min)
+        self._write_watermark(result.watermark)
+
+        logger.info("Refreshed training data cache since %s - %s", since, result)
+
+        return result
+
+    def rebuild(self) -> CacheRefreshResult:
+        """Drop the cached partitions and watermark, and fetch everything again."""
+        for race_date in self.partition_dates():
+            self.partition_file(race_date).unlink()
+
+        if self.watermark_file.exists():
+            self.watermark_file.unlink()
+
+        return self.refresh()
+
+    def load(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> pd.DataFrame:
+        """Read the cached rows for race dates in [start, end], in date order."""
+        files = [
+            self.partition_file(race_date)
+            for race_date in self.partition_dates()
+            if (start is None or race_date >= start)
+            and (end is None or race_date <= end)
+        ]
+
+        if len(files) < 1:
+            return pd.DataFrame()
+
+        tables = [pyarrow.parquet.read_table(f) for f in files]
+        # Columns that were all NULL on some dates are typed as null there
+        schema = pyarrow.unify_schemas([table.schema for table in tables])
+        table = pyarrow.concat_tables([table.cast(schema) for table in tables])
+
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _write_partition(
+        self, race_date: date, partition_df: pd.DataFrame, schema: pyarrow.Schema
+    ) -> None:
+        table = pyarrow.Table.from_pandas(
+            partition_df, schema=schema, preserve_index=False
+        )
+        path = self.partition_file(race_date)
+        tmp_path = path.with_suffix(".parquet.tmp")
+
+        # Replace the partition atomically, so readers never see a partial file
+        pyarrow.parquet.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _write_watermark(self, watermark: date) -> None:
+        tmp_path = self.watermark_file.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps({"date": watermark.isoformat()}))
+        os.replace(tmp_path, self.watermark_file)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, LargeBinary, String
+
+from app.db.base_class import Base
+from app.db.custom_types import TZDateTime
+
+
+class BetFeedSnapshot(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    # Refresh log of the processor cycle that published the snapshot
+    refresh_log_id = Column(Integer, nullable=False, index=True)
+    # Filters the snapshot is for, see app.api.bet_feed
+    slice_key = Column(String, nullable=False)
+    etag = Column(String, nullable=False)
+    # Serialized BetsQueryResponse
+    body = Column(LargeBinary, nullable=False)
+    created_at = Column(TZDateTime, nullable=False)
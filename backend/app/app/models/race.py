@@ -45,20 +45,40 @@ class Race(Base):
             [used by builtin hash()], since hash() varies between runtime
             and python implementations, whereas this is used for comparing
             db-persisted objects.
+
+            Prefer `identity_key`, which is cached, over recomputing this.
         """
         base = str(self.race_date) + str(self.track_code) + str(self.race_number)
         return md5(base.encode())
 
     race_md5_hex = Column(String, nullable=False, unique=True)
 
+    @property
+    def identity_key(self) -> str:
+        """
+            The hex md5 hash of this race, as of the last change to
+            its race_date, track_code or race_number.
+        """
+        return self.race_md5_hex
+
+    def _refresh_identity_key(self) -> None:
+        """Recompute the cached md5 hash once all of its parts are set."""
+        if None in (self._race_date, self._track_code, self._race_number):
+            return None
+
+        self.race_md5_hex = self.md5_hash().hexdigest()
+
     @hybrid_property
     def race_number(self) -> int:
         return self._race_number
 
     @race_number.setter
     def race_number(self, val: int) -> None:
+        if val == self._race_number and self.race_md5_hex is not None:
+            return None
+
         self._race_number = val
-        self.race_md5_hex = self.md5_hash().hexdigest()
+        self._refresh_identity_key()
 
     @hybrid_property
     def race_date(self):
@@ -66,8 +86,11 @@ class Race(Base):
 
     @race_date.setter
     def race_date(self, val) -> None:
+        if val == self._race_date and self.race_md5_hex is not None:
+            return None
+
         self._race_date = val
-        self.race_md5_hex = self.md5_hash().hexdigest()
+        self._refresh_identity_key()
 
     @hybrid_property
     def track_code(self) -> str:
@@ -75,8 +98,11 @@ class Race(Base):
 
     @track_code.setter
     def track_code(self, val) -> None:
+        if val == self._track_code and self.race_md5_hex is not None:
+            return None
+
         self._track_code = val
-        self.race_md5_hex = self.md5_hash().hexdigest()
+        self._refresh_identity_key()
 
     track_country = Column(String)
     race_type = Column(String, nullable=False)  # Thoroughbred, Harness, etc.
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer
+from sqlalchemy import Boolean, Column, Integer, String
 
 from app.db.base_class import Base
 from app.db.custom_types import TZDateTime
@@ -13,3 +13,5 @@ class RaceDayRefreshLog(Base):
     entry_count = Column(Integer, nullable=False)
     bet_count = Column(Integer, nullable=False)
     success = Column(Boolean, nullable=False, index=True)
+    # Version of the race model used for the refresh's predictions
+    model_version = Column(String, nullable=True)
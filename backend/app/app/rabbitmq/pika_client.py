@@ -1,6 +1,10 @@
+import asyncio
 import logging
+from types import TracebackType
+from typing import Dict, List, Optional, Tuple, Type
 
-from aio_pika import Connection, DeliveryMode, ExchangeType, Message, connect
+from aio_pika import DeliveryMode, ExchangeType, Message, connect
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractExchange
 from pydantic import BaseModel
 
 from app.core.config import settings
@@ -8,16 +12,64 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+class PikaClientException(Exception):
+    pass
+
+
 class RmqMessage(BaseModel):
     message_type: str
     body: dict
 
 
+# (exchange name, routing key, message) of a message waiting to be published
+PendingMessage = Tuple[str, str, Message]
+
+
 class PikaClient:
-    def __init__(self):
-        self.connection: Connection = None
+    """
+    Publishes messages to fanout exchanges over one long-lived channel with
+    publisher confirms. Declared exchanges are kept per channel.
+
+    `send_msg` publishes a message and waits for its confirm. `queue_msg`
+    adds it to a batch instead, which is published (and confirmed) as a
+    whole once `batch_size` messages are queued, on `flush()`, or when
+    leaving the client's context:
+
+        async with PikaClient() as client:
+            for msg in msgs:
+                await client.queue_msg(exchange_name, "", msg)
+    """
+
+    def __init__(self, *, batch_size: int = settings.RMQ_PUBLISH_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+
+        self.connection: Optional[AbstractConnection] = None
+        self.channel: Optional[AbstractChannel] = None
+        self.exchanges: Dict[str, AbstractExchange] = {}
+        self.pending: List[PendingMessage] = []
 
-    async def get_connection(self) -> Connection:
+    async def __aenter__(self) -> "PikaClient":
+        await self.get_channel()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            if exc_type is None:
+                raise
+
+            # Don't replace the error the context is exited with
+            logger.exception("Failed publishing queued messages")
+        finally:
+            await self.close()
+
+    async def get_connection(self) -> AbstractConnection:
         return await connect(
             host=settings.RMQ_HOST,
             login=settings.RMQ_USER,
@@ -25,19 +77,92 @@ class PikaClient:
             port=5672,
         )
 
+    async def get_channel(self) -> AbstractChannel:
+        if not self.connection or self.connection.is_closed:
+            self.connection = await self.get_connection()
+            self.channel = None
+
+        if not self.channel or self.channel.is_closed:
+            self.channel = await self.connection.channel(publisher_confirms=True)
+            self.exchanges = {}
+
+        return self.channel
+
+    async def get_exchange(self, exchange_name: str) -> AbstractExchange:
+        channel = await self.get_channel()
+        exchange = self.exchanges.get(exchange_name)
+
+        if exchange is None:
+            exchange = await channel.declare_exchange(
+                exchange_name, ExchangeType.FANOUT
+            )
+            self.exchanges[exchange_name] = exchange
+
+        return exchange
+
+    def create_message(self, msg: RmqMessage) -> Message:
+        message_body = bytes(msg.json(), "utf-8")
+        return Message(message_body, delivery_mode=DeliveryMode.PERSISTENT)
+
     async def send_msg(
         self, exchange_name: str, routing_key: str, msg: RmqMessage
     ) -> None:
-        if not self.connection:
-            connection = await self.get_connection()
-            self.connection = connection
+        exchange = await self.get_exchange(exchange_name)
+        await exchange.publish(self.create_message(msg), routing_key)
 
-        connection = self.connection
+    async def queue_msg(
+        self, exchange_name: str, routing_key: str, msg: RmqMessage
+    ) -> None:
+        self.pending.append((exchange_name, routing_key, self.create_message(msg)))
 
-        channel = await connection.channel()
-        exchange = await channel.declare_exchange(exchange_name, ExchangeType.FANOUT,)
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
 
-        message_body = bytes(msg.json(), "utf-8")
-        message = Message(message_body, delivery_mode=DeliveryMode.PERSISTENT)
+    async def flush(self) -> int:
+        """
+        Publish all queued messages at once and wait for their confirms.
+        Messages that aren't confirmed stay queued for the next flush.
+        """
+        if len(self.pending) < 1:
+            return 0
+
+        exchanges = {
+            name: await self.get_exchange(name) for name in {p[0] for p in self.pending}
+        }
+        (batch, self.pending) = (self.pending, [])
+
+        results = await asyncio.gather(
+            *[
+                exchanges[exchange_name].publish(message, routing_key)
+                for (exchange_name, routing_key, message) in batch
+            ],
+            return_exceptions=True,
+        )
+
+        failed = [
+            (pending, result)
+            for (pending, result) in zip(batch, results)
+            if isinstance(result, BaseException)
+        ]
+
+        if failed:
+            self.pending = [pending for (pending, _) in failed] + self.pending
+            raise PikaClientException(
+                "%d of %d messages not confirmed - %s"
+                % (len(failed), len(batch), failed[0][1])
+            )
+
+        logger.debug("Published %d messages", len(batch))
+
+        return len(batch)
+
+    async def close(self) -> None:
+        if self.pending:
+            logger.warning("Closing with %d unpublished messages", len(self.pending))
+
+        if self.connection and not self.connection.is_closed:
+            await self.connection.close()
 
-        await exchange.publish(message, routing_key)
+        self.connection = None
+        self.channel = None
+        self.exchanges = {}
@@ -1,7 +1,9 @@
 import logging
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, NamedTuple, Optional, Set, Union
 
-from sqlalchemy.orm import Session, joinedload, make_transient
+import sqlalchemy
+from sqlalchemy import Float, Integer, or_
+from sqlalchemy.orm import Session, aliased
 
 from app.models.bet import Bet
 from app.models.race import Race
@@ -25,6 +27,10 @@ class RaceBetProcessor:
 
     Bets that exist in the DB but not in the new generation of bets are deleted.
 
+    Reconciliation works on bet hashes only: one query loads the existing hashes,
+    changed rewards are written with a single bulk UPDATE, and stale bets are
+    removed with a single bulk DELETE, regardless of the number of bets.
+
     Changes to the session are committed as a result of this process.
     """
 
@@ -43,29 +49,29 @@ class RaceBetProcessor:
 
         self.bet_tagger = BetTagger(self.db)
 
-    def existing_bets(self) -> List[Bet]:
-        existing_race_bets: List[Bet] = (
-            self.db.query(Bet)
-            .options(joinedload(Bet.parent))
-            .filter(Bet.race.has(Race.id == self.race.id))
+    def existing_bet_rows(self) -> Dict[str, "ExistingBetRow"]:
+        """
+            Map of bet hash -> (id, rewards) for the bets of this race and
+            their parent multi-bets, without loading the ORM objects.
+        """
+        parent_ids = (
+            self.db.query(Bet.parent_id)
+            .filter(Bet.race_id == self.race.id, Bet.parent_id.isnot(None))
+            .distinct()
+        )
+        rows = (
+            self.db.query(
+                Bet.bet_md5_hex,
+                Bet.id,
+                Bet.min_reward,
+                Bet.avg_reward,
+                Bet.max_reward,
+            )
+            .filter(or_(Bet.race_id == self.race.id, Bet.id.in_(parent_ids)))
             .all()
         )
 
-        return existing_race_bets
-
-    def existing_bet_hash_mapping(self) -> Dict[str, Bet]:
-        # Map of bet hash -> bet
-        bet_map: Dict[str, Bet] = {}
-
-        for bet in self.existing_bets():
-            bet_hash = bet.bet_md5_hex
-            bet_map[bet_hash] = bet
-
-            if bet.parent:
-                parent_hash = bet.parent.bet_md5_hex
-                bet_map[parent_hash] = bet.parent
-
-        return bet_map
+        return {row[0]: ExistingBetRow(*row[1:]) for row in rows}
 
     def bet_generator(self) -> BetGen:
         return BetGen(race=self.race, use_pool_totals=self.use_pool_totals)
@@ -92,39 +98,74 @@ class RaceBetProcessor:
         return result_bets
 
     def reconcile_generated_bets_with_db(self, generated_bets: List[Bet]) -> List[Bet]:
-        bet_map = self.existing_bet_hash_mapping()
+        """
+            Update rewards of generated bets that already exist in the db, delete
+            those that were not regenerated, and return the bets that are new.
+            Runs a constant number of statements.
+        """
+        existing = self.existing_bet_rows()
 
         new_bets: List[Bet] = []
-        updates_seen = set()
-
-        generated_sub_bets: List[Bet] = []
+        kept_bets: List[Bet] = []
 
         for bet in generated_bets:
-            for sub_bet in bet.sub_bets:
-                generated_sub_bets.append(sub_bet)
-
-        for bet in generated_bets + generated_sub_bets:
-            bet_hash = bet.md5_hash().hexdigest()
+            group = [bet] + list(bet.sub_bets)
 
-            if bet_hash in bet_map:
-                make_transient(bet)
-                bet_map[bet_hash].update_shallow(bet)
-                updates_seen.add(bet_hash)
+            # A multi-bet is only kept if all of its sub-bets are too; otherwise
+            # the whole group is replaced.
+            if all(_bet_hash(b) in existing for b in group):
+                kept_bets.extend(group)
             else:
-                new_bets.append(bet)
+                new_bets.extend(group)
 
-        hashes_to_delete = set(bet_map.keys()).difference(updates_seen)
+        kept_hashes: Set[str] = set(_bet_hash(bet) for bet in kept_bets)
+        hashes_to_delete = set(existing.keys()).difference(kept_hashes)
 
-        for hash in hashes_to_delete:
-            self.db.delete(bet_map[hash])
+        reward_updates: List[tuple] = []
 
-        self.db.commit()
+        for bet in kept_bets:
+            row = existing[_bet_hash(bet)]
+            rewards = (bet.min_reward, bet.avg_reward, bet.max_reward)
+
+            if rewards != (row.min_reward, row.avg_reward, row.max_reward):
+                reward_updates.append((row.id, *rewards))
+
+        # Generated copies of kept bets must not be inserted
+        for bet in kept_bets:
+            if bet in self.db:
+                self.db.expunge(bet)
+
+        if len(hashes_to_delete) > 0:
+            self.db.execute(
+                sqlalchemy.delete(Bet)
+                .where(Bet.bet_md5_hex.in_(list(hashes_to_delete)))
+                .execution_options(synchronize_session=False)
+            )
+
+        if len(reward_updates) > 0:
+            self.db.execute(_reward_update_stmt(reward_updates))
+
+        # Bulk statements bypass the session, so drop any stale bets it holds
+        self.db.expire(self.race, ["bets"])
+
+        logger.debug(
+            "Reconciled bets for race %s: %d new, %d kept (%d updated), %d deleted",
+            self.race,
+            len(new_bets),
+            len(kept_bets),
+            len(reward_updates),
+            len(hashes_to_delete),
+        )
 
         return new_bets
 
     def create_bets(self) -> List[Bet]:
         result_bets = self.regenerate_bets()
 
+        return self.save_bets(result_bets)
+
+    def save_bets(self, result_bets: List[Bet]) -> List[Bet]:
+        """Merge the given generated bets into the db, and commit."""
         logger.debug("Saving generated bets %s", result_bets)
 
         new_bets = self.reconcile_generated_bets_with_db(result_bets)
@@ -135,3 +176,62 @@ class RaceBetProcessor:
         self.db.commit()
 
         return result_bets
+
+
+def delete_orphaned_multi_bets(db: Session) -> int:
+    """
+        Delete multi-bets that no longer have any sub-bets, e.g. after their
+        races were deleted. Returns the number of bets removed.
+    """
+    sub_bet = aliased(Bet)
+    has_sub_bets = (
+        sqlalchemy.select(sub_bet.id).where(sub_bet.parent_id == Bet.id).exists()
+    )
+
+    result = db.execute(
+        sqlalchemy.delete(Bet)
+        .where(Bet.race_id.is_(None), ~has_sub_bets)
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount > 0:
+        logger.info("Deleted %d orphaned multi-bets", result.rowcount)
+
+    return result.rowcount
+
+
+class ExistingBetRow(NamedTuple):
+    id: int
+    min_reward: Optional[float]
+    avg_reward: Optional[float]
+    max_reward: Optional[float]
+
+
+def _bet_hash(bet: Bet) -> str:
+    """Get the hash of a generated bet, kept up to date by its setters."""
+    if bet.bet_md5_hex is None:
+        bet.bet_md5_hex = bet.md5_hash().hexdigest()
+
+    return bet.bet_md5_hex
+
+
+def _reward_update_stmt(rows: List[tuple]) -> sqlalchemy.sql.Update:
+    """UPDATE bets SET <rewards> FROM (VALUES (id, min, avg, max), ...) by id."""
+    values = sqlalchemy.values(
+        sqlalchemy.column("id", Integer),
+        sqlalchemy.column("min_reward", Float),
+        sqlalchemy.column("avg_reward", Float),
+        sqlalchemy.column("max_reward", Float),
+        name="reward_updates",
+    ).data(rows)
+
+    return (
+        sqlalchemy.update(Bet)
+        .where(Bet.id == values.c.id)
+        .values(
+            min_reward=sqlalchemy.cast(values.c.min_reward, Float),
+            avg_reward=sqlalchemy.cast(values.c.avg_reward, Float),
+            max_reward=sqlalchemy.cast(values.c.max_reward, Float),
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -3,16 +3,19 @@
 import logging
 from abc import ABC, abstractmethod
 from enum import Enum
-from itertools import permutations
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
 
 from app.models.bet import Bet
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
-from app.raceday.bet_strategy.dr_z_eq import (
-    get_expected_place_val_per_dollar,
-    get_expected_show_val_per_dollar,
+from app.raceday.bet_strategy.pool_math import (
+    avg_place_reward,
+    avg_show_reward,
+    entry_pools,
 )
+from app.raceday.bet_strategy.race_snapshot import RaceSnapshot
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -212,13 +215,13 @@ class BetTypeImpl(ABC):
     def __init__(
         self,
         *,
-        race: Race,
-        horses: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ):
-        self.race = race
-        self.horses = horses
+        self.snapshot = snapshot
+        self.entries = entries
         self.selection = selection
         self.strategy = strategy
 
@@ -278,12 +281,12 @@ class WinBet(BetTypeImpl):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: RaceEntry,
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: int,
         strategy: BetStrategy,
     ) -> None:
-        self.race = race
+        self.snapshot = snapshot
         self.entries = entries
         self.selection = selection
         self.strategy = strategy
@@ -307,18 +310,18 @@ class WinBet(BetTypeImpl):
         return self.outlay()
 
     def odds(self) -> float:
-        return self.selection.latest_odds() or 0
+        return float(self.snapshot.odds[self.selection])
 
     def outlay(self) -> float:
         return self.strategy.outlay_strategy.outlay(self)
 
     def result(self) -> BetResult:
         return BetResult(
-            race=self.race,
+            race=self.snapshot.race,
             bet_strategy_type=self.bet_strategy_type,
             bet_type=self.bet_type,
-            horses=self.entries,
-            selection=[self.selection],
+            horses=self.snapshot.entries_at(self.entries),
+            selection=[self.snapshot.entries[self.selection]],
             max_reward=self.max_reward(),
             min_reward=self.min_reward(),
             cost=self.cost(),
@@ -330,25 +333,25 @@ class AIWinBet(WinBet):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: RaceEntry,
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: int,
         strategy: BetStrategy,
     ) -> None:
         super().__init__(
-            race=race, entries=entries, selection=selection, strategy=strategy
+            snapshot=snapshot, entries=entries, selection=selection, strategy=strategy
         )
         self.bet_strategy_type = BetStrategyType.AI_WIN_BET
 
     def odds(self) -> float:
-        return self.selection.predicted_odds or 0
+        return float(self.snapshot.predicted_odds[self.selection])
 
 
 class WinAllArbBet(BetTypeImpl):
     def __init__(
-        self, *, race: Race, entries: List[RaceEntry], strategy: BetStrategy,
+        self, *, snapshot: RaceSnapshot, entries: Sequence[int], strategy: BetStrategy,
     ) -> None:
-        self.race = race
+        self.snapshot = snapshot
         self.entries = entries
         self.strategy = strategy
         self.bet_type = BetType.ALL_WIN_ARB
@@ -356,7 +359,7 @@ class WinAllArbBet(BetTypeImpl):
 
         self.bets = [
             WinBet(
-                race=self.race,
+                snapshot=self.snapshot,
                 entries=self.entries,
                 selection=s,
                 strategy=self.strategy,
@@ -389,12 +392,14 @@ class WinAllArbBet(BetTypeImpl):
         return 1
 
     def result(self) -> BetResult:
+        entries = self.snapshot.entries_at(self.entries)
+
         return BetResult(
             bet_type=self.bet_type,
             bet_strategy_type=self.bet_strategy_type,
-            race=self.race,
-            selection=self.entries,
-            horses=self.entries,
+            race=self.snapshot.race,
+            selection=entries,
+            horses=entries,
             max_reward=self.max_reward(),
             avg_reward=self.avg_reward(),
             min_reward=self.min_reward(),
@@ -407,21 +412,21 @@ class WinBoxArbBet(BetTypeImpl):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
-        self.race: Race = race
-        self.entries: List[RaceEntry] = entries
+        self.snapshot: RaceSnapshot = snapshot
+        self.entries: Sequence[int] = entries
         self.strategy: BetStrategy = strategy
-        self.selection: List[RaceEntry] = selection
+        self.selection: Sequence[int] = selection
         self.bet_type: BetType = BetType.BOX_WIN_ARB
         self.bet_strategy_type: BetStrategyType = BetStrategyType.BOOK_BOX_WIN_ARB
 
         self.bets = [
             WinBet(
-                race=self.race,
+                snapshot=self.snapshot,
                 entries=self.entries,
                 selection=s,
                 strategy=self.strategy,
@@ -447,7 +452,7 @@ class WinBoxArbBet(BetTypeImpl):
         return sum(b.min_bet() for b in self.bets)
 
     def odds(self) -> float:
-        return sum((h.latest_odds() or 0) for h in self.selection)
+        return float(self.snapshot.odds[list(self.selection)].sum())
 
     def cost(self):
         # TODO: outlay based on various leg odds?
@@ -455,7 +460,7 @@ class WinBoxArbBet(BetTypeImpl):
 
     def result(self) -> MultiBetResult:
         return MultiBetResult(
-            race=self.race,
+            race=self.snapshot.race,
             bet_type=self.bet_type,
             bet_strategy_type=self.bet_strategy_type,
             bet_results=[b.result() for b in self.bets],
@@ -496,13 +501,9 @@ def calc_place_reward_redux(race: Race, selection: RaceEntry, other_horse: RaceE
     ) - 1
 
 
-def calc_avg_place_reward(race: Race):
-    total: float = 0
-    perms = list(permutations(race.entries, 2))
-    for selection, other_horse in perms:
-        total += calc_place_reward_redux(race, selection, other_horse)
-
-    return total / len(perms)
+def calc_avg_place_reward(race: Race) -> float:
+    """Average of calc_place_reward_redux() over all ordered pairs of entries."""
+    return avg_place_reward(entry_pools(race.entries, "place"), race.place_pool_total)
 
 
 def calc_show_reward(
@@ -529,29 +530,34 @@ def calc_show_reward(
     return indiv_payout
 
 
-def calc_avg_show_reward(race: Race):
-    total: float = 0
-    perms = list(permutations(race.entries, 3))
+def calc_avg_show_reward(race: Race) -> float:
+    """Average of calc_show_reward() over all ordered triples of entries."""
+    return avg_show_reward(entry_pools(race.entries, "show"), race.show_pool_total)
 
-    for (selection, other_horse, third_horse) in perms:
-        total += calc_show_reward(race, selection, other_horse, third_horse)
 
-    return total / len(perms)
+def _lowest_pool_entries(
+    pools: np.ndarray, entries: Sequence[int], n: int
+) -> List[int]:
+    """Get the n entries with the smallest pools, in order (stable, as with sort())."""
+    entries = np.asarray(entries)
+    order = np.argsort(pools[entries], kind="stable")[:n]
+
+    return [int(i) for i in entries[order]]
 
 
 class PlaceBet(BetTypeImpl):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
-        self.race: Race = race
-        self.entries: List[RaceEntry] = entries
+        self.snapshot: RaceSnapshot = snapshot
+        self.entries: Sequence[int] = entries
         self.strategy: BetStrategy = strategy
-        self.selection: RaceEntry = selection[0]
+        self.selection: int = selection[0]
         self.bet_type: BetType = BetType.PLACE_BET
         self.bet_strategy_type: BetStrategyType = BetStrategyType.BOOK_PLACE_BET
 
@@ -560,55 +566,53 @@ class PlaceBet(BetTypeImpl):
 
     def avg_reward(self) -> float:
         # TODO: avg reward for pl show
-        return calc_avg_place_reward(self.race) * self.effective_proba()
+        return self.snapshot.avg_place_reward * self.effective_proba()
 
     def max_reward(self) -> float:
-        total_place_pool = self.race.place_pool_total
+        total_place_pool = self.snapshot.place_pool_total
+        place_pools = self.snapshot.place_pools
         selection = self.selection
 
         # Make the lowest odds horse other_horse, or the next-lowest
         # if this bet is already targetting it, so the remaining pool
         # is large as possible
-        entries_worst = self.entries.copy()
-        entries_worst.sort(key=lambda e: e.place_pool_total)
+        entries_worst = _lowest_pool_entries(place_pools, self.entries, 2)
         other_horse = (
-            entries_worst[0]
-            if not entries_worst[0].id == selection.id
-            else entries_worst[1]
+            entries_worst[0] if not entries_worst[0] == selection else entries_worst[1]
         )
 
         # Get remaining pool to be distributed by subtracting 2 place horses from net place pool
         pool_dividend = total_place_pool - (
-            other_horse.place_pool_total + selection.place_pool_total
+            place_pools[other_horse] + place_pools[selection]
         )
 
         # 2 winners, since this is place, divide by 2
         pool_split = pool_dividend / 2
 
         # Divide the remaining split among the winners
-        indiv_payout = pool_split / selection.place_pool_total
+        indiv_payout = pool_split / place_pools[selection]
 
         # unit size 1 -> 2 for $2 bets
         indiv_payout *= 2
 
-        return indiv_payout
+        return float(indiv_payout)
 
     def min_bet(self) -> float:
         return sum(b.min_bet() for b in self.bets)
 
     def odds(self) -> float:
-        return self.selection.latest_odds()
+        return float(self.snapshot.odds[self.selection])
 
     def cost(self) -> float:
         return self.strategy.outlay_strategy.outlay(self)
 
     def result(self) -> BetResult:
         return BetResult(
-            race=self.race,
+            race=self.snapshot.race,
             bet_type=self.bet_type,
             bet_strategy_type=self.bet_strategy_type,
-            horses=self.entries,
-            selection=[self.selection],
+            horses=self.snapshot.entries_at(self.entries),
+            selection=[self.snapshot.entries[self.selection]],
             max_reward=self.max_reward(),
             avg_reward=self.avg_reward(),
             min_reward=self.min_reward(),
@@ -621,18 +625,18 @@ class DrZPlaceBet(PlaceBet):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
         super().__init__(
-            race=race, entries=entries, selection=selection, strategy=strategy
+            snapshot=snapshot, entries=entries, selection=selection, strategy=strategy
         )
         self.bet_strategy_type = BetStrategyType.BOOK_DR_Z_PLACE_BET
 
     def expected_place_val_per_dollar(self) -> float:
-        return get_expected_place_val_per_dollar(self.race, self.selection)
+        return float(self.snapshot.place_evs[self.selection])
 
     def avg_reward(self) -> float:
         return self.expected_place_val_per_dollar() * self.outlay()
@@ -642,15 +646,15 @@ class ShowBet(BetTypeImpl):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
-        self.race: Race = race
-        self.entries: List[RaceEntry] = entries
+        self.snapshot: RaceSnapshot = snapshot
+        self.entries: Sequence[int] = entries
         self.strategy: BetStrategy = strategy
-        self.selection: RaceEntry = selection[0]
+        self.selection: int = selection[0]
         self.bet_type: BetType = BetType.SHOW_BET
         self.bet_strategy_type: BetStrategyType = BetStrategyType.BOOK_SHOW_BET
 
@@ -659,62 +663,56 @@ class ShowBet(BetTypeImpl):
 
     def avg_reward(self) -> float:
         # TODO: avg reward for pl show
-        return calc_avg_show_reward(self.race) * self.effective_proba()
+        return self.snapshot.avg_show_reward * self.effective_proba()
 
     def max_reward(self) -> float:
-        total_show_pool = self.race.show_pool_total
+        total_show_pool = self.snapshot.show_pool_total
+        show_pools = self.snapshot.show_pools
         selection = self.selection
 
         # Make the lowest odds horse other_horse, or the next-lowest
         # if this bet is already targetting it, so the remaining pool
         # is large as possible
-        entries_worst = self.entries.copy()
-        entries_worst.sort(key=lambda e: e.show_pool_total)
+        entries_worst = _lowest_pool_entries(show_pools, self.entries, 3)
         other_horse = (
-            entries_worst[0]
-            if not entries_worst[0].id == selection.id
-            else entries_worst[1]
+            entries_worst[0] if not entries_worst[0] == selection else entries_worst[1]
         )
         third_horse = (
-            entries_worst[1]
-            if not entries_worst[0].id == selection.id
-            else entries_worst[2]
+            entries_worst[1] if not entries_worst[0] == selection else entries_worst[2]
         )
 
         # Get remaining pool to be distributed by subtracting 3 show horses from net show pool
         pool_dividend = total_show_pool - (
-            other_horse.show_pool_total
-            + selection.show_pool_total
-            + third_horse.show_pool_total
+            show_pools[other_horse] + show_pools[selection] + show_pools[third_horse]
         )
 
         # 3 winners, since this is show, divide by 3
         pool_split = pool_dividend / 3
 
         # Divide the remaining split among the winners
-        indiv_payout = pool_split / selection.show_pool_total
+        indiv_payout = pool_split / show_pools[selection]
 
         # unit size 1 -> 2 for $2 bets
         indiv_payout *= 2
 
-        return indiv_payout
+        return float(indiv_payout)
 
     def min_bet(self) -> float:
         return sum(b.min_bet() for b in self.bets)
 
     def odds(self) -> float:
-        return self.selection.latest_odds()
+        return float(self.snapshot.odds[self.selection])
 
     def cost(self) -> float:
         return self.strategy.outlay_strategy.outlay(self)
 
     def result(self) -> BetResult:
         return BetResult(
-            race=self.race,
+            race=self.snapshot.race,
             bet_type=self.bet_type,
             bet_strategy_type=self.bet_strategy_type,
-            horses=self.entries,
-            selection=[self.selection],
+            horses=self.snapshot.entries_at(self.entries),
+            selection=[self.snapshot.entries[self.selection]],
             max_reward=self.max_reward(),
             avg_reward=self.avg_reward(),
             min_reward=self.min_reward(),
@@ -727,18 +725,18 @@ class DrZShowBet(ShowBet):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
         super().__init__(
-            race=race, entries=entries, selection=selection, strategy=strategy
+            snapshot=snapshot, entries=entries, selection=selection, strategy=strategy
         )
         self.bet_strategy_type = BetStrategyType.BOOK_DR_Z_SHOW_BET
 
     def expected_show_val_per_dollar(self) -> float:
-        return get_expected_show_val_per_dollar(self.race, self.selection)
+        return float(self.snapshot.show_evs[self.selection])
 
     def avg_reward(self) -> float:
         return self.expected_show_val_per_dollar() * self.outlay()
@@ -748,15 +746,15 @@ class DrZPlaceShowArbBet(BetTypeImpl):
     def __init__(
         self,
         *,
-        race: Race,
-        entries: List[RaceEntry],
-        selection: List[RaceEntry],
+        snapshot: RaceSnapshot,
+        entries: Sequence[int],
+        selection: Sequence[int],
         strategy: BetStrategy,
     ) -> None:
-        self.race: Race = race
-        self.entries: List[RaceEntry] = entries
+        self.snapshot: RaceSnapshot = snapshot
+        self.entries: Sequence[int] = entries
         self.strategy: BetStrategy = strategy
-        self.selection: List[RaceEntry] = selection
+        self.selection: Sequence[int] = selection
         self.bet_type: BetType = BetType.PLACE_SHOW_ARB
         self.bet_strategy_type: BetStrategyType = BetStrategyType.BOOK_DR_Z_PLACE_SHOW_ARB
 
@@ -767,15 +765,8 @@ class DrZPlaceShowArbBet(BetTypeImpl):
         self,
     ) -> Tuple[Dict[int, BetTypeImpl], Dict[int, BetTypeImpl]]:
         """Generates all place and show bets where the expected return is greater than 1."""
-        place_entries: List[RaceEntry] = []
-        show_entries: List[RaceEntry] = []
-
-        for entry in self.race.entries:
-            if get_expected_place_val_per_dollar(self.race, entry) > 1.18:
-                place_entries.append(entry)
-
-            if get_expected_show_val_per_dollar(self.race, entry) > 1.18:
-                show_entries.append(entry)
+        place_entries = np.flatnonzero(self.snapshot.place_evs > 1.18)
+        show_entries = np.flatnonzero(self.snapshot.show_evs > 1.18)
 
         place_results: Dict[int, BetTypeImpl] = {}
         show_results: Dict[int, BetTypeImpl] = {}
@@ -783,30 +774,30 @@ class DrZPlaceShowArbBet(BetTypeImpl):
         # TODO - revisit varying outlay by bet strength (expected return)
         for entry in place_entries:
             bet = DrZPlaceBet(
-                race=self.race,
+                snapshot=self.snapshot,
                 entries=self.entries,
                 selection=[entry],
                 strategy=self.strategy,
             )
             if bet.effective_proba() > (1 / 8):
-                place_results[entry.id] = bet
+                place_results[int(entry)] = bet
 
         for entry in show_entries:
             bet = DrZShowBet(
-                race=self.race,
+                snapshot=self.snapshot,
                 entries=self.entries,
                 selection=[entry],
                 strategy=self.strategy,
             )
             if bet.effective_proba() > (1 / 8):
-                show_results[entry.id] = bet
+                show_results[int(entry)] = bet
 
         return (place_results, show_results)
 
     def min_reward(self) -> float:
         # If not at least one show or one place bet per entry, the min is 0
         for entry in self.entries:
-            if not self.place_bets.get(entry.id) and not self.show_bets.get(entry.id):
+            if not self.place_bets.get(entry) and not self.show_bets.get(entry):
                 return 0
 
         return min(b.max_reward() for b in self.bets)
@@ -848,7 +839,7 @@ class DrZPlaceShowArbBet(BetTypeImpl):
 
     def result(self) -> MultiBetResult:
         return MultiBetResult(
-            race=self.race,
+            race=self.snapshot.race,
             bet_type=self.bet_type,
             bet_strategy_type=self.bet_strategy_type,
             bet_results=[b.result() for b in self.bets],
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -15,9 +15,12 @@ class BetTagger:
     listed in the `bet_tags` table, and conditions of a `Bet`s attributes.
     """
 
-    def __init__(self, db: Session) -> None:
+    def __init__(
+        self, db: Optional[Session], *, tag_map: Optional[Dict[str, BetTag]] = None
+    ) -> None:
         self.db = db
-        self.tag_map = self.get_db_tags()
+        # Tags may be given up front, e.g. when tagging outside of a db session
+        self.tag_map = tag_map if tag_map is not None else self.get_db_tags()
 
     def get_db_tags(self) -> Dict[str, BetTag]:
         """Creates a mapping of tag names to `BetTag` instances in the db."""
@@ -1,5 +1,7 @@
 # The following are based on Dr. Z's model-derived estimation formulas
 
+import numpy as np
+
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
 
@@ -34,3 +36,53 @@ def get_expected_show_val_per_dollar(
     result_payback_adj = (3.60 + (2.13 * (W_i / W))) * (Q - track_payback)
 
     return result + result_payback_adj
+
+
+def expected_place_vals_per_dollar(
+    win_pools: np.ndarray,
+    win_pool_total: float,
+    place_pools: np.ndarray,
+    place_pool_total: float,
+    track_payback: float = Q,
+) -> np.ndarray:
+    """
+        Vectorized get_expected_place_val_per_dollar() for all entries at once.
+        Entries with empty pools get nan.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        W_i = win_pools
+        W = win_pool_total
+        P_i = place_pools
+        P = place_pool_total
+
+        result = 0.319 + (0.559 * ((W_i / W) / (P_i / P)))
+        result_payback_adj = (2.22 - (1.29 * (W_i / W))) * (Q - track_payback)
+
+        return _finite_or_nan(result + result_payback_adj)
+
+
+def expected_show_vals_per_dollar(
+    win_pools: np.ndarray,
+    win_pool_total: float,
+    show_pools: np.ndarray,
+    show_pool_total: float,
+    track_payback: float = Q,
+) -> np.ndarray:
+    """
+        Vectorized get_expected_show_val_per_dollar() for all entries at once.
+        Entries with empty pools get nan.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        W_i = win_pools
+        W = win_pool_total
+        S_i = show_pools
+        S = show_pool_total
+
+        result = 0.543 + (0.369 * ((W_i / W) / (S_i / S)))
+        result_payback_adj = (3.60 + (2.13 * (W_i / W))) * (Q - track_payback)
+
+        return _finite_or_nan(result + result_payback_adj)
+
+
+def _finite_or_nan(values: np.ndarray) -> np.ndarray:
+    return np.where(np.isfinite(values), values, np.nan)
@@ -2,8 +2,9 @@ import logging
 from itertools import combinations
 from typing import List
 
+import numpy as np
+
 from app.models.race import Race
-from app.models.race_entry import RaceEntry
 
 from .bet_strategies import (
     AvgCostRewardSortStrategy,
@@ -16,6 +17,7 @@ from .bet_strategies import (
     WinAllArbBet,
     WinBoxArbBet,
 )
+from .race_snapshot import RaceSnapshot
 
 DefaultBetStrategy = BetStrategy(
     outlay_strategy=FlatBetOutlayStrategy(), sort_strategy=AvgCostRewardSortStrategy(),
@@ -36,8 +38,12 @@ class BetGen:
         self.strategy = strategy
         self.use_pool_totals = use_pool_totals
 
-    def active_entries(self) -> List[RaceEntry]:
-        return [entry for entry in self.race.entries if not entry.scratched]
+        # Bet evaluation only reads from the snapshot, never the ORM race
+        self.snapshot = RaceSnapshot.from_race(race)
+
+    def active_entries(self) -> np.ndarray:
+        """Indices of the entries in the snapshot that are not scratched."""
+        return self.snapshot.active
 
     def all_bets(self) -> List[BetTypeImpl]:
         # There shouldn't be a race with all scratches,
@@ -50,7 +56,9 @@ class BetGen:
     def arbitrage_bets(self) -> List[BetTypeImpl]:
         result = [
             WinAllArbBet(
-                race=self.race, entries=self.active_entries(), strategy=self.strategy
+                snapshot=self.snapshot,
+                entries=self.active_entries(),
+                strategy=self.strategy,
             ),
         ]
 
@@ -62,46 +70,41 @@ class BetGen:
 
     def dr_z_bets(self) -> List[BetTypeImpl]:
         result: List[BetTypeImpl] = []
+        snapshot = self.snapshot
+        active = self.active_entries()
 
         # Generate Arb. bets
         ps_arb_bet = DrZPlaceShowArbBet(
-            race=self.race,
-            entries=self.active_entries(),
-            selection=self.active_entries(),
-            strategy=self.strategy,
+            snapshot=snapshot, entries=active, selection=active, strategy=self.strategy,
         )
 
         if len(ps_arb_bet.bets) > 1:
             result.append(ps_arb_bet)
 
-        # Generate individual place/show bets, and append if expected value > limit
-        place_bets: List[BetTypeImpl] = []
-        show_bets: List[BetTypeImpl] = []
+        # Generate individual place/show bets where expected value > limit,
+        # using Dr. Z recommended value limits (could vary by track/race)
+        likely = snapshot.effective_probas(snapshot.odds)[active] > (1 / 8)
+        place_entries = active[(snapshot.place_evs[active] > 1.18) & likely]
+        show_entries = active[(snapshot.show_evs[active] > 1.18) & likely]
 
-        for entry in self.active_entries():
-            place_bet = DrZPlaceBet(
-                race=self.race,
-                entries=self.active_entries(),
+        place_bets: List[BetTypeImpl] = [
+            DrZPlaceBet(
+                snapshot=snapshot,
+                entries=active,
                 selection=[entry],
                 strategy=self.strategy,
             )
-            show_bet = DrZShowBet(
-                race=self.race,
-                entries=self.active_entries(),
+            for entry in place_entries
+        ]
+        show_bets: List[BetTypeImpl] = [
+            DrZShowBet(
+                snapshot=snapshot,
+                entries=active,
                 selection=[entry],
                 strategy=self.strategy,
             )
-
-            # Use Dr. Z recommended value limits (could vary by track/race)
-            if place_bet.expected_place_val_per_dollar() > 1.18 and place_bet.effective_proba() > (
-                1 / 8
-            ):
-                place_bets.append(place_bet)
-
-            if show_bet.expected_show_val_per_dollar() > 1.18 and show_bet.effective_proba() > (
-                1 / 8
-            ):
-                show_bets.append(show_bet)
+            for entry in show_entries
+        ]
 
         result.extend(place_bets + show_bets)
 
@@ -130,14 +133,14 @@ class BetGen:
         bets = []
         gen_ct = min_depth
 
-        while gen_ct <= len(self.race.entries) and gen_ct <= max_depth:
-            combs = combinations(self.race.entries, gen_ct)
+        while gen_ct <= len(self.snapshot.entries) and gen_ct <= max_depth:
+            combs = combinations(range(len(self.snapshot.entries)), gen_ct)
             gen_ct += 1
 
             for comb in combs:
                 bets.append(
                     WinBoxArbBet(
-                        race=self.race,
+                        snapshot=self.snapshot,
                         entries=self.active_entries(),
                         selection=comb,
                         strategy=self.strategy,
@@ -0,0 +1,75 @@
+# Vectorized pari-mutuel pool math for place/show bets.
+#
+# The average rewards here are closed-form equivalents of averaging
+# calc_place_reward_redux() over permutations(entries, 2), and
+# calc_show_reward() over permutations(entries, 3), computed for all
+# entries at once.
+
+from typing import Iterable
+
+import numpy as np
+
+from app.models.race_entry import RaceEntry
+
+
+def entry_pools(entries: Iterable[RaceEntry], pool: str) -> np.ndarray:
+    """
+        Get the given pool ("win", "place" or "show") total for each
+        of the given entries as an array.
+    """
+    attr = f"{pool}_pool_total"
+
+    return np.array([getattr(entry, attr) for entry in entries], dtype=np.float64)
+
+
+def avg_place_rewards(place_pools: np.ndarray, place_pool_total: float) -> np.ndarray:
+    """
+        Average place reward for each entry, over every other entry it
+        could place with. For entry i with place pool p_i, among n entries
+        whose place pools sum to S:
+
+            mean_j((P - p_j) / p_i) - 1 = (P - (S - p_i) / (n - 1)) / p_i - 1
+    """
+    n = len(place_pools)
+
+    if n < 2:
+        return np.zeros(n)
+
+    others_mean = (place_pools.sum() - place_pools) / (n - 1)
+
+    return (place_pool_total - others_mean) / place_pools - 1
+
+
+def avg_place_reward(place_pools: np.ndarray, place_pool_total: float) -> float:
+    """Average place reward over all ordered pairs of entries."""
+    if len(place_pools) < 2:
+        return 0.0
+
+    return float(avg_place_rewards(place_pools, place_pool_total).mean())
+
+
+def avg_show_rewards(show_pools: np.ndarray, show_pool_total: float) -> np.ndarray:
+    """
+        Average $2 show reward for each entry, over every ordered pair of
+        other entries it could show with. For entry i with show pool s_i,
+        among n entries whose show pools sum to S:
+
+            mean_jk(2 (T - s_i - s_j - s_k) / (3 s_i))
+                = 2 (T - s_i - 2 (S - s_i) / (n - 1)) / (3 s_i)
+    """
+    n = len(show_pools)
+
+    if n < 3:
+        return np.zeros(n)
+
+    others_mean = (show_pools.sum() - show_pools) / (n - 1)
+
+    return 2 * (show_pool_total - show_pools - 2 * others_mean) / (3 * show_pools)
+
+
+def avg_show_reward(show_pools: np.ndarray, show_pool_total: float) -> float:
+    """Average show reward over all ordered triples of entries."""
+    if len(show_pools) < 3:
+        return 0.0
+
+    return float(avg_show_rewards(show_pools, show_pool_total).mean())
@@ -0,0 +1,124 @@
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models.race import Race
+from app.models.race_entry import RaceEntry
+from app.raceday.bet_strategy.dr_z_eq import (
+    expected_place_vals_per_dollar,
+    expected_show_vals_per_dollar,
+)
+from app.raceday.bet_strategy.pool_math import (
+    avg_place_reward,
+    avg_show_reward,
+    entry_pools,
+)
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+def _odds_array(odds: Iterable[Optional[float]]) -> np.ndarray:
+    # Missing odds are treated as 0, matching `latest_odds() or 0`
+    return np.array([o or 0 for o in odds], dtype=np.float64)
+
+
+class RaceSnapshot(NamedTuple):
+    """
+    Immutable, array-backed view of a race and its entries, built once per
+    refresh for the bet strategy engine.
+
+    Entries are referred to by their index in `entries`. Per-entry values are
+    stored as read-only NumPy arrays so that bet evaluation never reads ORM
+    attributes; the `race` and `entries` ORM objects are only kept so bet
+    results can be converted back to `Bet`s.
+    """
+
+    race: Race
+    entries: Tuple[RaceEntry, ...]
+
+    odds: np.ndarray
+    predicted_odds: np.ndarray
+    win_pools: np.ndarray
+    place_pools: np.ndarray
+    show_pools: np.ndarray
+    scratched: np.ndarray
+    # Indices of entries that are not scratched
+    active: np.ndarray
+
+    win_pool_total: float
+    place_pool_total: float
+    show_pool_total: float
+
+    # Dr. Z expected value per dollar, for every entry
+    place_evs: np.ndarray
+    show_evs: np.ndarray
+
+    # Average rewards over all entries, see calc_avg_place/show_reward()
+    avg_place_reward: float
+    avg_show_reward: float
+
+    @classmethod
+    def from_race(cls, race: Race) -> "RaceSnapshot":
+        entries: Tuple[RaceEntry, ...] = tuple(race.entries)
+
+        odds = _odds_array(e.latest_odds() for e in entries)
+        predicted_odds = _odds_array(e.predicted_odds for e in entries)
+        win_pools = entry_pools(entries, "win")
+        place_pools = entry_pools(entries, "place")
+        show_pools = entry_pools(entries, "show")
+        scratched = np.array([bool(e.scratched) for e in entries], dtype=bool)
+        active = np.flatnonzero(~scratched)
+
+        # Pool totals are unset until pool totals have been ingested
+        win_pool_total = race.win_pool_total or 0
+        place_pool_total = race.place_pool_total or 0
+        show_pool_total = race.show_pool_total or 0
+
+        place_evs = expected_place_vals_per_dollar(
+            win_pools, win_pool_total, place_pools, place_pool_total
+        )
+        show_evs = expected_show_vals_per_dollar(
+            win_pools, win_pool_total, show_pools, show_pool_total
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_place = avg_place_reward(place_pools, place_pool_total)
+            avg_show = avg_show_reward(show_pools, show_pool_total)
+
+        return cls(
+            race=race,
+            entries=entries,
+            odds=_read_only(odds),
+            predicted_odds=_read_only(predicted_odds),
+            win_pools=_read_only(win_pools),
+            place_pools=_read_only(place_pools),
+            show_pools=_read_only(show_pools),
+            scratched=_read_only(scratched),
+            active=_read_only(active),
+            win_pool_total=win_pool_total,
+            place_pool_total=place_pool_total,
+            show_pool_total=show_pool_total,
+            place_evs=_read_only(place_evs),
+            show_evs=_read_only(show_evs),
+            avg_place_reward=avg_place,
+            avg_show_reward=avg_show,
+        )
+
+    def __repr__(self) -> str:
+        return "<RaceSnapshot(race=%s, entries=%d, active=%d)>" % (
+            self.race,
+            len(self.entries),
+            len(self.active),
+        )
+
+    def entries_at(self, indices: Iterable[int]) -> List[RaceEntry]:
+        """Get the ORM entries at the given indices."""
+        return [self.entries[i] for i in indices]
+
+    def effective_probas(self, odds: np.ndarray) -> np.ndarray:
+        """1 / odds for each entry, or 0 where odds are missing."""
+        with np.errstate(divide="ignore"):
+            return np.where(odds > 0, 1 / odds, 0)
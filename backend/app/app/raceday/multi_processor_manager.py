@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
 from app.models.race import Race
+from app.raceday.bet_processor import delete_orphaned_multi_bets
 from app.raceday.processor import RaceDayProcessor
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,8 @@ class RaceDayProcessorManager:
         for race in all_races:
             self.db.delete(race)
 
+        self.db.flush()
+        delete_orphaned_multi_bets(self.db)
         self.db.commit()
 
     def run_db_sweeper(self, procs: List[RaceDayProcessor]) -> None:
@@ -62,6 +65,8 @@ class RaceDayProcessorManager:
             for race in races:
                 self.db.delete(race)
 
+            self.db.flush()
+            delete_orphaned_multi_bets(self.db)
             self.db.commit()
 
             sleep(30)
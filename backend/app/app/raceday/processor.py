@@ -1,13 +1,19 @@
+import concurrent.futures
 import logging
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from time import sleep
-from typing import Dict, List, Optional
+from time import perf_counter, sleep
+from typing import Dict, Generator, List, Optional
 
+import sqlalchemy
 from pydantic import BaseModel
+from sqlalchemy import Float, Integer
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.config import settings
+from app.crud.bet_feed import publish_bet_feed_snapshots
 from app.lib.clients.demo_live_racing_client import DemoLiveRacingClient
 from app.lib.clients.live_abstract import AbstractLiveRacingClient
 from app.lib.crawlers.live_racing import LiveRacingCrawler, LiveRacingCrawlerException
@@ -16,43 +22,24 @@ from app.lib.schemas.live_racing import (
     StarterDetails,
     TrackWithRaceDetails,
 )
-from app.ml.predictor.race_predictor import RacePredictor
+from app.ml.predictor.race_predictor import RacePredictor, RacePredictResult
 from app.models.bet import Bet
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
-from app.raceday.bet_processor import RaceBetProcessor
+from app.raceday.bet_processor import RaceBetProcessor, delete_orphaned_multi_bets
 from app.raceday.bet_strategy.bet_strategies import BetTypeImpl
 from app.raceday.processor_logger import RaceDayProcessorLogger
-from app.raceday.processor_result import ProcessOnceResult
+from app.raceday.processor_result import (
+    ProcessOnceResult,
+    RefreshStageTimings,
+    ShallowIngestResult,
+)
 from app.raceday.race_canonical import LiveRaceEntryCanonical, LiveTrackBasicCanonical
+from app.raceday.race_scheduler import RaceWatcher, RaceWatcherScheduler
 
 logger = logging.getLogger(__name__)
 
 
-class RaceWatcher(BaseModel):
-    race_id: int
-    race_md5: str
-    post_time: datetime
-    next_check_time: datetime
-
-    def __repr__(self):
-        """String repr of RaceWatcher."""
-        return "<RaceWatcher(race_id=%s, post_time=%s, next_check_time=%s)>" % (
-            self.race_id,
-            self.post_time,
-            self.next_check_time,
-        )
-
-    @classmethod
-    def from_race(cls, race: Race, nct: datetime) -> "RaceWatcher":
-        return cls(
-            race_id=race.id,
-            race_md5=race.md5_hash().hexdigest(),
-            post_time=race.post_time,
-            next_check_time=nct,
-        )
-
-
 class TimeContext(BaseModel):
     now: datetime
     lookahead_start: datetime
@@ -72,6 +59,13 @@ class TimeContext(BaseModel):
         )
 
 
+class RaceFetchResult(BaseModel):
+    """Live data fetched for a single race; entries is None if the fetch failed."""
+
+    entries: Optional[List[StarterDetails]] = None
+    pool_totals: Optional[RacePoolTotals] = None
+
+
 class NextCheckGen(ABC):
     def __init__(self) -> None:
         super().__init__()
@@ -133,8 +127,10 @@ class RaceDayProcessor:
         race_refresh_interval: timedelta = timedelta(days=0, minutes=10),
         next_check_gen: NextCheckGen = DefaultNextCheckGen(),
         max_sleep_secs: float = float(settings.MAX_SLEEP_TIME_SECS),
+        min_sleep_secs: float = 1,
         max_bets_per_race: int = 1000,
         resilient: bool = True,
+        refresh_workers: int = settings.RACE_REFRESH_WORKERS,
         live_racing_client: AbstractLiveRacingClient = DemoLiveRacingClient(),
     ) -> None:
         self.db: Session = db
@@ -144,12 +140,14 @@ class RaceDayProcessor:
         self.race_refresh_interval: timedelta = race_refresh_interval
         self.next_check_gen: NextCheckGen = next_check_gen
         self.max_sleep_secs: float = max_sleep_secs
+        self.min_sleep_secs: float = min_sleep_secs
         self.enabled_track_codes: List[str] = enabled_track_codes
         self.max_bets_per_race: int = max_bets_per_race
         self.resilient: bool = resilient
+        self.refresh_workers: int = refresh_workers
 
-        # Map of race md5 -> RaceWatcher
-        self.watching_races: Dict[str, RaceWatcher] = {}
+        # Race id -> RaceWatcher, ordered by next_check_time
+        self.watching_races: RaceWatcherScheduler = RaceWatcherScheduler()
 
         self.live_race_client: AbstractLiveRacingClient = live_racing_client
         self.live_race_crawler = LiveRacingCrawler(self.live_race_client)
@@ -181,19 +179,14 @@ class RaceDayProcessor:
                     [],
                     datetime.now(timezone.utc) + timedelta(seconds=self.max_sleep_secs),
                     False,
+                    self.race_predictor.model_version,
                 )
                 self._log_and_sleep(self.max_sleep_secs)
                 continue
 
-            # Sleep for either the max_sleep time or the soonest nct,
-            # whichever is smallest
-            sleep_time = min(self.max_sleep_secs, proc_result.next_check_secs)
-
-            if sleep_time < 0:
-                logger.error(
-                    "Something went wrong - sleep_time is negative (%d)", sleep_time
-                )
-                sleep_time = self.max_sleep_secs
+            # Sleep until the soonest nct (as of now, rather than the start of
+            # the cycle), bounded by the max_sleep time
+            sleep_time = self._secs_until_next_check()
 
             self._log_complete(
                 time_context,
@@ -201,6 +194,7 @@ class RaceDayProcessor:
                 proc_result.bets,
                 datetime.now(timezone.utc) + timedelta(seconds=sleep_time),
                 True,
+                proc_result.model_version or self.race_predictor.model_version,
             )
             self._log_and_sleep(sleep_time)
 
@@ -222,72 +216,91 @@ class RaceDayProcessor:
         result_ncs: float = 0
 
         try:
-            self._ingest_races_shallow(time_context)
+            shallow_result = self._ingest_races_shallow(time_context)
         except LiveRacingCrawlerException:
             raise FailedRaceListIngestException
 
         self._remove_expired_watchers(time_context)
-        upcoming_races = self._get_races_in_time_context(time_context)
-        races_to_refresh = self._get_races_to_refresh(upcoming_races, time_context)
+        races_to_refresh = self._get_races_to_refresh(time_context)
 
         logger.info(f"{len(races_to_refresh)} races to refresh...")
 
-        for race in races_to_refresh:
-            logger.debug("Refreshing race entries for %s", race)
+        timings = RefreshStageTimings()
 
-            try:
-                self._ingest_race_entries(race)
-            except LiveRacingCrawlerException:
-                logger.exception(
-                    "Failed to ingest race entries for %s", race, stack_info=True
-                )
+        with self._stage_timer(timings, "fetch"):
+            fetch_results = self._fetch_races_data(races_to_refresh)
 
-                self._del_watcher(race)
-
-                if not self.resilient:
-                    raise FailedRaceEntryIngestException
+        # Race id -> whether pool totals were ingested for the race
+        races_use_pool_totals: Dict[int, bool] = {}
 
+        for (race, fetched) in zip(races_to_refresh, fetch_results):
+            if fetched.entries is None:
+                self._del_watcher(race)
                 continue
 
             use_pool_totals = False
 
-            try:
-                if race.current_race:
-                    logger.debug("Refreshing pool totals for %s", race)
-                    self._ingest_race_pool_totals(race)
+            with self._stage_timer(timings, "write"):
+                self._ingest_race_entries(race, fetched.entries)
+
+                if fetched.pool_totals is not None:
+                    self._ingest_race_pool_totals(race, fetched.pool_totals)
                     use_pool_totals = True
-            except LiveRacingCrawlerException:
-                logger.exception(
-                    "Failed to ingest race pool totals for %s", race, stack_info=True
-                )
 
             result_races.append(race)
+            races_use_pool_totals[race.id] = use_pool_totals
 
             self._update_watcher(race, time_context)
 
-            logger.debug("Regenerating predictions for race %s", race)
-            self._refresh_race_predictions(race)
+        # Predict all refreshed races at once, before generating their bets
+        model_version = self._refresh_race_predictions(result_races, timings)
 
+        for race in result_races:
             logger.debug("Regenerating bets for race %s", race)
             race_bet_proc = RaceBetProcessor(
                 self.db,
                 race,
-                use_pool_totals=use_pool_totals,
+                use_pool_totals=races_use_pool_totals[race.id],
                 max_bets=self.max_bets_per_race,
             )
 
-            created_bets = race_bet_proc.create_bets()
+            with self._stage_timer(timings, "compute"):
+                generated_bets = race_bet_proc.regenerate_bets()
+
+            with self._stage_timer(timings, "write"):
+                created_bets = race_bet_proc.save_bets(generated_bets)
+
             result_bets.extend(created_bets)
 
+        # Expired watchers and reconciliation can leave multi-bets without
+        # sub-bets; sweep them once per cycle
+        with self._stage_timer(timings, "write"):
+            orphans_deleted = delete_orphaned_multi_bets(self.db)
+            self.db.commit()
+
+        logger.info("Race refresh stage timings - %s", timings)
+
         min_nct = self._get_min_watcher_nct()
         result_ncs = (min_nct - time_context.now).total_seconds()
 
         return ProcessOnceResult(
-            next_check_secs=result_ncs, races=result_races, bets=result_bets
+            next_check_secs=result_ncs,
+            races=result_races,
+            bets=result_bets,
+            shallow_ingest=shallow_result,
+            stage_timings=timings,
+            orphaned_multi_bets_deleted=orphans_deleted,
+            model_version=model_version,
         )
 
-    def _ingest_races_shallow(self, time_context: TimeContext) -> None:
-        """Ingest all races (without entries) for the given time."""
+    def _ingest_races_shallow(self, time_context: TimeContext) -> ShallowIngestResult:
+        """
+            Ingest all races (without entries) for the given time.
+
+            Existing races are looked up with a single query keyed by their md5
+            hashes, updated in memory, and committed together with new races
+            in a single transaction.
+        """
         tracks: List[
             TrackWithRaceDetails
         ] = self.live_race_crawler.get_all_track_races_shallow(
@@ -298,9 +311,10 @@ class RaceDayProcessor:
         for track in tracks:
             races_canon.extend(LiveTrackBasicCanonical(track).convert())
 
-        for race in races_canon:
-            new_race_hash = race.md5_hash().hexdigest()
+        # Map of race md5 -> canonical race, for races this proc should watch
+        races_to_upsert: Dict[str, Race] = {}
 
+        for race in races_canon:
             # If this proc should not watch the race, do nothing.
             # This is in consideration of the fact that multiple rdprocs
             # could be running on different time ranges, they shouldn't
@@ -309,41 +323,75 @@ class RaceDayProcessor:
                 self._del_watcher(race)
                 continue
 
-            maybe_existing_race = (
-                self.db.query(Race).filter(Race.race_md5_hex == new_race_hash).first()
-            )
+            # race_md5_hex is set by the race's hybrid setters on creation
+            races_to_upsert[race.race_md5_hex] = race
 
-            if not maybe_existing_race:
-                self.db.add(race)
-                self.db.commit()
+        result = ShallowIngestResult()
 
-                self._add_watcher(race, time_context)
+        if len(races_to_upsert) < 1:
+            return result
 
-                continue
+        existing_races: Dict[str, Race] = {
+            race.race_md5_hex: race
+            for race in self.db.query(Race)
+            .filter(Race.race_md5_hex.in_(list(races_to_upsert.keys())))
+            .all()
+        }
 
-            existing_race: Race = maybe_existing_race
+        new_races: List[Race] = []
+        updated_races: List[Race] = []
+
+        for (race_hash, race) in races_to_upsert.items():
+            existing_race = existing_races.get(race_hash)
+
+            if existing_race is None:
+                self.db.add(race)
+                new_races.append(race)
+                continue
 
             # If the race already exists in the db, do a shallow update w/
             # the new data.
             existing_race.update_shallow(race)
-            self.db.commit()
 
-            self._update_watcher(existing_race, time_context, refresh_nct=False)
+            if self.db.is_modified(existing_race):
+                result.updated += 1
+            else:
+                result.unchanged += 1
+
+            updated_races.append(existing_race)
+
+        result.inserted = len(new_races)
+
+        # Flush to assign ids to new races, and set watchers before committing
+        # so that the (expired) races aren't reloaded one by one after commit.
+        self.db.flush()
+
+        for race in new_races:
+            self._add_watcher(race, time_context)
+
+        for race in updated_races:
+            self._update_watcher(race, time_context, refresh_nct=False)
+
+        self.db.commit()
+
+        logger.debug("Shallow race ingest complete - %s", result)
+
+        return result
 
     def _remove_expired_watchers(self, time_context: TimeContext) -> None:
         """
             Remove all watchers from watching_races where
             the next_check_time() is outside the time_context.
         """
-        for (hash, watcher) in self.watching_races.copy().items():
+        for (race_key, watcher) in self.watching_races.items():
             nct = self.next_check_gen.get_next_check_time(watcher, time_context)
 
-            race_id = self.watching_races[hash].race_id
+            race_id = watcher.race_id
 
             if nct is not None:
                 continue
 
-            del self.watching_races[hash]
+            del self.watching_races[race_key]
 
             existing_race_bets = (
                 self.db.query(Bet).filter(Bet.race.has(Race.id == race_id)).all()
@@ -354,46 +402,35 @@ class RaceDayProcessor:
 
         self.db.commit()
 
-    def _get_races_in_time_context(self, time_context: TimeContext) -> List[Race]:
-        """Get all races in the active time context."""
-        return (
+    def _get_races_to_refresh(self, time_context: TimeContext) -> List[Race]:
+        """
+            Get races in the active time context whose RaceWatchers are due
+            for a refresh, closest to post first.
+        """
+        due_watchers = self.watching_races.due(time_context.now)
+
+        if len(due_watchers) < 1:
+            return []
+
+        races_to_refresh: List[Race] = (
             self.db.query(Race)
             .filter(
+                Race.id.in_([watcher.race_id for watcher in due_watchers]),
                 Race.post_time >= time_context.lookahead_start,
                 Race.post_time < time_context.lookahead_end,
             )
+            .order_by(Race.post_time)
             .all()
         )
 
-    def _get_races_to_refresh(
-        self, upcoming_races: List[Race], time_context: TimeContext
-    ) -> List[Race]:
-        """
-            Get races that are due for a refresh and
-            update their corresponding RaceWatchers.
-        """
-        races_to_refresh: List[Race] = []
-
-        for race in upcoming_races:
-            race_hash = race.md5_hash().hexdigest()
-
-            if race_hash in self.watching_races:
-                watcher = self.watching_races[race_hash]
+        # Drop watchers for races that no longer exist (or are out of range),
+        # otherwise they would stay due forever
+        refresh_ids = set(race.id for race in races_to_refresh)
 
-                diff: timedelta = (race.post_time - time_context.now)
-
-                if diff <= timedelta(minutes=5) and not (
-                    watcher.next_check_time <= time_context.now
-                ):
-                    logger.error(
-                        "Should refresh %s - (%s to posttime) but nct is %s",
-                        race,
-                        diff,
-                        watcher.next_check_time,
-                    )
-
-                if watcher.next_check_time <= time_context.now:
-                    races_to_refresh.append(race)
+        for watcher in due_watchers:
+            if watcher.race_id not in refresh_ids:
+                logger.debug("Dropping watcher with no refreshable race %s", watcher)
+                self.watching_races.remove(watcher.race_id)
 
         return races_to_refresh
 
@@ -408,32 +445,77 @@ class RaceDayProcessor:
             refresh_interval=self.race_refresh_interval,
         )
 
-    def _refresh_race_predictions(self, race: Race) -> None:
-        result = self.race_predictor.calc_probs(race)
+    def _refresh_race_predictions(
+        self, races: List[Race], timings: RefreshStageTimings
+    ) -> Optional[str]:
+        """
+            Regenerate predicted odds for all given races in one batch.
+            Returns the version of the model used, if any races were given.
+        """
+        if len(races) < 1:
+            return None
 
-        for entry in race.entries:
-            if entry.id in result.entries_probs:
-                entry.predicted_odds = 1 / result.entries_probs[entry.id].win_proba
-                self.db.add(entry)
-            else:
-                logger.debug(
-                    "Failed getting odds for entry %s somehow - %s",
-                    entry,
-                    result.json(),
-                )
+        logger.debug("Regenerating predictions for %d races", len(races))
 
-        self.db.commit()
+        with self._stage_timer(timings, "compute"):
+            predict_results = self.race_predictor.calc_probs_many(races)
+
+        with self._stage_timer(timings, "write"):
+            self._apply_race_predictions(races, predict_results)
+
+        return predict_results[races[0].id].model_version
+
+    def _apply_race_predictions(
+        self, races: List[Race], results: Dict[int, RacePredictResult]
+    ) -> None:
+        """
+            Write the predicted odds of all given races' entries with a single
+            bulk UPDATE, and set them on the loaded entries without marking
+            them as modified. The update is committed along with the races'
+            bets, so entries aren't expired and reloaded before bet generation.
+        """
+        # (entry id, predicted odds)
+        odds_updates: List[tuple] = []
+
+        for race in races:
+            result = results[race.id]
+
+            for entry in race.entries:
+                if entry.id not in result.entries_probs:
+                    logger.debug(
+                        "Failed getting odds for entry %s somehow - %s",
+                        entry,
+                        result.json(),
+                    )
+                    continue
+
+                predicted_odds = 1 / result.entries_probs[entry.id].win_proba
+                odds_updates.append((entry.id, predicted_odds))
+                set_committed_value(entry, "predicted_odds", predicted_odds)
+
+        if len(odds_updates) > 0:
+            self.db.execute(_predicted_odds_update_stmt(odds_updates))
 
     def _get_min_watcher_nct(self) -> datetime:
         """Get the soonest next_check_time from watching_races."""
-        ncts = [v.next_check_time for (k, v) in self.watching_races.items()]
+        min_nct = self.watching_races.peek_next_check_time()
 
-        if len(ncts) < 1:
+        if min_nct is None:
             # TODO: improve on punting problems for 500 weeks
             max_dt = datetime.now(timezone.utc) + timedelta(weeks=500)
             return max_dt.astimezone(tz=timezone.utc)
 
-        return min(ncts)
+        return min_nct
+
+    def _secs_until_next_check(self) -> float:
+        """
+            Get the number of seconds from now until the soonest next_check_time,
+            bounded by min_sleep_secs and max_sleep_secs.
+        """
+        now = datetime.now(timezone.utc)
+        secs = (self._get_min_watcher_nct() - now).total_seconds()
+
+        return max(self.min_sleep_secs, min(self.max_sleep_secs, secs))
 
     def _add_watcher(self, race: Race, time_context: TimeContext) -> None:
         """
@@ -442,15 +524,18 @@ class RaceDayProcessor:
             is true at this point, and that since there was previously no watcher,
             next_check_time should be now.
         """
-        race_hash = race.md5_hash().hexdigest()
-        self.watching_races[race_hash] = RaceWatcher.from_race(race, time_context.now)
+        self.watching_races[race.id] = RaceWatcher.from_race(race, time_context.now)
 
     def _del_watcher(self, race: Race) -> None:
         """Removes a watcher for the given race, if one exists."""
-        race_hash = race.md5_hash().hexdigest()
+        # Races fresh from the crawler have no id yet, fall back to the md5 index
+        if race.id is not None:
+            key = race.id
+        else:
+            key = self.watching_races.key_for_md5(race.identity_key)
 
-        if race_hash in self.watching_races:
-            del self.watching_races[race_hash]
+        if key is not None:
+            self.watching_races.remove(key)
 
     def _update_watcher(
         self, race: Race, time_context: TimeContext, refresh_nct: bool = True
@@ -459,8 +544,7 @@ class RaceDayProcessor:
             Updates watching_races from the given race, or deletes it 
             if next_check_time() falls outside time_context.
         """
-        race_hash = race.md5_hash().hexdigest()
-        watcher = self.watching_races.get(race_hash)
+        watcher = self.watching_races.get(race.id)
 
         if watcher is None:
             logger.error("Called _update_watcher() when none exists for race %s", race)
@@ -472,19 +556,107 @@ class RaceDayProcessor:
             nct = watcher.next_check_time
 
         if nct is None:
-            logger.error()
-            del self.watching_races[race_hash]
+            logger.debug("No next check time for race %s; removing watcher", race)
+            del self.watching_races[race.id]
             return None
 
         updated_watcher = watcher.from_race(race, nct)
 
-        self.watching_races[race_hash] = updated_watcher
+        self.watching_races[race.id] = updated_watcher
+
+    def _fetch_races_data(self, races: List[Race]) -> List[RaceFetchResult]:
+        """
+            Fetch entries (and pool totals, for current races) for each of the
+            given races, using up to `refresh_workers` concurrent requests.
+            Results are returned in the same order as `races`.
+
+            When not resilient, the first race whose entries can't be fetched
+            stops the refresh: fetches not yet started are cancelled, and
+            FailedRaceEntryIngestException is raised once running ones finish.
+        """
+        # Read race attrs up front, the session must not be used across threads
+        fetch_args = [
+            (race.track_code, race.race_number, race.race_type, race.current_race)
+            for race in races
+        ]
+
+        if self.refresh_workers <= 1 or len(fetch_args) <= 1:
+            results: List[RaceFetchResult] = []
+
+            for (race, args) in zip(races, fetch_args):
+                results.append(self._fetch_race_data(*args))
+                self._check_fetch_result(race, results[-1])
+
+            return results
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.refresh_workers
+        ) as executor:
+            futures = [
+                executor.submit(self._fetch_race_data, *args) for args in fetch_args
+            ]
+            race_futures = dict(zip(futures, races))
+
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    self._check_fetch_result(race_futures[future], future.result())
+            except FailedRaceEntryIngestException:
+                for future in futures:
+                    future.cancel()
+
+                raise
+
+            return [future.result() for future in futures]
+
+    def _check_fetch_result(self, race: Race, result: RaceFetchResult) -> None:
+        if result.entries is None and not self.resilient:
+            self._del_watcher(race)
+            raise FailedRaceEntryIngestException
+
+    def _fetch_race_data(
+        self, track_code: str, race_number: int, race_type: str, current_race: bool
+    ) -> RaceFetchResult:
+        """Fetch the entries and pool totals for a single race."""
+        result = RaceFetchResult()
+
+        logger.debug("Refreshing race entries for %s-%s", track_code, race_number)
+
+        try:
+            result.entries = self.live_race_crawler.get_race_entries(
+                track_code, race_number, race_type
+            )
+        except LiveRacingCrawlerException:
+            logger.exception(
+                "Failed to ingest race entries for %s-%s",
+                track_code,
+                race_number,
+                stack_info=True,
+            )
+            return result
+
+        if not current_race:
+            return result
+
+        logger.debug("Refreshing pool totals for %s-%s", track_code, race_number)
+
+        try:
+            result.pool_totals = self.live_race_crawler.get_race_pool_totals(
+                track_code, race_number, race_type
+            )
+        except LiveRacingCrawlerException:
+            logger.exception(
+                "Failed to ingest race pool totals for %s-%s",
+                track_code,
+                race_number,
+                stack_info=True,
+            )
+
+        return result
 
-    def _ingest_race_entries(self, race: Race) -> None:
+    def _ingest_race_entries(
+        self, race: Race, race_entries: List[StarterDetails]
+    ) -> None:
         """Refresh the list of entries for the given race."""
-        race_entries: List[StarterDetails] = self.live_race_crawler.get_race_entries(
-            race.track_code, race.race_number, race.race_type
-        )
         entries_canon: List[RaceEntry] = [
             LiveRaceEntryCanonical(entry).convert() for entry in race_entries
         ]
@@ -515,12 +687,8 @@ class RaceDayProcessor:
 
         self.db.commit()
 
-    def _ingest_race_pool_totals(self, race: Race) -> RacePoolTotals:
+    def _ingest_race_pool_totals(self, race: Race, pool_totals: RacePoolTotals) -> None:
         """Refresh the race pool totals for the given race."""
-        pool_totals = self.live_race_crawler.get_race_pool_totals(
-            race.track_code, race.race_number, race.race_type
-        )
-
         race.win_pool_total = pool_totals.win_total
         race.place_pool_total = pool_totals.place_total
         race.show_pool_total = pool_totals.show_total
@@ -553,9 +721,19 @@ class RaceDayProcessor:
 
         return True
 
+    @contextmanager
+    def _stage_timer(self, timings: RefreshStageTimings, stage: str) -> Generator:
+        """Add the wall time spent in the wrapped block to the given stage."""
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            timings.add(stage, perf_counter() - start)
+
     def _log_and_sleep(self, sleep_time: float) -> None:
         """Log the time to be slept, then sleep."""
-        logger.info("Sleeping %d seconds.", sleep_time)
+        logger.info("Sleeping %.2f seconds.", sleep_time)
         sleep(sleep_time)
 
     def _log_complete(
@@ -565,12 +743,45 @@ class RaceDayProcessor:
         bets: List[Bet],
         next_check_time: datetime,
         success: bool,
+        model_version: Optional[str] = None,
     ):
-        self.proc_logger.log(
+        log_entry = self.proc_logger.log(
             lookahead_start=time_context.lookahead_start,
             lookahead_end=time_context.lookahead_end,
             races=races,
             bets=bets,
             next_check_time=next_check_time,
             success=success,
+            model_version=model_version,
         )
+        self._publish_bet_feed(log_entry.id)
+
+    def _publish_bet_feed(self, refresh_log_id: int) -> None:
+        """
+            Publish the bet feed snapshots served by the API for this cycle. The
+            API queries bets itself while a cycle has none, so a failure here is
+            logged rather than stopping the processor.
+        """
+        try:
+            publish_bet_feed_snapshots(self.db, refresh_log_id)
+        except Exception as e:
+            self.db.rollback()
+            logger.exception(
+                "Failed publishing bet feed snapshots (%s).", e, stack_info=True
+            )
+
+
+def _predicted_odds_update_stmt(rows: List[tuple]) -> sqlalchemy.sql.Update:
+    """UPDATE race_entries SET predicted_odds FROM (VALUES (id, odds), ...) by id."""
+    values = sqlalchemy.values(
+        sqlalchemy.column("id", Integer),
+        sqlalchemy.column("predicted_odds", Float),
+        name="predicted_odds_updates",
+    ).data(rows)
+
+    return (
+        sqlalchemy.update(RaceEntry)
+        .where(RaceEntry.id == values.c.id)
+        .values(predicted_odds=sqlalchemy.cast(values.c.predicted_odds, Float))
+        .execution_options(synchronize_session=False)
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -21,7 +21,8 @@ class RaceDayProcessorLogger:
         bets: List[Bet] = None,
         next_check_time: datetime = None,
         success: bool = False,
-    ):
+        model_version: Optional[str] = None,
+    ) -> RaceDayRefreshLog:
         """Log the given results to the race_day_refresh_log table."""
 
         if races is None or bets is None or next_check_time is None:
@@ -53,7 +54,10 @@ class RaceDayProcessorLogger:
             entry_count=entry_count,
             bet_count=len(bets),
             success=success,
+            model_version=model_version,
         )
 
         self.db.add(log_entry)
         self.db.commit()
+
+        return log_entry
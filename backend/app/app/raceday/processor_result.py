@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -6,10 +6,33 @@ from app.models.bet import Bet
 from app.models.race import Race
 
 
+class ShallowIngestResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+class RefreshStageTimings(BaseModel):
+    """Wall time (in seconds) spent in each stage of a race refresh cycle."""
+
+    fetch_secs: float = 0
+    compute_secs: float = 0
+    write_secs: float = 0
+
+    def add(self, stage: str, secs: float) -> None:
+        field = f"{stage}_secs"
+        setattr(self, field, getattr(self, field) + secs)
+
+
 class ProcessOnceResult(BaseModel):
     next_check_secs: float
     races: List[Race]
     bets: List[Bet]
+    shallow_ingest: Optional[ShallowIngestResult] = None
+    stage_timings: Optional[RefreshStageTimings] = None
+    orphaned_multi_bets_deleted: int = 0
+    # Version of the race model used for this cycle's predictions
+    model_version: Optional[str] = None
 
     class Config:
         arbitrary_types_allowed = True
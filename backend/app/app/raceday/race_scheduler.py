@@ -0,0 +1,172 @@
+import heapq
+import itertools
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.models.race import Race  # noqa: F401
+
+
+class RaceWatcher:
+    """Tracks when a watched race should next be refreshed."""
+
+    __slots__ = ("race_id", "race_md5", "post_time", "next_check_time")
+
+    def __init__(
+        self,
+        *,
+        race_id: int,
+        race_md5: str,
+        post_time: datetime,
+        next_check_time: datetime,
+    ) -> None:
+        self.race_id = race_id
+        self.race_md5 = race_md5
+        self.post_time = post_time
+        self.next_check_time = next_check_time
+
+    def __repr__(self):
+        """String repr of RaceWatcher."""
+        return "<RaceWatcher(race_id=%s, post_time=%s, next_check_time=%s)>" % (
+            self.race_id,
+            self.post_time,
+            self.next_check_time,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RaceWatcher):
+            return NotImplemented
+
+        return all(
+            getattr(self, attr) == getattr(other, attr) for attr in self.__slots__
+        )
+
+    @classmethod
+    def from_race(cls, race: "Race", nct: datetime) -> "RaceWatcher":
+        return cls(
+            race_id=race.id,
+            race_md5=race.identity_key,
+            post_time=race.post_time,
+            next_check_time=nct,
+        )
+
+
+# Heap entry: [next_check_time, insertion seq, key]; key is None once removed
+_HeapEntry = List
+
+
+class RaceWatcherScheduler:
+    """
+    Keeps `RaceWatcher`s in a priority queue ordered by `next_check_time`.
+
+    Supports dict-style access by race id, lookup by race md5, O(log n)
+    insert/update, O(1) removal (entries are invalidated in place and dropped
+    lazily when they reach the top of the heap), and O(k) lookup of the k
+    watchers that are due.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[_HeapEntry] = []
+        # Map of key -> (watcher, heap entry)
+        self._entries: Dict[int, Tuple[RaceWatcher, _HeapEntry]] = {}
+        # Map of race md5 -> key, for races that have not been persisted
+        self._keys_by_md5: Dict[str, int] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: int) -> RaceWatcher:
+        return self._entries[key][0]
+
+    def __setitem__(self, key: int, watcher: RaceWatcher) -> None:
+        self.push(key, watcher)
+
+    def __delitem__(self, key: int) -> None:
+        if self.remove(key) is None:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._entries.keys()))
+
+    def get(self, key: int) -> Optional[RaceWatcher]:
+        item = self._entries.get(key)
+        return item[0] if item else None
+
+    def key_for_md5(self, race_md5: str) -> Optional[int]:
+        """Get the key of the watcher for the race with the given md5, if any."""
+        return self._keys_by_md5.get(race_md5)
+
+    def keys(self) -> List[int]:
+        return list(self._entries.keys())
+
+    def values(self) -> List[RaceWatcher]:
+        return [watcher for (watcher, _) in self._entries.values()]
+
+    def items(self) -> List[Tuple[int, RaceWatcher]]:
+        return [(key, watcher) for (key, (watcher, _)) in self._entries.items()]
+
+    def push(self, key: int, watcher: RaceWatcher) -> None:
+        """Add a watcher, or replace the existing watcher for the given key."""
+        self.remove(key)
+
+        entry: _HeapEntry = [watcher.next_check_time, next(self._seq), key]
+        self._entries[key] = (watcher, entry)
+        self._keys_by_md5[watcher.race_md5] = key
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, key: int) -> Optional[RaceWatcher]:
+        """Remove and return the watcher for the given key, if one exists."""
+        item = self._entries.pop(key, None)
+
+        if item is None:
+            return None
+
+        (watcher, entry) = item
+        entry[-1] = None
+        self._keys_by_md5.pop(watcher.race_md5, None)
+
+        # Rebuild once stale entries dominate, to keep the heap compact
+        if len(self._heap) > 2 * len(self._entries) + 32:
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
+
+        return watcher
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+
+    def peek_next_check_time(self) -> Optional[datetime]:
+        """Get the soonest next_check_time, or None if there are no watchers."""
+        self._drop_stale()
+
+        if not self._heap:
+            return None
+
+        return self._heap[0][0]
+
+    def due(self, now: datetime) -> List[RaceWatcher]:
+        """Get all watchers with a next_check_time at or before `now`, soonest first."""
+        result: List[_HeapEntry] = []
+        # Due entries form a subtree rooted at the top of the heap
+        to_visit = [0] if self._heap else []
+
+        while to_visit:
+            i = to_visit.pop()
+            entry = self._heap[i]
+
+            if entry[0] > now:
+                continue
+
+            if entry[-1] is not None:
+                result.append(entry)
+
+            to_visit.extend(c for c in (2 * i + 1, 2 * i + 2) if c < len(self._heap))
+
+        result.sort()
+
+        return [self._entries[entry[-1]][0] for entry in result]
@@ -1,4 +1,6 @@
 from .bet_result import (
+    BetFacetCountsResult,
+    BetFeedItem,
     BetGetResponse,
     BetsQueryResponse,
     MultiBetResult,
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -72,18 +72,30 @@ class MultiBetResult(BaseBetResult):
     sub_bets: List[SingleBetResult]
 
 
+class BetFacetCountsResult(BaseModel):
+    # Number of top level bets per value of each filter
+    track_codes: Dict[str, int]
+    bet_types: Dict[str, int]
+    bet_strat_types: Dict[str, int]
+
+
 class BetsQueryResponse(BaseModel):
     single_bets: List[SingleBetResult]
     multi_bets: List[MultiBetResult]
     track_codes: List[str]
     limit: int
     skip: int
+    # Cursor of the next page, to pass as `after`
+    next_cursor: Optional[str] = None
     bet_types: List[str]
     bet_strat_types: List[str]
     all_bet_strat_types: List[str]
     all_bet_types: List[str]
     all_track_codes: List[str]
+    facet_counts: Optional[BetFacetCountsResult] = None
     next_refresh_ts: Optional[int]
+    # Version of the bet feed, to resume the bet stream from
+    feed_version: Optional[int] = None
 
 
 class BetGetResponse(BaseModel):
@@ -92,6 +104,11 @@ class BetGetResponse(BaseModel):
     next_refresh_ts: int
 
 
+class BetFeedItem(BaseModel):
+    data: Union[SingleBetResult, MultiBetResult]
+    result_type: str
+
+
 class BetResultConverter:
     """Provide conversion methods from SA Model schema to serializable result schema."""
 
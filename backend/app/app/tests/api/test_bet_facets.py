@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.api.bet_facets import BetFacetsCache
+from app.core.config import settings
+from app.crud.bet_facets import calc_next_refresh_ts
+from app.models.bet import Bet
+from app.tests.utils.bet import QueryCounter
+from app.tests.utils.refresh_log import add_refresh_log
+
+
+def test_facets_cached_until_new_refresh_log(bets_db) -> None:
+    (engine, new_session) = bets_db
+    db: Session = new_session()
+    cache = BetFacetsCache()
+    next_check_time = datetime.now(timezone.utc) + timedelta(minutes=5)
+    add_refresh_log(db, next_check_time)
+
+    facets = cache.get(db)
+    top_level_bets = db.query(Bet).filter(Bet.parent_id == None).all()  # noqa: E711
+
+    assert facets.all_track_codes == sorted(
+        {bet.race.track_code for bet in db.query(Bet) if bet.race}
+    )
+    assert sum(facets.counts.bet_types.values()) == len(top_level_bets)
+    assert sum(facets.counts.track_codes.values()) == len(
+        [bet for bet in top_level_bets if bet.race]
+    )
+    assert facets.next_check_time == next_check_time
+    assert calc_next_refresh_ts(facets.next_check_time) == (
+        int(next_check_time.timestamp() * 1000)
+        + settings.EXPECTED_PROCESS_TIME_SECS * 1000
+    )
+
+    # Only the refresh log id is checked while there's no new log
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    assert cache.get(db) is facets
+    assert counter.count == 1
+
+    db.query(Bet).filter(Bet.parent_id == None).delete()  # noqa: E711
+    db.commit()
+    assert cache.get(db) is facets
+
+    add_refresh_log(db, next_check_time + timedelta(minutes=5))
+    rebuilt = cache.get(db)
+
+    event.remove(engine, "before_cursor_execute", counter)
+
+    assert rebuilt is not facets
+    assert rebuilt.counts.bet_types == {}
+    assert rebuilt.next_check_time == next_check_time + timedelta(minutes=5)
@@ -0,0 +1,157 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.api.api_v1.endpoints.bets import read_bets
+from app.api.bet_facets import bet_facets_cache
+from app.api.bet_feed import bet_feed_snapshot_cache, etag_matches
+from app.core.config import settings
+from app.crud.bet_facets import build_bet_facets
+from app.crud.bet_feed import (
+    ALL_BETS_SLICE_KEY,
+    DEFAULT_BET_STRAT_TYPES,
+    DEFAULT_BET_TYPES,
+    bet_feed_slice_key,
+    build_bets_query_response,
+    publish_bet_feed_snapshots,
+    strategy_slice_key,
+    track_slice_key,
+)
+from app.models.bet_feed_snapshot import BetFeedSnapshot
+from app.models.raceday_refresh_log import RaceDayRefreshLog
+from app.schemas.bet_result import BetsQueryResponse
+from app.tests.utils.bet import BET_STRAT_TYPES, QueryCounter
+from app.tests.utils.refresh_log import add_refresh_log
+
+
+def get_bets(db: Session, if_none_match: Optional[str] = None, **kwargs):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    params = dict(
+        skip=0,
+        limit=settings.BET_FEED_SNAPSHOT_LIMIT,
+        track_codes=[],
+        bet_strat_types=DEFAULT_BET_STRAT_TYPES,
+        bet_types=DEFAULT_BET_TYPES,
+        after=None,
+    )
+    params.update(kwargs)
+
+    return read_bets(Request({"type": "http", "headers": headers}), db, **params)
+
+
+def latest_refresh_log_id(db: Session) -> int:
+    return db.query(RaceDayRefreshLog.id).order_by(RaceDayRefreshLog.id.desc())[0].id
+
+
+def test_snapshots_served_with_etags(bets_db) -> None:
+    (engine, new_session) = bets_db
+    db: Session = new_session()
+    bet_facets_cache.invalidate()
+    bet_feed_snapshot_cache.invalidate()
+    next_check_time = datetime.now(timezone.utc) + timedelta(minutes=5)
+    add_refresh_log(db, next_check_time)
+    refresh_log_id = latest_refresh_log_id(db)
+
+    snapshots = publish_bet_feed_snapshots(db, refresh_log_id)
+    facets = build_bet_facets(db, refresh_log_id)
+
+    assert {snapshot.slice_key for snapshot in snapshots} == (
+        {ALL_BETS_SLICE_KEY}
+        | {track_slice_key(track_code) for track_code in facets.counts.track_codes}
+        | {strategy_slice_key(str(strat_type)) for strat_type in BET_STRAT_TYPES}
+    )
+
+    response = get_bets(db)
+    live = build_bets_query_response(db, facets, limit=settings.BET_FEED_SNAPSHOT_LIMIT)
+
+    assert isinstance(response, Response)
+    assert response.body == live.json().encode()
+    assert len(json.loads(response.body)["single_bets"]) > 0
+
+    track_code = sorted(facets.counts.track_codes)[0]
+    track_response = get_bets(db, track_codes=[track_code])
+    track_bets = json.loads(track_response.body)["single_bets"]
+
+    assert track_response.headers["etag"] != response.headers["etag"]
+    assert {bet["race"]["track_code"] for bet in track_bets} == {track_code}
+
+    # Polling with the ETag costs one query (the latest refresh log id)
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    not_modified = get_bets(db, if_none_match=response.headers["etag"])
+
+    event.remove(engine, "before_cursor_execute", counter)
+
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert counter.count == 1
+
+    # Queries without a snapshot are answered live
+    assert isinstance(get_bets(db, skip=5), BetsQueryResponse)
+
+    # Until the new cycle publishes its snapshots
+    add_refresh_log(db, next_check_time + timedelta(minutes=5))
+    assert isinstance(get_bets(db), BetsQueryResponse)
+
+    publish_bet_feed_snapshots(db, latest_refresh_log_id(db))
+    republished = get_bets(db, if_none_match=response.headers["etag"])
+
+    assert republished.status_code == 200
+    assert republished.headers["etag"] != response.headers["etag"]
+    assert {
+        refresh_log_id for (refresh_log_id,) in db.query(BetFeedSnapshot.refresh_log_id)
+    } == {latest_refresh_log_id(db)}
+
+    # Nor once their refresh time has passed
+    add_refresh_log(db, datetime.now(timezone.utc) - timedelta(minutes=1))
+    publish_bet_feed_snapshots(db, latest_refresh_log_id(db))
+    db.query(RaceDayRefreshLog).filter(
+        RaceDayRefreshLog.id < latest_refresh_log_id(db)
+    ).delete()
+    db.commit()
+
+    assert isinstance(get_bets(db), BetsQueryResponse)
+
+
+def test_bet_feed_slice_key() -> None:
+    query = dict(
+        skip=0,
+        limit=settings.BET_FEED_SNAPSHOT_LIMIT,
+        after=None,
+        track_codes=[],
+        bet_strat_types=list(reversed(DEFAULT_BET_STRAT_TYPES)),
+        bet_types=DEFAULT_BET_TYPES,
+    )
+    strat_type = DEFAULT_BET_STRAT_TYPES[0]
+
+    assert bet_feed_slice_key(**query) == ALL_BETS_SLICE_KEY
+    assert bet_feed_slice_key(**{**query, "track_codes": ["KEE"]}) == track_slice_key(
+        "KEE"
+    )
+    assert bet_feed_slice_key(
+        **{**query, "bet_strat_types": [strat_type]}
+    ) == strategy_slice_key(strat_type)
+
+    for unpublished in (
+        {"skip": 10},
+        {"limit": 10},
+        {"after": "eyJpZCI6MX0"},
+        {"bet_types": DEFAULT_BET_TYPES[:1]},
+        {"track_codes": ["KEE", "CD"]},
+        {"track_codes": ["KEE"], "bet_strat_types": [strat_type]},
+    ):
+        assert bet_feed_slice_key(**{**query, **unpublished}) is None
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"xyz", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"xyz"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.api.bet_stream import BetFeedFilter, BetFeedStream, delta_message
+from app.models.bet import Bet
+from app.tests.utils.bet import create_bet
+from app.tests.utils.refresh_log import add_refresh_log
+
+
+class FakeRequest:
+    def __init__(self) -> None:
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def parse_message(message: str) -> Tuple[Optional[int], str, dict]:
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    event_id = int(fields["id"]) if "id" in fields else None
+
+    return (event_id, fields["event"], json.loads(fields["data"]))
+
+
+def change_bets(db: Session) -> Tuple[int, int, int]:
+    """Update, remove and add a single bet, returning their ids."""
+    single_bets: List[Bet] = (
+        db.query(Bet)
+        .filter(Bet.parent_id == None, Bet.race_id != None)  # noqa: E711
+        .order_by(Bet.id)
+        .all()
+    )
+    (updated, removed) = single_bets[:2]
+    updated.predicted_odds += 1
+    db.delete(removed)
+
+    added = create_bet(500, updated.race)
+    db.add(added)
+    db.commit()
+
+    return (updated.id, removed.id, added.id)
+
+
+def new_cycle(db: Session, stream: BetFeedStream) -> None:
+    add_refresh_log(db, datetime.now(timezone.utc) + timedelta(minutes=5))
+    assert stream.refresh(db)
+
+
+def test_refresh_diffs_bets_between_cycles(bets_db) -> None:
+    (_, new_session) = bets_db
+    db: Session = new_session()
+    stream = BetFeedStream()
+
+    assert not stream.refresh(db)
+
+    new_cycle(db, stream)
+    first_version = stream.version
+
+    assert stream.deltas_since(first_version) == []
+    assert not stream.refresh(db)
+
+    (updated_id, removed_id, added_id) = change_bets(db)
+    new_cycle(db, stream)
+    [delta] = stream.deltas_since(first_version)
+
+    assert (delta.previous_version, delta.version) == (first_version, stream.version)
+    assert [entry.id for entry in delta.added] == [added_id]
+    assert [entry.id for entry in delta.updated] == [updated_id]
+    assert [entry.id for entry in delta.removed] == [removed_id]
+
+    (_, event, data) = parse_message(delta_message(delta, BetFeedFilter()))
+    [added_item] = data["added"]
+
+    assert event == "bets"
+    assert data["removed"] == [removed_id]
+    assert added_item["result_type"] == "single"
+    assert added_item["data"]["id"] == added_id
+
+    # Changes outside of the filters are left out
+    other_track = BetFeedFilter(track_codes=["none"])
+    (_, _, filtered) = parse_message(delta_message(delta, other_track))
+
+    assert (filtered["added"], filtered["updated"], filtered["removed"]) == (
+        [],
+        [],
+        [],
+    )
+
+    # Deltas older than the ones kept can't be resumed from
+    assert stream.deltas_since(first_version - 1) is None
+    assert stream.deltas_since(None) is None
+
+
+def test_listeners_get_deltas_and_resume(bets_db) -> None:
+    (_, new_session) = bets_db
+    db: Session = new_session()
+
+    async def listen() -> None:
+        stream = BetFeedStream(keepalive_secs=0.01)
+        new_cycle(db, stream)
+        first_version = stream.version
+
+        listener = stream.listen(FakeRequest(), BetFeedFilter())
+        (event_id, event, _) = parse_message(await listener.__anext__())
+
+        assert (event_id, event) == (first_version, "reset")
+        assert await listener.__anext__() == ": keepalive\n\n"
+
+        waiting = asyncio.ensure_future(listener.__anext__())
+        await asyncio.sleep(0)
+
+        (_, _, added_id) = change_bets(db)
+        new_cycle(db, stream)
+        stream.notify()
+        (event_id, event, data) = parse_message(await waiting)
+
+        assert (event_id, event) == (stream.version, "bets")
+        assert [item["data"]["id"] for item in data["added"]] == [added_id]
+        await listener.aclose()
+
+        # Reconnecting from the first version only gets what was missed
+        resumed = stream.listen(FakeRequest(), BetFeedFilter(), resume=first_version)
+
+        assert parse_message(await resumed.__anext__()) == (event_id, event, data)
+        assert await resumed.__anext__() == ": keepalive\n\n"
+        await resumed.aclose()
+
+        unknown = stream.listen(
+            FakeRequest(), BetFeedFilter(), resume=first_version - 1
+        )
+
+        assert parse_message(await unknown.__anext__())[:2] == (
+            stream.version,
+            "reset",
+        )
+        await unknown.aclose()
+
+    asyncio.run(listen())
+
+
+def test_listener_stops_when_disconnected() -> None:
+    async def listen() -> None:
+        stream = BetFeedStream(keepalive_secs=0.01)
+        request = FakeRequest()
+        listener = stream.listen(request, BetFeedFilter())
+
+        assert await listener.__anext__() == ": keepalive\n\n"
+
+        request.disconnected = True
+
+        with pytest.raises(StopAsyncIteration):
+            await listener.__anext__()
+
+    asyncio.run(listen())
@@ -2,11 +2,25 @@ from typing import Dict, Generator
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.base_class import Base
 from app.db.session import SessionLocal
+from app.lib.clients.demo_race_data import (
+    create_starters_n,
+    create_track_with_race_details,
+)
 from app.main import app
+from app.models.bet import Bet, bet_active_entries, bet_inactive_entries, bet_tags
+from app.models.bet_feed_snapshot import BetFeedSnapshot
+from app.models.bet_tag import BetTag
+from app.models.race import Race
+from app.models.race_entry import RaceEntry
+from app.models.raceday_refresh_log import RaceDayRefreshLog
+from app.raceday.race_canonical import LiveRaceEntryCanonical, LiveTrackBasicCanonical
+from app.tests.utils.bet import create_bets
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 
@@ -32,3 +46,40 @@ def normal_user_token_headers(client: TestClient, db: Session) -> Dict[str, str]
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture
+def bets_db() -> Generator:
+    """In memory SQLite db with only the bet tables, so it runs without Postgres."""
+    engine = create_engine("sqlite://")
+    tables = [
+        Race.__table__,
+        RaceEntry.__table__,
+        BetTag.__table__,
+        Bet.__table__,
+        bet_tags,
+        bet_active_entries,
+        bet_inactive_entries,
+        RaceDayRefreshLog.__table__,
+        BetFeedSnapshot.__table__,
+    ]
+    Base.metadata.create_all(engine, tables=tables)
+    db: Session = sessionmaker(bind=engine)()
+
+    track_data = create_track_with_race_details(races_per_track=6)
+    races = LiveTrackBasicCanonical(track_data).convert()
+
+    for race in races:
+        race.entries = [
+            LiveRaceEntryCanonical(entry).convert() for entry in create_starters_n(8)
+        ]
+
+    tags = [BetTag(name="free", description=""), BetTag(name="safe", description="")]
+    db.add_all(races + tags)
+    db.add_all(create_bets(races, tags))
+    db.commit()
+    db.close()
+
+    yield (engine, sessionmaker(bind=engine))
+
+    engine.dispose()
@@ -0,0 +1,101 @@
+from typing import List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.crud.crud_bet import BetCursorException, decode_bet_cursor
+from app.models.bet import Bet
+from app.schemas.bet_result import BetResultConverter
+from app.tests.utils.bet import QueryCounter, create_bet
+
+# Statements to load a page of bets and everything converted from them
+BET_PAGE_QUERIES = 8
+
+
+def convert(bets: List[Bet]) -> List[dict]:
+    bet_conv = BetResultConverter()
+
+    return [
+        bet_conv.create_single_bet_result(bet).dict()
+        if bet.race
+        else bet_conv.create_multi_bet_result(bet).dict()
+        for bet in bets
+    ]
+
+
+def test_bet_page_query_count_is_constant(bets_db) -> None:
+    (engine, new_session) = bets_db
+    counts = []
+
+    for limit in (5, 20, 60):
+        db: Session = new_session()
+        counter = QueryCounter()
+        event.listen(engine, "before_cursor_execute", counter)
+
+        bets = crud.bet.get_multi_filtered(db, limit=limit)
+        results = convert(bets)
+
+        event.remove(engine, "before_cursor_execute", counter)
+        counts.append(counter.count)
+
+        assert len(results) == limit
+        assert any(result.get("sub_bets") for result in results)
+        db.close()
+
+    assert counts == [BET_PAGE_QUERIES] * 3
+
+
+def test_eager_results_match_lazy_loading(bets_db) -> None:
+    (_, new_session) = bets_db
+
+    lazy_db: Session = new_session()
+    lazy_bets = (
+        lazy_db.query(Bet)
+        .filter(Bet.parent_id == None)  # noqa: E711
+        .order_by(Bet.id.desc())
+        .all()
+    )
+
+    eager_db: Session = new_session()
+    eager_bets = crud.bet.get_multi_filtered(eager_db, limit=100)
+
+    assert convert(eager_bets) == convert(lazy_bets)
+
+    multi_bet = next(bet for bet in lazy_bets if not bet.race)
+    counter = QueryCounter()
+    event.listen(eager_db.get_bind(), "before_cursor_execute", counter)
+
+    eager_db.expunge_all()
+    assert convert([crud.bet.get(eager_db, id=multi_bet.id)]) == convert([multi_bet])
+    assert counter.count == BET_PAGE_QUERIES
+
+
+def test_cursor_pages(bets_db) -> None:
+    (_, new_session) = bets_db
+    db: Session = new_session()
+    all_ids = [bet.id for bet in crud.bet.get_multi_filtered(db, limit=100)]
+
+    (page, cursor) = crud.bet.get_page(db, limit=25)
+    ids = [bet.id for bet in page]
+
+    # New bets don't shift the following pages, unlike with skip
+    db.add(create_bet(5000, page[0].race))
+    db.commit()
+
+    while cursor:
+        (page, cursor) = crud.bet.get_page(db, limit=25, after=cursor)
+        ids.extend(bet.id for bet in page)
+
+    assert ids == all_ids
+    assert len(page) == 10
+
+    # skip still pages by offset (shifted by the new bet), and gives a cursor
+    # to carry on from
+    (page, cursor) = crud.bet.get_page(db, skip=50, limit=5)
+    assert [bet.id for bet in page] == all_ids[49:54]
+    assert decode_bet_cursor(cursor) == all_ids[53]
+
+    with pytest.raises(BetCursorException):
+        crud.bet.get_page(db, after="not a cursor")
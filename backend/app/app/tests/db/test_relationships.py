@@ -4,11 +4,15 @@ import pytest
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
+from app.lib.clients.demo_race_data import (
+    create_starters_n,
+    create_track_with_race_details,
+)
 from app.models.bet import Bet
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
+from app.raceday.bet_processor import delete_orphaned_multi_bets
 from app.raceday.race_canonical import LiveRaceEntryCanonical, LiveTrackBasicCanonical
-from app.tests.utils.race_data import create_starters_n, create_track_with_race_details
 from app.tests.utils.utils import random_lower_string
 
 
@@ -64,6 +68,14 @@ def create_multi_bet(race: Race) -> Bet:
     return bet
 
 
+def delete_race(db: Session, race: Race) -> None:
+    """Delete a race the way the processors do, sweeping orphaned multi-bets."""
+    db.delete(race)
+    db.flush()
+    delete_orphaned_multi_bets(db)
+    db.commit()
+
+
 def test_bet_delete_no_delete_entries(clean_db: Session) -> None:
     track_data = create_track_with_race_details()
     races = LiveTrackBasicCanonical(track_data).convert()
@@ -133,8 +145,7 @@ def test_delete_race_deletes_bets(clean_db: Session) -> None:
     bets = clean_db.query(Bet).all()
     assert bets == [bet]
 
-    clean_db.delete(races[0])
-    clean_db.commit()
+    delete_race(clean_db, races[0])
 
     bets = clean_db.query(Bet).all()
     assert bets == []
@@ -148,8 +159,7 @@ def test_delete_race_deletes_bets(clean_db: Session) -> None:
     bets = clean_db.query(Bet).all()
     assert bets == [bet] + bet.sub_bets
 
-    clean_db.delete(races[1])
-    clean_db.commit()
+    delete_race(clean_db, races[1])
 
     bets = clean_db.query(Bet).all()
     assert bets == []
@@ -164,8 +174,7 @@ def test_delete_race_deletes_bets(clean_db: Session) -> None:
     bets = clean_db.query(Bet).all()
     assert bets == [bet] + bet.sub_bets
 
-    clean_db.delete(races[2])
-    clean_db.commit()
+    delete_race(clean_db, races[2])
 
     bets = clean_db.query(Bet).all()
     assert bet.sub_bets[0].race == races[3]
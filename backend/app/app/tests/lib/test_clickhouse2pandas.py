@@ -0,0 +1,219 @@
+import json
+from http.server import ThreadingHTTPServer
+from typing import Iterator, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import app.lib.clickhouse2pandas as ch2pd
+from app.tests.utils.fake_clickhouse import (
+    FakeClickHouseHandler,
+    serve_fake_clickhouse,
+)
+
+NAMES = ["id", "name", "post_time", "odds"]
+TYPES = ["UInt32", "String", "DateTime", "Nullable(Float64)"]
+ROWS = [
+    [
+        i,
+        # Names needing TSV escapes
+        f"horse\t{i}\n" if i % 4 == 0 else f"horse {i}",
+        f"2022-07-{i + 1:02d} 12:00:00",
+        None if i % 3 == 0 else i * 1.5,
+    ]
+    for i in range(10)
+]
+
+
+def tsv_escape(value) -> str:
+    if value is None:
+        return "\\N"
+
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def arrow_table() -> pa.Table:
+    """ROWS as ClickHouse writes them in Arrow formats."""
+    # Naive timestamps are seconds since the epoch in UTC
+    post_times = [int(pd.Timestamp(row[2]).timestamp()) for row in ROWS]
+
+    return pa.table(
+        {
+            "id": pa.array([row[0] for row in ROWS], pa.uint32()),
+            "name": pa.array([row[1].encode() for row in ROWS], pa.binary()),
+            "post_time": pa.array(post_times, pa.uint32()),
+            "odds": pa.array([row[3] for row in ROWS], pa.float64()),
+        }
+    )
+
+
+def format_arrow(row_format: str) -> bytes:
+    sink = pa.BufferOutputStream()
+    table = arrow_table()
+
+    if row_format == "Parquet":
+        pq.write_table(table, sink)
+    else:
+        new_writer = pa.ipc.new_file if row_format == "Arrow" else pa.ipc.new_stream
+
+        with new_writer(sink, table.schema) as writer:
+            # Blocks of 3 rows
+            writer.write_table(table, max_chunksize=3)
+
+    return sink.getvalue().to_pybytes()
+
+
+def format_rows(row_format: str) -> str:
+    if row_format == "JSONCompact":
+        meta = [{"name": name, "type": type} for (name, type) in zip(NAMES, TYPES)]
+        return json.dumps({"meta": meta, "data": ROWS, "rows": len(ROWS)})
+
+    if row_format == "JSONCompactEachRowWithNamesAndTypes":
+        lines = [NAMES, TYPES] + ROWS
+        return "".join(json.dumps(line) + "\n" for line in lines)
+
+    if row_format == "TabSeparatedWithNamesAndTypes":
+        lines = [NAMES, TYPES] + ROWS
+        return "".join("\t".join(map(tsv_escape, line)) + "\n" for line in lines)
+
+    return "".join(json.dumps(dict(zip(NAMES, row))) + "\n" for row in ROWS)
+
+
+class StartersHandler(FakeClickHouseHandler):
+    def respond(self, query: str) -> Optional[bytes]:
+        if "missing_table" in query:
+            self.send_error_body(404, "Table race_db.missing_table doesn't exist")
+            return None
+
+        row_format = query.rsplit(" format ", 1)[1]
+
+        if query.startswith("DESCRIBE TABLE (SELECT * FROM race_db.starters)"):
+            self.server.describes += 1
+            data = [[name, type, "", "", ""] for (name, type) in zip(NAMES, TYPES)]
+            return json.dumps({"data": data}).encode()
+        elif row_format in ch2pd.ARROW_FORMATS:
+            return format_arrow(row_format)
+
+        return format_rows(row_format).encode()
+
+
+@pytest.fixture
+def clickhouse_url() -> Iterator[Tuple[str, ThreadingHTTPServer]]:
+    for (url, server) in serve_fake_clickhouse(StartersHandler):
+        server.describes = 0
+        yield (url, server)
+
+
+def expected_df() -> pd.DataFrame:
+    df = pd.DataFrame.from_records(ROWS, columns=NAMES)
+    df["post_time"] = pd.to_datetime(df["post_time"])
+
+    return df
+
+
+@pytest.mark.parametrize(
+    "row_format",
+    ["JSONCompactEachRowWithNamesAndTypes", "TabSeparatedWithNamesAndTypes"],
+)
+def test_select_batches(clickhouse_url, row_format: str):
+    (url, _) = clickhouse_url
+
+    batches = list(
+        ch2pd.select_batches(
+            url, "SELECT * FROM race_db.starters", batch_size=3, row_format=row_format
+        )
+    )
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), expected_df())
+    assert batches[0]["post_time"].dtype.kind == "M"
+
+
+def test_select(clickhouse_url):
+    (url, server) = clickhouse_url
+
+    for _ in range(2):
+        df = ch2pd.select(url, "SELECT * FROM race_db.starters")
+
+        pd.testing.assert_frame_equal(df, expected_df())
+
+    assert server.connections == 1
+
+
+@pytest.mark.parametrize("convert_to", ["Arrow", "arrowstream", "Parquet"])
+def test_select_arrow_formats(clickhouse_url, convert_to: str):
+    (url, server) = clickhouse_url
+
+    df = ch2pd.select(url, "SELECT * FROM race_db.starters", convert_to=convert_to)
+
+    pd.testing.assert_frame_equal(df, expected_df(), check_dtype=False)
+    assert df["post_time"].dtype.kind == "M"
+    assert df["id"].dtype == "uint32"
+    assert server.describes == 1
+    assert server.connections == 1
+
+
+def test_select_batches_arrow_stream(clickhouse_url):
+    (url, _) = clickhouse_url
+
+    batches = list(
+        ch2pd.select_batches(
+            url,
+            "SELECT * FROM race_db.starters",
+            batch_size=5,
+            row_format="ArrowStream",
+            chunk_size=16,
+        )
+    )
+
+    # Whole blocks of 3 rows, until at least 5 rows are read
+    assert [len(batch) for batch in batches] == [6, 4]
+    pd.testing.assert_frame_equal(
+        pd.concat(batches, ignore_index=True), expected_df(), check_dtype=False
+    )
+
+
+def test_select_stream_json_each_row(clickhouse_url):
+    (url, _) = clickhouse_url
+
+    df = ch2pd.select_stream(
+        url,
+        "SELECT * FROM race_db.starters",
+        row_format="JSONEachRow",
+        settings={"enable_http_compression": 0},
+    )
+
+    assert list(df.columns) == NAMES
+    assert df["name"].tolist() == [row[1] for row in ROWS]
+
+
+def test_keep_alive_connection_reused(clickhouse_url):
+    (url, server) = clickhouse_url
+
+    for _ in range(3):
+        assert len(ch2pd.select_stream(url, "SELECT * FROM race_db.starters")) == 10
+
+    assert server.connections == 1
+
+    # An abandoned stream closes its connection instead of reusing it
+    batches = ch2pd.select_batches(url, "SELECT * FROM race_db.starters", batch_size=2)
+    next(batches)
+    batches.close()
+
+    assert len(ch2pd.select_stream(url, "SELECT * FROM race_db.starters")) == 10
+    assert server.connections == 2
+
+
+def test_select_batches_error(clickhouse_url):
+    (url, _) = clickhouse_url
+
+    with pytest.raises(ValueError, match="doesn't exist"):
+        list(ch2pd.select_batches(url, "SELECT * FROM race_db.missing_table"))
+
+    with pytest.raises(ValueError):
+        list(ch2pd.select_batches(url, "DROP TABLE race_db.starters"))
+
+    # The connection is usable again after an error
+    assert len(ch2pd.select_stream(url, "SELECT * FROM race_db.starters")) == 10
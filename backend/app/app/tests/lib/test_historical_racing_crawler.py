@@ -0,0 +1,142 @@
+import threading
+import time
+from datetime import date
+from typing import Dict, Generator, List
+
+import pytest
+
+from app.lib.clients.historical_abstract import (
+    AbstractHistoricalRacingClient,
+    AbstractHistoricalRacingClientException,
+    HistoricalChartNotAvailableException,
+)
+from app.lib.crawlers.historical_racing import (
+    HistoricalChartNotAvailableCrawlerException,
+    HistoricalRacingCrawler,
+    HistoricalRacingCrawlerException,
+)
+
+DATES = [date(2022, 7, 1), date(2022, 7, 2)]
+TRACK_CODES = ["aqu", "bel", "sar"]
+
+
+class FakeHistoricalRacingClient(AbstractHistoricalRacingClient):
+    """Client that tracks concurrent downloads, failing the first `failures`."""
+
+    def __init__(self, latency_secs: float, failures: Dict[str, int] = None) -> None:
+        self.latency_secs = latency_secs
+        self.failures = dict(failures or {})
+        self.attempts: Dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def download_chart_to_file(
+        self,
+        file_path: str,
+        file_name: str,
+        track_code: str,
+        tdate: date,
+        race_no: str = "A",
+    ) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.attempts[file_name] = self.attempts.get(file_name, 0) + 1
+            fail = self.attempts[file_name] <= self.failures.get(file_name, 0)
+
+        try:
+            time.sleep(self.latency_secs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        if track_code == "unavailable":
+            raise HistoricalChartNotAvailableException(f"{file_name} not found")
+
+        if fail:
+            raise AbstractHistoricalRacingClientException(f"{file_name} failed")
+
+
+def collecting_err_handler(errors: List[Exception]) -> Generator:
+    def handler() -> Generator:
+        while True:
+            try:
+                yield
+            except HistoricalRacingCrawlerException as e:
+                errors.append(e)
+
+    err_handler = handler()
+    err_handler.send(None)
+
+    return err_handler
+
+
+def test_crawl_dates_concurrently():
+    client = FakeHistoricalRacingClient(latency_secs=0.05)
+    crawler = HistoricalRacingCrawler(client, max_workers=3, backoff_secs=0)
+
+    file_names = list(
+        crawler.crawl_dates("pdf", [(tdate, TRACK_CODES) for tdate in DATES])
+    )
+
+    assert sorted(file_names) == sorted(
+        f"{code.upper()}-{tdate.isoformat()}-A.pdf"
+        for tdate in DATES
+        for code in TRACK_CODES
+    )
+    assert client.max_in_flight == 3
+
+
+def test_crawl_date_retries_then_reports_errors():
+    client = FakeHistoricalRacingClient(
+        latency_secs=0,
+        failures={"AQU-2022-07-01-A.pdf": 2, "BEL-2022-07-01-A.pdf": 5},
+    )
+    crawler = HistoricalRacingCrawler(
+        client, max_workers=2, max_retries=2, backoff_secs=0
+    )
+    errors: List[Exception] = []
+
+    file_names = list(
+        crawler.crawl_date(
+            "pdf",
+            TRACK_CODES + ["unavailable"],
+            DATES[0],
+            err_handler=collecting_err_handler(errors),
+        )
+    )
+
+    assert sorted(file_names) == ["AQU-2022-07-01-A.pdf", "SAR-2022-07-01-A.pdf"]
+    assert client.attempts["AQU-2022-07-01-A.pdf"] == 3
+    assert client.attempts["BEL-2022-07-01-A.pdf"] == 3
+    # Missing charts aren't retried
+    assert client.attempts["UNAVAILABLE-2022-07-01-A.pdf"] == 1
+
+    errors.sort(key=lambda e: e.track_code)
+    assert [(e.track_code, e.tdate) for e in errors] == [
+        ("bel", DATES[0]),
+        ("unavailable", DATES[0]),
+    ]
+    assert "BEL-2022-07-01-A.pdf" in str(errors[0])
+    assert isinstance(errors[0].__cause__, AbstractHistoricalRacingClientException)
+    assert isinstance(errors[1], HistoricalChartNotAvailableCrawlerException)
+
+
+def test_raising_err_handler_stops_crawl():
+    def raising_handler() -> Generator:
+        yield
+
+    err_handler = raising_handler()
+    err_handler.send(None)
+
+    client = FakeHistoricalRacingClient(
+        latency_secs=0, failures={"AQU-2022-07-01-A.pdf": 1}
+    )
+    crawler = HistoricalRacingCrawler(client, max_workers=1, max_retries=0)
+
+    with pytest.raises(HistoricalRacingCrawlerException):
+        list(crawler.crawl_date("pdf", TRACK_CODES, DATES[0], err_handler=err_handler))
+
+    # Nothing is queued past the failed download
+    assert list(client.attempts) == ["AQU-2022-07-01-A.pdf"]
@@ -0,0 +1,221 @@
+import asyncio
+import json
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import List
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.lib.clients.async_http import AsyncHttpPool
+from app.lib.clients.demo_live_racing_client import (
+    AsyncDemoLiveRacingClient,
+    DemoLiveRacingClient,
+)
+from app.lib.clients.demo_race_data import create_starters_n
+from app.lib.clients.http_live_racing_client import AsyncHttpLiveRacingClient
+from app.lib.clients.live_abstract import AsyncAbstractLiveRacingClient
+from app.lib.crawlers.live_racing import (
+    AsyncLiveRacingCrawler,
+    LiveRacingCrawlerException,
+)
+from app.lib.schemas.live_racing import (
+    RacePoolTotals,
+    StarterDetails,
+    TrackWithRaceDetails,
+)
+
+
+class SlowLiveRacingClient(AsyncAbstractLiveRacingClient):
+    """Client that tracks the max number of concurrent in-flight requests."""
+
+    def __init__(self, latency_secs: float) -> None:
+        self.latency_secs = latency_secs
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_race_entries(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> List[StarterDetails]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(self.latency_secs)
+        finally:
+            self.in_flight -= 1
+
+        return create_starters_n(6)
+
+    async def get_races_by_date(self, tdate: date) -> List[TrackWithRaceDetails]:
+        return []
+
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> RacePoolTotals:
+        raise NotImplementedError()
+
+
+class TwoHostLiveRacingClient(SlowLiveRacingClient):
+    """Client sending race entry and pool total requests to different hosts."""
+
+    def request_host(self, method: str) -> str:
+        return "totals" if method == "get_race_pool_totals" else "entries"
+
+    async def get_race_pool_totals(
+        self, track_code: str, race_no: int, type: str = "Thoroughbred"
+    ) -> RacePoolTotals:
+        await self.get_race_entries(track_code, race_no, type)
+
+        return RacePoolTotals(
+            win_total=1, place_total=1, show_total=1, entries_to_pools_map={}
+        )
+
+
+def test_async_demo_crawler_fetches_race_data() -> None:
+    crawler = AsyncLiveRacingCrawler(AsyncDemoLiveRacingClient())
+
+    async def run():
+        tracks = await crawler.get_all_track_races_shallow(
+            target_date=datetime.now(timezone.utc).date()
+        )
+        race_args = [
+            (track.brisCode, race.raceNumber, track.type)
+            for track in tracks
+            for race in track.races
+        ]
+
+        entries = await asyncio.gather(
+            *[crawler.get_race_entries(*args) for args in race_args]
+        )
+        pool_totals = await asyncio.gather(
+            *[crawler.get_race_pool_totals(*args) for args in race_args]
+        )
+
+        await crawler.close()
+
+        return (race_args, entries, pool_totals)
+
+    race_args, entries, pool_totals = asyncio.run(run())
+
+    assert len(race_args) > 0
+    assert len(entries) == len(race_args)
+    assert all(len(race_entries) > 0 for race_entries in entries)
+    assert all(totals.win_total > 0 for totals in pool_totals)
+
+
+def test_async_crawler_limits_concurrency_per_host() -> None:
+    client = SlowLiveRacingClient(latency_secs=0.01)
+    crawler = AsyncLiveRacingCrawler(client, max_concurrent_per_host=3)
+
+    async def run():
+        return await asyncio.gather(
+            *[crawler.get_race_entries("kee", i, "Thoroughbred") for i in range(20)]
+        )
+
+    results = asyncio.run(run())
+
+    assert len(results) == 20
+    assert client.max_in_flight == 3
+
+
+def test_async_crawler_times_out() -> None:
+    client = SlowLiveRacingClient(latency_secs=1)
+    crawler = AsyncLiveRacingCrawler(client, timeout_secs=0.01)
+
+    with pytest.raises(LiveRacingCrawlerException):
+        asyncio.run(crawler.get_race_entries("kee", 1, "Thoroughbred"))
+
+
+def test_async_crawler_limits_concurrency_by_request_host() -> None:
+    client = TwoHostLiveRacingClient(latency_secs=0.01)
+    crawler = AsyncLiveRacingCrawler(client, max_concurrent_per_host=3)
+
+    async def run():
+        return await asyncio.gather(
+            *[crawler.get_race_entries("kee", i, "Thoroughbred") for i in range(20)],
+            *[
+                crawler.get_race_pool_totals("kee", i, "Thoroughbred")
+                for i in range(20)
+            ],
+        )
+
+    results = asyncio.run(run())
+
+    assert len(results) == 40
+    assert client.max_in_flight == 6
+
+
+def test_async_http_client_pools_connections() -> None:
+    demo_client = DemoLiveRacingClient()
+    peers: Counter = Counter()
+
+    def json_response(request: web.Request, data: str) -> web.Response:
+        peers[request.transport.get_extra_info("peername")] += 1
+        return web.Response(text=data, content_type="application/json")
+
+    async def races(request: web.Request) -> web.Response:
+        tracks = demo_client.get_races_by_date(
+            date.fromisoformat(request.match_info["date"])
+        )
+        return json_response(
+            request, json.dumps([track.dict() for track in tracks], default=str)
+        )
+
+    async def entries(request: web.Request) -> web.Response:
+        starters = demo_client.get_race_entries(
+            request.match_info["track_code"], int(request.match_info["race_no"])
+        )
+        return json_response(
+            request, json.dumps([starter.dict() for starter in starters], default=str)
+        )
+
+    async def pool_totals(request: web.Request) -> web.Response:
+        totals = demo_client.get_race_pool_totals(
+            request.match_info["track_code"], int(request.match_info["race_no"])
+        )
+        return json_response(request, totals.json())
+
+    app = web.Application()
+    app.router.add_get("/races/{date}", races)
+    app.router.add_get("/entries/{track_code}/{race_no}", entries)
+    app.router.add_get("/pools/{track_code}/{race_no}", pool_totals)
+
+    async def run():
+        async with TestServer(app) as server:
+            base_url = str(server.make_url(""))
+            client = AsyncHttpLiveRacingClient(
+                races_url=base_url + "/races/{date}",
+                race_entries_url=base_url + "/entries/{track_code}/{race_no}",
+                race_pool_totals_url=base_url + "/pools/{track_code}/{race_no}",
+                pool=AsyncHttpPool(max_connections_per_host=4),
+            )
+            crawler = AsyncLiveRacingCrawler(client)
+
+            tracks = await crawler.get_all_track_races_shallow(
+                target_date=datetime.now(timezone.utc).date()
+            )
+            race_args = [
+                (track.brisCode, race.raceNumber, track.type)
+                for track in tracks
+                for race in track.races
+            ]
+            entries = await asyncio.gather(
+                *[crawler.get_race_entries(*args) for args in race_args]
+            )
+            pool_totals = await asyncio.gather(
+                *[crawler.get_race_pool_totals(*args) for args in race_args]
+            )
+            await crawler.close()
+
+            return (race_args, entries, pool_totals)
+
+    (race_args, entries, pool_totals) = asyncio.run(run())
+
+    assert len(race_args) > 0
+    assert all(len(race_entries) > 0 for race_entries in entries)
+    assert all(totals.win_total > 0 for totals in pool_totals)
+    # Every request went over one of the pooled keep-alive connections
+    assert sum(peers.values()) == 2 * len(race_args) + 1
+    assert len(peers) <= 4
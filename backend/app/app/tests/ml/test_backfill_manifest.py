@@ -0,0 +1,41 @@
+from datetime import date
+from pathlib import Path
+
+from app.ml.backfill_manifest import BackfillManifest, BackfillStatus
+
+
+def test_manifest_resumes_from_file(tmp_path: Path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = BackfillManifest(path)
+
+    manifest.mark("aqu", date(2022, 7, 1), BackfillStatus.DOWNLOADED, file_name="a.pdf")
+    manifest.mark_many(
+        [("aqu", date(2022, 7, 1)), ("bel", date(2022, 7, 1))], BackfillStatus.QUEUED
+    )
+    manifest.mark("sar", date(2022, 7, 1), BackfillStatus.NOT_AVAILABLE)
+    manifest.mark("sar", date(2022, 7, 2), BackfillStatus.FAILED, error="timeout")
+
+    # A line cut short when the process stopped
+    with open(path, "a") as f:
+        f.write('{"track_code": "AQU", "tdate": "2022-')
+
+    reloaded = BackfillManifest(path)
+
+    assert reloaded.entries == manifest.entries
+    assert reloaded.get("AQU", date(2022, 7, 1)).file_name == "a.pdf"
+    assert reloaded.is_finished("aqu", date(2022, 7, 1))
+    assert reloaded.is_finished("sar", date(2022, 7, 1))
+    assert not reloaded.is_finished("sar", date(2022, 7, 2))
+    assert reloaded.status("bel", date(2022, 7, 2)) is None
+
+    summary = reloaded.summary()
+    assert summary.counts == {
+        BackfillStatus.DOWNLOADED: 0,
+        BackfillStatus.QUEUED: 2,
+        BackfillStatus.FAILED: 1,
+        BackfillStatus.NOT_AVAILABLE: 1,
+    }
+    assert summary.failed == ["SAR 2022-07-02"]
+
+    # Compacted to the latest entry per chart
+    assert len(Path(path).read_text().splitlines()) == 4
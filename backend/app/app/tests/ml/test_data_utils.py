@@ -0,0 +1,64 @@
+import random
+from typing import List
+
+import pandas as pd
+
+from app.lib.clients.demo_race_data import create_race_with_pool_totals
+from app.ml.predictor.data_utils import (
+    create_race_entry_df_from_race,
+    create_race_entry_df_from_races,
+    race_entry_records,
+)
+from app.models.race import Race
+
+
+def create_races() -> List[Race]:
+    races = []
+
+    for i in range(12):
+        race = create_race_with_pool_totals(6 + i, seed=i)
+        race.id = i + 1
+
+        for (j, entry) in enumerate(race.entries):
+            entry.id = (i + 1) * 100 - j
+
+        races.append(race)
+
+    # Unset/edge case values the live source may give
+    (race, other_race) = races[:2]
+    race.distance = None
+    race.age_restrictions = None
+    race.sex_restrictions = "F"
+    other_race.distance = "1 1/16 M"
+
+    for (entry, name) in zip(race.entries, [None, "", "Solo", "A  B", " C D "]):
+        entry.jockey_name = name
+        entry.trainer_name = name
+
+    random.seed(0)
+
+    for entry in other_race.entries:
+        entry.yob = random.choice([None, "2018"])
+        entry.weight = random.choice([None, 118])
+        entry.days_off = random.choice([None, 0, 21])
+        entry.scratched = random.choice([None, False, True])
+        entry.live_odds = random.choice([None, 0, 4.5])
+        entry.live_odds_fav = random.choice([None, True])
+        entry.medication = random.choice([None, "L"])
+        entry.equipment = random.choice([None, "b"])
+
+    return races
+
+
+def test_columnar_frame_matches_records():
+    races = create_races()
+
+    expected = pd.DataFrame(
+        [record for race in races for record in race_entry_records(race)]
+    )
+
+    pd.testing.assert_frame_equal(create_race_entry_df_from_races(races), expected)
+    pd.testing.assert_frame_equal(
+        create_race_entry_df_from_race(races[0]),
+        pd.DataFrame(race_entry_records(races[0])),
+    )
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.ml.predictor.model_registry import (
+    ModelRegistry,
+    ModelRegistryException,
+    get_model_registry,
+)
+
+
+def fake_load_model(path: str) -> str:
+    contents = Path(path).read_text()
+
+    if contents == "corrupt":
+        raise ValueError("Not a model")
+
+    return contents
+
+
+def write_model(path: Path, contents: str, mtime: int) -> None:
+    path.write_text(contents)
+    # Ensure a change is seen on file systems with coarse mtimes
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_on_change(tmp_path: Path):
+    model_file = tmp_path / "race_model.dump"
+    write_model(model_file, "model 1", 1)
+
+    registry = ModelRegistry(str(model_file), load_model=fake_load_model)
+    first = registry.current()
+
+    assert first.model == "model 1"
+    assert first.version.startswith("race_model.dump:")
+    assert not registry.check_for_update()
+
+    write_model(model_file, "model 2", 2)
+
+    assert registry.check_for_update()
+    assert registry.current().model == "model 2"
+    assert registry.current().version != first.version
+
+    # Failed loads keep the active model until the file changes again
+    write_model(model_file, "corrupt", 3)
+
+    assert not registry.check_for_update()
+    assert registry.current().model == "model 2"
+
+    write_model(model_file, "model 3", 4)
+
+    assert registry.check_for_update()
+    assert registry.current().model == "model 3"
+
+
+def test_versioned_directory(tmp_path: Path):
+    write_model(tmp_path / "race_model-20220701.cbm", "july", 1)
+    write_model(tmp_path / "notes.txt", "ignored", 1)
+
+    registry = ModelRegistry(str(tmp_path), load_model=fake_load_model)
+
+    assert registry.current().model == "july"
+
+    write_model(tmp_path / "race_model-20220801.cbm", "august", 2)
+
+    assert registry.check_for_update()
+    assert registry.current().model == "august"
+    assert registry.current().version.startswith("race_model-20220801.cbm:")
+
+
+def test_missing_model(tmp_path: Path):
+    with pytest.raises(ModelRegistryException):
+        ModelRegistry(str(tmp_path / "missing.dump"), load_model=fake_load_model)
+
+
+def test_registry_shared_per_path(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(
+        "app.ml.predictor.model_registry.load_catboost_model", fake_load_model
+    )
+    model_file = tmp_path / "race_model.dump"
+    write_model(model_file, "model", 1)
+
+    registry = get_model_registry(str(model_file))
+
+    try:
+        assert get_model_registry(str(tmp_path / "." / "race_model.dump")) is registry
+    finally:
+        registry.stop_watching()
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+from catboost import CatBoostClassifier
+
+from app.lib.clients.demo_race_data import create_race_with_pool_totals
+from app.ml.predictor.data_utils import (
+    create_race_entry_df_from_race,
+    create_race_entry_df_from_races,
+)
+from app.ml.predictor.race_predictor import RacePredictor
+from app.models.race import Race
+
+
+def create_races(n: int) -> List[Race]:
+    races = []
+
+    for i in range(n):
+        race = create_race_with_pool_totals(6 + i % 8, seed=i)
+        race.id = i + 1
+
+        # Ids in reverse of entry order, as rows are sorted by entry id
+        for (j, entry) in enumerate(race.entries):
+            entry.id = (i + 1) * 100 - j
+
+        races.append(race)
+
+    return races
+
+
+@pytest.fixture
+def model_file(tmp_path: Path) -> str:
+    races_df = create_race_entry_df_from_races(create_races(10))
+    races_df.fillna(-999, inplace=True)
+    cat_features = list(races_df.select_dtypes(exclude="number").columns)
+    races_df[cat_features] = races_df[cat_features].astype(str)
+
+    model = CatBoostClassifier(
+        iterations=10, verbose=0, cat_features=cat_features, allow_writing_files=False
+    )
+    model.fit(races_df, np.random.RandomState(0).randint(0, 2, len(races_df)))
+
+    path = str(tmp_path / "race_model.dump")
+    model.save_model(path)
+
+    return path
+
+
+def test_calc_probs_many(model_file: str):
+    predictor = RacePredictor(model_file)
+    races = create_races(5)
+
+    results = predictor.calc_probs_many(races)
+
+    assert list(results.keys()) == [race.id for race in races]
+
+    for race in races:
+        race_df = create_race_entry_df_from_race(race).fillna(-999)
+        expected = predictor.model.predict_proba(race_df)[:, 1]
+        entry_ids = sorted(entry.id for entry in race.entries)
+        probs = results[race.id].entries_probs
+
+        assert list(probs.keys()) == entry_ids
+        assert [probs[entry_id].win_proba for entry_id in entry_ids] == (
+            pytest.approx(list(expected))
+        )
+        assert results[race.id].model_version == predictor.model_version
+        assert predictor.calc_probs(race) == results[race.id]
+
+
+def test_calc_probs_many_without_entries(model_file: str):
+    race = Race(id=1, entries=[])
+
+    assert RacePredictor(model_file).calc_probs_many([race])[1].entries_probs == {}
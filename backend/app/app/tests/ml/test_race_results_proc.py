@@ -0,0 +1,194 @@
+import asyncio
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Generator, Iterable, List, Set, Tuple
+
+import pytest
+
+from app.lib.crawlers.historical_racing import (
+    HistoricalChartNotAvailableCrawlerException,
+    HistoricalRacingCrawlerException,
+    chart_file_name,
+)
+from app.ml.backfill_manifest import BackfillManifest, BackfillStatus, ChartKey
+from app.rabbitmq.pika_client import PikaClientException
+from app.tests.utils.fake_rabbitmq import FakePikaClient
+
+# The historical racing client isn't part of this repo, nor used by these tests
+historical_racing_stub = ModuleType("app.lib_private.clients.historical_racing")
+historical_racing_stub.HistoricalRacingClient = object  # type: ignore
+sys.modules.setdefault(historical_racing_stub.__name__, historical_racing_stub)
+
+from app.ml.race_results_proc import (  # noqa: E402
+    RaceResultSearchConfig,
+    RaceResultsProcessor,
+    TrackDataDescriptor,
+)
+
+DAY_1 = date(2022, 7, 1)
+DAY_2 = date(2022, 7, 2)
+
+
+class FakeCrawler:
+    """Downloads empty charts, except for `not_available` track codes."""
+
+    def __init__(self, not_available: Iterable[str] = ()) -> None:
+        self.not_available = set(not_available)
+        self.requested: List[ChartKey] = []
+
+    def crawl_dates(
+        self,
+        file_path: str,
+        dates_track_codes: Iterable[Tuple[date, List[str]]],
+        *,
+        err_handler: Generator,
+    ) -> Generator:
+        for (tdate, track_codes) in dates_track_codes:
+            for track_code in track_codes:
+                self.requested.append((track_code, tdate))
+
+                if track_code in self.not_available:
+                    err_handler.throw(
+                        HistoricalChartNotAvailableCrawlerException(
+                            "No chart", track_code=track_code, tdate=tdate
+                        )
+                    )
+                    continue
+
+                file_name = chart_file_name(track_code, tdate)
+                Path(file_path, file_name).write_bytes(b"")
+                yield file_name
+
+
+class ManifestCheckingPikaClient(FakePikaClient):
+    """
+    Checks that no chart of a batch is marked queued before it's confirmed,
+    and nacks the messages of `nacked_files`.
+    """
+
+    def __init__(
+        self, manifest: BackfillManifest, nacked_files: Iterable[str] = (), **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.manifest = manifest
+        self.nacked_files = set(nacked_files)
+        self.batches: List[Set[str]] = []
+
+    async def flush(self) -> int:
+        files: Dict[str, bytes] = {
+            Path(json.loads(message.body)["body"]["file"]).name: message.body
+            for (_, _, message) in self.pending
+        }
+
+        for file_name in files:
+            (track_code, tdate) = file_name.split("-", 1)
+            status = self.manifest.status(track_code, date.fromisoformat(tdate[:10]))
+            assert status == BackfillStatus.DOWNLOADED
+
+        if files:
+            self.batches.append(set(files))
+
+        exchange = await self.get_exchange("downloads")
+        exchange.nacked.update(
+            body
+            for (file_name, body) in files.items()
+            if file_name in self.nacked_files
+        )
+
+        return await super().flush()
+
+
+def create_processor(download_path: str) -> RaceResultsProcessor:
+    config = RaceResultSearchConfig(
+        track_list=[
+            TrackDataDescriptor(
+                track_name=track_code,
+                track_code=track_code,
+                date_ranges=[(DAY_1, DAY_2 if track_code == "SAR" else DAY_1)],
+            )
+            for track_code in ("AQU", "BEL", "KEE", "SAR")
+        ]
+    )
+    processor = RaceResultsProcessor(DAY_1, DAY_2, config, download_path=download_path)
+    processor.download_exchange = "downloads"
+
+    return processor
+
+
+@pytest.fixture
+def event_loop() -> Generator:
+    # The processor holds on to the current loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_start_resumes_from_manifest(tmp_path: Path, event_loop):
+    download_path = str(tmp_path)
+    processor = create_processor(download_path)
+    manifest = processor.manifest
+
+    manifest.mark("AQU", DAY_1, BackfillStatus.QUEUED)
+    manifest.mark(
+        "BEL", DAY_1, BackfillStatus.DOWNLOADED, file_name=chart_file_name("BEL", DAY_1)
+    )
+    (tmp_path / chart_file_name("BEL", DAY_1)).write_bytes(b"")
+    manifest.mark("SAR", DAY_2, BackfillStatus.FAILED, error="timeout")
+
+    processor.hist_crawler = FakeCrawler(not_available=["KEE"])
+    processor.rmq_client = ManifestCheckingPikaClient(
+        manifest, nacked_files=[chart_file_name("SAR", DAY_2)], batch_size=2
+    )
+
+    with pytest.raises(PikaClientException):
+        processor.blocking_start()
+
+    # Finished charts are skipped, and the downloaded one is only queued
+    assert processor.hist_crawler.requested == [
+        ("KEE", DAY_1),
+        ("SAR", DAY_1),
+        ("SAR", DAY_2),
+    ]
+    assert processor.rmq_client.batches == [
+        {chart_file_name("BEL", DAY_1), chart_file_name("SAR", DAY_1)},
+        {chart_file_name("SAR", DAY_2)},
+    ]
+    assert manifest.status("BEL", DAY_1) == BackfillStatus.QUEUED
+    assert manifest.status("SAR", DAY_1) == BackfillStatus.QUEUED
+    assert manifest.status("KEE", DAY_1) == BackfillStatus.NOT_AVAILABLE
+    # Its batch wasn't confirmed
+    assert manifest.status("SAR", DAY_2) == BackfillStatus.DOWNLOADED
+
+    # A rerun queues it again, without downloading it again
+    resumed = create_processor(download_path)
+    resumed.hist_crawler = FakeCrawler()
+    resumed.rmq_client = ManifestCheckingPikaClient(resumed.manifest, batch_size=2)
+
+    assert event_loop.run_until_complete(resumed.start()) == 1
+    assert resumed.hist_crawler.requested == []
+    assert resumed.rmq_client.batches == [{chart_file_name("SAR", DAY_2)}]
+    assert resumed.summary().counts == {
+        BackfillStatus.DOWNLOADED: 0,
+        BackfillStatus.QUEUED: 4,
+        BackfillStatus.FAILED: 0,
+        BackfillStatus.NOT_AVAILABLE: 1,
+    }
+
+
+def test_crawl_errors_without_a_chart_are_skipped(tmp_path: Path, event_loop):
+    processor = create_processor(str(tmp_path))
+    err_handler = processor.read_and_handle_errors()
+    err_handler.send(None)
+
+    err_handler.throw(HistoricalRacingCrawlerException("Failed"))
+    err_handler.throw(
+        HistoricalRacingCrawlerException("Failed", track_code="SAR", tdate=DAY_1)
+    )
+
+    assert list(processor.manifest.entries) == [("SAR", DAY_1)]
+    assert processor.manifest.status("SAR", DAY_1) == BackfillStatus.FAILED
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.ml.race_trainer as race_trainer
+from app.ml.predictor.model_registry import ModelRegistry
+from app.ml.race_trainer import RaceTrainer, TrainerConfig
+
+
+def create_training_df(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.RandomState(seed)
+    odds = rng.uniform(1, 30, n)
+
+    return pd.DataFrame(
+        {
+            "horse_id": np.arange(n),
+            "race_id": np.arange(n) // 8,
+            "horse": [f"horse {i % 40}" for i in range(n)],
+            "odds": np.where(rng.rand(n) < 0.1, np.nan, odds),
+            "track_canonical": [f"track {i % 3}" for i in range(n)],
+            "winner": (odds < 5).astype(int),
+            "finish_position": rng.randint(1, 9, n),
+            "wagering_position": rng.randint(1, 9, n),
+            "official_position": rng.randint(1, 9, n),
+        }
+    )
+
+
+@pytest.fixture
+def training_data(monkeypatch):
+    def get_complete_race_df(use_cache: bool = True):
+        return (create_training_df(200, seed=0), create_training_df(40, seed=1))
+
+    monkeypatch.setattr(race_trainer, "get_complete_race_df", get_complete_race_df)
+
+
+def test_run(training_data, tmp_path: Path):
+    config = TrainerConfig(
+        iterations=20,
+        thread_count=2,
+        cv_folds=3,
+        cv_workers=3,
+        output_path=str(tmp_path),
+        predictions_path=str(tmp_path / "predictions.csv"),
+    )
+    trainer = RaceTrainer(config)
+
+    result = trainer.run()
+
+    assert [s.name for s in result.stages] == [
+        "load",
+        "prepare",
+        "fit",
+        "cv",
+        "export",
+    ]
+    assert all(s.wall_secs > 0 and s.max_rss_mb > 0 for s in result.stages)
+    assert trainer.fold_thread_count() == 1
+    assert [f.fold for f in result.cv] == [0, 1, 2]
+    assert all(0 <= f.accuracy <= 1 for f in result.cv)
+
+    # The exported model is what a registry watching the directory loads
+    registry = ModelRegistry(str(tmp_path))
+    assert str(registry.model_file()) == result.model_path
+    assert len(pd.read_csv(tmp_path / "predictions.csv")) == 40
+
+
+def test_cv_workers_give_same_folds(training_data):
+    data = RaceTrainer().prepare(*race_trainer.get_complete_race_df())
+
+    folds = [
+        RaceTrainer(
+            TrainerConfig(iterations=20, thread_count=2, cv_workers=workers)
+        ).cross_validate(data)
+        for workers in (1, 3)
+    ]
+
+    assert folds[0] == folds[1]
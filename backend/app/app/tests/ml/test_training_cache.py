@@ -0,0 +1,287 @@
+import json
+import re
+from datetime import date
+from http.server import ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.ml.training_cache import TrainingDataCache, joined_columns
+from app.tests.utils.fake_clickhouse import (
+    FakeClickHouseHandler,
+    serve_fake_clickhouse,
+)
+
+RACES_TYPES = {"id": "UInt32", "date": "Date", "track": "String", "distance": "Float64"}
+STARTERS_TYPES = {
+    "id": "UInt32",
+    "race_id": "UInt32",
+    # Also a races column, so suffixed by the merge
+    "track": "String",
+    "odds": "Nullable(Float64)",
+    "finish_position": "Nullable(Int32)",
+}
+
+# As ClickHouse writes them in Arrow formats
+ARROW_TYPES = {
+    "UInt32": pa.uint32(),
+    "Int32": pa.int32(),
+    "Float64": pa.float64(),
+    "String": pa.binary(),
+    "Date": pa.uint16(),
+}
+
+
+def races_df(dates: List[date]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": list(range(1, len(dates) + 1)),
+            "date": dates,
+            "track": [f"track {i % 2}" for i in range(len(dates))],
+            "distance": [1200.0 + i for i in range(len(dates))],
+        }
+    )
+
+
+def starters_df(
+    race_ids: List[int], finish_positions: Optional[List[Optional[int]]] = None
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": list(range(100, 100 + len(race_ids))),
+            "race_id": race_ids,
+            "track": ["starter track"] * len(race_ids),
+            "odds": [None if i % 3 == 0 else i * 1.5 for i in range(len(race_ids))],
+            "finish_position": pd.Series(
+                finish_positions or list(range(1, len(race_ids) + 1)), dtype=float
+            ),
+        }
+    )
+
+
+def merged_df(races: pd.DataFrame, starters: pd.DataFrame) -> pd.DataFrame:
+    """The frame of get_complete_race_df: starters with a race, by race date."""
+    return (
+        starters.rename(columns={"id": "horse_id"})
+        .merge(races.rename(columns={"id": "race_id"}), how="inner", on="race_id")
+        .sort_values(["date", "race_id", "horse_id"], ignore_index=True)
+    )
+
+
+def arrow_column(values: pd.Series, clickhouse_type: str) -> pa.Array:
+    base_type = clickhouse_type.replace("Nullable(", "").rstrip(")")
+    items = [None if pd.isna(value) else value for value in values]
+
+    if base_type == "String":
+        items = [None if value is None else value.encode() for value in items]
+    elif base_type.startswith(("Int", "UInt")):
+        items = [None if value is None else int(value) for value in items]
+    elif base_type == "Date":
+        items = [
+            None if value is None else value.toordinal() - 719163 for value in items
+        ]
+
+    return pa.array(items, ARROW_TYPES[base_type])
+
+
+class RaceDbHandler(FakeClickHouseHandler):
+    """
+    Answers the queries of TrainingDataCache from in-memory tables, running
+    the select list, join, date filter and order it's asked for.
+    """
+
+    def respond(self, query: str) -> Optional[bytes]:
+        race_db: FakeRaceDb = self.server.race_db
+        race_db.queries.append(query)
+
+        if "FROM system.columns" in query:
+            data = [
+                [table, name, type]
+                for (table, types) in (
+                    ("all_races", RACES_TYPES),
+                    ("starters", STARTERS_TYPES),
+                )
+                for (name, type) in types.items()
+            ]
+            meta = [
+                {"name": name, "type": "String"} for name in ("table", "name", "type")
+            ]
+            return json.dumps({"meta": meta, "data": data}).encode()
+
+        columns = self.selected_columns(query)
+
+        if query.startswith("DESCRIBE TABLE ("):
+            data = [[alias, type, "", "", ""] for (_, _, alias, type) in columns]
+            return json.dumps({"data": data}).encode()
+
+        assert query.endswith(
+            "FROM race_db.starters AS s "
+            "INNER JOIN race_db.all_races AS r ON r.`id` = s.`race_id` "
+            f"{self.where(query)}"
+            "ORDER BY r.`date`, s.`race_id`, s.`id` format ArrowStream"
+        )
+        joined = (
+            race_db.starters.add_prefix("s.")
+            .merge(
+                race_db.races.add_prefix("r."),
+                how="inner",
+                left_on="s.race_id",
+                right_on="r.id",
+            )
+            .sort_values(["r.date", "s.race_id", "s.id"], ignore_index=True)
+        )
+        since = re.search(r"WHERE r\.`date` >= '([0-9-]+)'", query)
+
+        if since:
+            joined = joined[joined["r.date"] >= date.fromisoformat(since.group(1))]
+
+        table = pa.table(
+            {
+                alias: arrow_column(joined[f"{table}.{name}"], type)
+                for (table, name, alias, type) in columns
+            }
+        )
+        sink = pa.BufferOutputStream()
+
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=3)
+
+        return sink.getvalue().to_pybytes()
+
+    def selected_columns(self, query: str) -> List[Tuple[str, str, str, str]]:
+        """(table alias, column, alias, ClickHouse type) of the select list."""
+        types = {"s": STARTERS_TYPES, "r": RACES_TYPES}
+
+        return [
+            (table, name, alias, types[table][name])
+            for (table, name, alias) in re.findall(
+                r"\b([sr])\.`([^`]+)` AS `([^`]+)`", query
+            )
+        ]
+
+    def where(self, query: str) -> str:
+        since = re.search(r"WHERE r\.`date` >= '[0-9-]+' ", query)
+        return since.group(0) if since else ""
+
+
+class FakeRaceDb:
+    def __init__(self) -> None:
+        self.races = races_df([])
+        self.starters = starters_df([])
+        self.queries: List[str] = []
+
+    def since_dates(self) -> List[Optional[date]]:
+        """The date each joined query was filtered by."""
+        result: List[Optional[date]] = []
+
+        for query in self.queries:
+            if query.startswith("SELECT s."):
+                since = re.search(r"WHERE r\.`date` >= '([0-9-]+)'", query)
+                result.append(date.fromisoformat(since.group(1)) if since else None)
+
+        return result
+
+
+@pytest.fixture
+def race_db() -> Iterator[Tuple[str, FakeRaceDb]]:
+    server: ThreadingHTTPServer
+
+    for (url, server) in serve_fake_clickhouse(RaceDbHandler):
+        server.race_db = FakeRaceDb()  # type: ignore
+        yield (url, server.race_db)  # type: ignore
+
+
+def assert_loaded(cache: TrainingDataCache, race_db: FakeRaceDb) -> None:
+    pd.testing.assert_frame_equal(
+        cache.load(), merged_df(race_db.races, race_db.starters), check_dtype=False
+    )
+
+
+def test_joined_columns_match_merge():
+    races = races_df([date(2022, 7, 1)])
+    starters = starters_df([1])
+    columns = joined_columns(STARTERS_TYPES, RACES_TYPES)
+
+    assert [alias for (_, alias, _) in columns] == list(merged_df(races, starters))
+    assert columns[0] == ("s.`id`", "horse_id", "UInt32")
+    assert ("r.`track`", "track_y", "String") in columns
+
+
+def test_incremental_refresh(tmp_path, race_db):
+    (url, db) = race_db
+    cache = TrainingDataCache(
+        cache_dir=str(tmp_path), connection_url=url, lookback_days=0
+    )
+    db.races = races_df([date(2022, 7, 1), date(2022, 7, 1), date(2022, 7, 2)])
+    # A starter without a race is left out
+    db.starters = starters_df([1, 1, 2, 3, 3, 9])
+
+    result = cache.refresh()
+
+    assert (result.partitions, result.rows) == (2, 5)
+    assert cache.watermark == result.watermark == date(2022, 7, 2)
+    assert cache.partition_dates() == [date(2022, 7, 1), date(2022, 7, 2)]
+    assert_loaded(cache, db)
+
+    # A late starter for the watermark date and a new race day
+    db.races = races_df(
+        [date(2022, 7, 1), date(2022, 7, 1), date(2022, 7, 2), date(2022, 7, 3)]
+    )
+    db.starters = starters_df([1, 1, 2, 3, 3, 3, 4])
+
+    result = cache.refresh()
+
+    assert db.since_dates() == [None, date(2022, 7, 2)]
+    assert (result.partitions, result.rows) == (2, 4)
+    assert cache.watermark == date(2022, 7, 3)
+    assert_loaded(cache, db)
+    assert len(cache.load(start=date(2022, 7, 2), end=date(2022, 7, 2))) == 3
+
+    # Nothing new since the watermark date
+    assert cache.refresh().partitions == 1
+    assert cache.watermark == date(2022, 7, 3)
+
+
+def test_refresh_lookback_and_rebuild(tmp_path, race_db):
+    (url, db) = race_db
+    cache = TrainingDataCache(
+        cache_dir=str(tmp_path), connection_url=url, lookback_days=2
+    )
+    db.races = races_df([date(2022, 7, 1), date(2022, 7, 3), date(2022, 7, 5)])
+    db.starters = starters_df([1, 2, 3])
+    cache.refresh()
+
+    # Results backfilled within the lookback window, and before it
+    db.starters = starters_df([1, 1, 2, 2, 3])
+    result = cache.refresh()
+
+    assert db.since_dates() == [None, date(2022, 7, 3)]
+    assert (result.partitions, result.rows) == (2, 3)
+    assert cache.watermark == date(2022, 7, 5)
+    assert len(cache.load(end=date(2022, 7, 1))) == 1
+
+    result = cache.rebuild()
+
+    assert db.since_dates()[-1] is None
+    assert (result.partitions, result.rows) == (3, 5)
+    assert_loaded(cache, db)
+
+
+def test_refreshes_disagreeing_on_nulls(tmp_path, race_db):
+    (url, db) = race_db
+    cache = TrainingDataCache(cache_dir=str(tmp_path), connection_url=url)
+    db.races = races_df([date(2022, 7, 1)])
+    db.starters = starters_df([1, 1], finish_positions=[None, 1])
+    cache.refresh()
+
+    # No NULLs in this refresh, so pandas has the column as integers
+    db.races = races_df([date(2022, 7, 1), date(2022, 7, 2)])
+    db.starters = starters_df([1, 1, 2, 2], finish_positions=[None, 1, 1, 2])
+    cache.refresh(since=date(2022, 7, 2))
+
+    loaded = cache.load()
+
+    assert_loaded(cache, db)
+    assert loaded["finish_position"].isna().tolist() == [True, False, False, False]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.rabbitmq.pika_client import PikaClientException, RmqMessage
+from app.tests.utils.fake_rabbitmq import FakePikaClient
+
+
+def create_msg(i: int) -> RmqMessage:
+    return RmqMessage(message_type="IngestSignal", body={"file": f"pdf/{i}.pdf"})
+
+
+def test_send_msg_reuses_channel_and_exchange():
+    client = FakePikaClient()
+
+    async def run():
+        for i in range(5):
+            await client.send_msg("downloads", "", create_msg(i))
+
+    asyncio.run(run())
+
+    assert len(client.connections) == 1
+    assert len(client.connections[0].channels) == 1
+    channel = client.connections[0].channels[0]
+    assert len(channel.exchanges) == 1
+    assert len(channel.published) == 5
+
+
+def test_queue_msg_publishes_in_batches():
+    client = FakePikaClient(batch_size=4)
+
+    async def run():
+        async with client:
+            for i in range(10):
+                await client.queue_msg("downloads", "", create_msg(i))
+
+                # Full batches are published as they fill up
+                assert len(client.pending) == (i + 1) % 4
+
+    asyncio.run(run())
+
+    channel = client.connections[0].channels[0]
+    assert [body for (_, body) in channel.published] == [
+        bytes(create_msg(i).json(), "utf-8") for i in range(10)
+    ]
+    # Confirms of a batch are waited on together
+    assert channel.exchanges[0].max_in_flight == 4
+    assert client.connections[0].is_closed
+
+
+def test_unconfirmed_messages_stay_queued():
+    client = FakePikaClient(batch_size=10)
+
+    async def run():
+        for i in range(3):
+            await client.queue_msg("downloads", "", create_msg(i))
+
+        exchange = await client.get_exchange("downloads")
+        exchange.nacked.add(bytes(create_msg(1).json(), "utf-8"))
+
+        with pytest.raises(PikaClientException):
+            await client.flush()
+
+        assert len(client.pending) == 1
+
+        exchange.nacked.clear()
+        assert await client.flush() == 1
+
+    asyncio.run(run())
+
+    channel = client.connections[0].channels[0]
+    assert len(channel.published) == 3
@@ -0,0 +1,101 @@
+from typing import Generator, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.lib.clients.demo_race_data import (
+    create_race_and_starter_details,
+    create_track_with_race_and_starter_details,
+)
+from app.models.bet import Bet
+from app.models.race import Race
+from app.models.race_entry import RaceEntry
+from app.raceday.bet_processor import RaceBetProcessor
+from app.raceday.race_canonical import LiveRaceExtendedCanonical
+
+
+@pytest.fixture
+def clean_db() -> Generator:
+    db: Session = SessionLocal()
+    db.query(Bet).delete()
+    db.query(RaceEntry).delete()
+    db.query(Race).delete()
+
+    yield db
+
+    db.close()
+
+
+def create_race_with_bets(db: Session) -> Race:
+    track_race = create_track_with_race_and_starter_details()
+    race_details = create_race_and_starter_details(1, current_race=True)
+    track_race.races = [race_details]
+    race = LiveRaceExtendedCanonical(track_race, race_details).convert()
+
+    for (i, entry) in enumerate(race.entries):
+        entry.predicted_odds = 2.0 + i
+
+    db.add(race)
+    db.commit()
+
+    RaceBetProcessor(db, race).create_bets()
+
+    return race
+
+
+def race_bet_hashes(db: Session, race: Race) -> List[str]:
+    return sorted(
+        bet_hash
+        for (bet_hash,) in db.query(Bet.bet_md5_hex).filter(Bet.race_id == race.id)
+    )
+
+
+def test_reconcile_unchanged_bets(clean_db: Session):
+    race = create_race_with_bets(clean_db)
+    hashes_before = race_bet_hashes(clean_db, race)
+
+    statements: List[str] = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    bet_proc = RaceBetProcessor(clean_db, race)
+    generated = bet_proc.regenerate_bets()
+
+    event.listen(clean_db.bind, "before_cursor_execute", count_statement)
+
+    try:
+        new_bets = bet_proc.reconcile_generated_bets_with_db(generated)
+    finally:
+        event.remove(clean_db.bind, "before_cursor_execute", count_statement)
+
+    clean_db.commit()
+
+    # One select, independent of the number of bets
+    assert len(statements) == 1
+    assert new_bets == []
+    assert race_bet_hashes(clean_db, race) == hashes_before
+
+
+def test_reconcile_updates_and_deletes(clean_db: Session):
+    race = create_race_with_bets(clean_db)
+    hashes_before = race_bet_hashes(clean_db, race)
+
+    clean_db.query(Bet).filter(Bet.race_id == race.id).update(
+        {Bet.avg_reward: -1.0}, synchronize_session=False
+    )
+    stale_bet = Bet(cost=1.0, bet_type="Win", bet_strategy_type="Stale", race=race)
+    clean_db.add(stale_bet)
+    clean_db.commit()
+
+    RaceBetProcessor(clean_db, race).create_bets()
+
+    assert race_bet_hashes(clean_db, race) == hashes_before
+    assert (
+        clean_db.query(Bet)
+        .filter(Bet.race_id == race.id, Bet.avg_reward == -1.0)
+        .count()
+        == 0
+    )
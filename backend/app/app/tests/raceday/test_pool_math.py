@@ -0,0 +1,83 @@
+import random
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from app.models.race import Race
+from app.models.race_entry import RaceEntry
+from app.raceday.bet_strategy.bet_strategies import (
+    calc_avg_place_reward,
+    calc_avg_show_reward,
+    calc_place_reward_redux,
+    calc_show_reward,
+)
+from app.raceday.bet_strategy.pool_math import (
+    avg_place_rewards,
+    avg_show_rewards,
+    entry_pools,
+)
+
+
+def create_race_with_pools(n: int) -> Race:
+    entries = [
+        RaceEntry(
+            program_no=str(i + 1),
+            place_pool_total=random.uniform(100, 20_000),
+            show_pool_total=random.uniform(100, 20_000),
+        )
+        for i in range(n)
+    ]
+
+    return Race(
+        entries=entries,
+        place_pool_total=sum(e.place_pool_total for e in entries) * 1.2,
+        show_pool_total=sum(e.show_pool_total for e in entries) * 1.2,
+    )
+
+
+@pytest.mark.parametrize("n", [3, 6, 14])
+def test_avg_place_reward_matches_permutations(n: int):
+    race = create_race_with_pools(n)
+    perms = list(permutations(race.entries, 2))
+    expected = sum(calc_place_reward_redux(race, s, o) for (s, o) in perms) / len(
+        perms
+    )
+
+    assert calc_avg_place_reward(race) == pytest.approx(expected)
+
+    per_entry = avg_place_rewards(
+        entry_pools(race.entries, "place"), race.place_pool_total
+    )
+
+    for (i, selection) in enumerate(race.entries):
+        others = [e for e in race.entries if e is not selection]
+        expected_i = np.mean(
+            [calc_place_reward_redux(race, selection, o) for o in others]
+        )
+
+        assert per_entry[i] == pytest.approx(expected_i)
+
+
+@pytest.mark.parametrize("n", [3, 6, 14])
+def test_avg_show_reward_matches_permutations(n: int):
+    race = create_race_with_pools(n)
+    perms = list(permutations(race.entries, 3))
+    expected = sum(calc_show_reward(race, *perm) for perm in perms) / len(perms)
+
+    assert calc_avg_show_reward(race) == pytest.approx(expected)
+
+    per_entry = avg_show_rewards(
+        entry_pools(race.entries, "show"), race.show_pool_total
+    )
+
+    for (i, selection) in enumerate(race.entries):
+        others = [e for e in race.entries if e is not selection]
+        expected_i = np.mean(
+            [
+                calc_show_reward(race, selection, o, t)
+                for (o, t) in permutations(others, 2)
+            ]
+        )
+
+        assert per_entry[i] == pytest.approx(expected_i)
@@ -1,6 +1,7 @@
 import itertools
 import random
-from datetime import timedelta
+import time
+from datetime import date, timedelta
 from typing import Callable, Generator, Iterable, List
 from unittest import mock
 
@@ -8,17 +9,23 @@ import pytest
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
+from app.lib.clients.demo_race_data import (
+    create_starters_n,
+    create_track_with_race_details,
+    create_track_with_race_details_n,
+)
+from app.lib.crawlers.live_racing import LiveRacingCrawlerException
 from app.lib.schemas.live_racing import TrackWithRaceDetails
 from app.models.bet import Bet
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
-from app.raceday.processor import DefaultNextCheckGen, RaceDayProcessor, RaceWatcher
-from app.raceday.race_canonical import LiveTrackBasicCanonical
-from app.tests.utils.race_data import (
-    create_starters_n,
-    create_track_with_race_details,
-    create_track_with_race_details_n,
+from app.raceday.processor import (
+    DefaultNextCheckGen,
+    FailedRaceEntryIngestException,
+    RaceDayProcessor,
+    RaceWatcher,
 )
+from app.raceday.race_canonical import LiveTrackBasicCanonical
 
 
 def flatmap(func: Callable, *iterable) -> Iterable:
@@ -241,3 +248,47 @@ def test_process_once(mock_lrc, clean_db: Session):
             for race in should_watch_races
         ]
     )
+
+
+@pytest.mark.parametrize("refresh_workers", [1, 2])
+@mock.patch("app.raceday.processor.RacePredictor")
+@mock.patch("app.raceday.processor.LiveRacingCrawler")
+def test_fetch_races_data_stops_when_not_resilient(
+    mock_lrc, mock_predictor, refresh_workers: int
+):
+    mock_lrc_inst = mock.MagicMock()
+    mock_lrc.return_value = mock_lrc_inst
+
+    def get_race_entries(track_code: str, race_number: int, race_type: str):
+        if race_number == 1:
+            raise LiveRacingCrawlerException
+
+        time.sleep(0.1)
+        return create_starters_n(6)
+
+    mock_lrc_inst.get_race_entries.side_effect = get_race_entries
+
+    races = [
+        Race(
+            track_code="KEE",
+            race_number=race_number,
+            race_date=date.today(),
+            race_type="Thoroughbred",
+            current_race=False,
+        )
+        for race_number in range(1, 7)
+    ]
+    rdproc = RaceDayProcessor(
+        mock.MagicMock(), resilient=False, refresh_workers=refresh_workers
+    )
+
+    with pytest.raises(FailedRaceEntryIngestException):
+        rdproc._fetch_races_data(races)
+
+    # Fetches that hadn't started when the first one failed are cancelled
+    assert mock_lrc_inst.get_race_entries.call_count < len(races)
+
+    rdproc.resilient = True
+    results = rdproc._fetch_races_data(races)
+
+    assert [result.entries is None for result in results] == [True] + [False] * 5
@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.raceday.race_scheduler import RaceWatcher, RaceWatcherScheduler
+
+
+def create_watcher(race_id: int, nct: datetime) -> RaceWatcher:
+    return RaceWatcher(
+        race_id=race_id,
+        race_md5=str(race_id),
+        post_time=nct + timedelta(minutes=10),
+        next_check_time=nct,
+    )
+
+
+def test_scheduler_orders_by_next_check_time() -> None:
+    now = datetime.now(timezone.utc)
+    scheduler = RaceWatcherScheduler()
+    offsets = list(range(-50, 50))
+    random.shuffle(offsets)
+
+    for offset in offsets:
+        nct = now + timedelta(minutes=offset)
+        scheduler.push(offset, create_watcher(offset, nct))
+
+    assert len(scheduler) == 100
+    assert scheduler.peek_next_check_time() == now - timedelta(minutes=50)
+
+    due = scheduler.due(now)
+
+    assert [w.race_id for w in due] == list(range(-50, 1))
+    # due() does not remove watchers
+    assert len(scheduler) == 100
+
+    for watcher in due:
+        del scheduler[watcher.race_id]
+
+    assert len(scheduler) == 49
+    assert scheduler.peek_next_check_time() == now + timedelta(minutes=1)
+
+
+def test_scheduler_update_and_remove() -> None:
+    now = datetime.now(timezone.utc)
+    scheduler = RaceWatcherScheduler()
+
+    for i in range(10):
+        scheduler[i] = create_watcher(i, now + timedelta(minutes=i))
+
+    # Push the soonest watcher to the back of the queue
+    scheduler[0] = create_watcher(0, now + timedelta(minutes=30))
+    del scheduler[1]
+
+    assert 1 not in scheduler
+    assert scheduler.get(1) is None
+    assert scheduler[0].next_check_time == now + timedelta(minutes=30)
+    assert scheduler.peek_next_check_time() == now + timedelta(minutes=2)
+
+    due = scheduler.due(now + timedelta(minutes=60))
+
+    assert [w.race_id for w in due] == list(range(2, 10)) + [0]
+
+
+def test_scheduler_compacts_removed_entries() -> None:
+    now = datetime.now(timezone.utc)
+    scheduler = RaceWatcherScheduler()
+
+    for _ in range(10):
+        for i in range(100):
+            scheduler.push(i, create_watcher(i, now + timedelta(seconds=i)))
+
+    assert len(scheduler) == 100
+    assert len(scheduler._heap) <= 2 * len(scheduler) + 32
+    assert len(scheduler.due(now + timedelta(seconds=49))) == 50
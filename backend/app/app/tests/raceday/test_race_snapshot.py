@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.models.race import Race
+from app.models.race_entry import RaceEntry
+from app.raceday.bet_strategy.dr_z_eq import (
+    get_expected_place_val_per_dollar,
+    get_expected_show_val_per_dollar,
+)
+from app.raceday.bet_strategy.race_snapshot import RaceSnapshot
+
+
+def create_race() -> Race:
+    entries = [
+        RaceEntry(
+            program_no=str(i + 1),
+            scratched=(i == 2),
+            live_odds=float(i + 2),
+            predicted_odds=float(i + 3) if i != 1 else None,
+            win_pool_total=1000.0 * (i + 1),
+            place_pool_total=400.0 * (i + 1),
+            show_pool_total=200.0 * (i + 1),
+        )
+        for i in range(6)
+    ]
+
+    return Race(
+        entries=entries,
+        win_pool_total=30_000.0,
+        place_pool_total=10_000.0,
+        show_pool_total=5_000.0,
+    )
+
+
+def test_snapshot_arrays():
+    race = create_race()
+    snapshot = RaceSnapshot.from_race(race)
+
+    assert snapshot.entries == tuple(race.entries)
+    assert list(snapshot.active) == [0, 1, 3, 4, 5]
+    assert list(snapshot.odds) == [2, 3, 4, 5, 6, 7]
+    # Missing predicted odds are 0
+    assert snapshot.predicted_odds[1] == 0
+
+    with pytest.raises(ValueError):
+        snapshot.place_pools[0] = 1
+
+    with pytest.raises(AttributeError):
+        snapshot.odds = np.zeros(6)
+
+
+def test_snapshot_dr_z_evs():
+    race = create_race()
+    snapshot = RaceSnapshot.from_race(race)
+
+    for (i, entry) in enumerate(race.entries):
+        assert snapshot.place_evs[i] == pytest.approx(
+            get_expected_place_val_per_dollar(race, entry)
+        )
+        assert snapshot.show_evs[i] == pytest.approx(
+            get_expected_show_val_per_dollar(race, entry)
+        )
+
+
+def test_snapshot_without_pool_totals():
+    race = create_race()
+    race.win_pool_total = None
+
+    for entry in race.entries:
+        entry.place_pool_total = 0
+
+    snapshot = RaceSnapshot.from_race(race)
+
+    assert np.isnan(snapshot.place_evs).all()
+    assert np.isnan(snapshot.show_evs).all()
@@ -1,5 +1,9 @@
 from sqlalchemy.orm import Session
 
+from app.lib.clients.demo_race_data import (
+    create_race_and_starter_details,
+    create_track_with_race_and_starter_details,
+)
 from app.models.race_entry import RaceEntry
 from app.raceday.bet_strategy.bet_strategies import (
     AvgCostRewardSortStrategy,
@@ -10,11 +14,8 @@ from app.raceday.bet_strategy.bet_strategies import (
     DrZShowBet,
     FlatBetOutlayStrategy,
 )
+from app.raceday.bet_strategy.race_snapshot import RaceSnapshot
 from app.raceday.race_canonical import LiveRaceExtendedCanonical
-from app.tests.utils.race_data import (
-    create_race_and_starter_details,
-    create_track_with_race_and_starter_details,
-)
 
 
 def setup_good_dr_z_entry():
@@ -67,10 +68,13 @@ def test_dr_z_place_show_arb(db: Session):
         sort_strategy=AvgCostRewardSortStrategy(),
     )
 
+    snapshot = RaceSnapshot.from_race(race_canon)
+    all_entries = list(range(len(snapshot.entries)))
+
     bet = DrZPlaceShowArbBet(
-        race=race_canon,
-        entries=race_canon.entries,
-        selection=race_canon.entries,
+        snapshot=snapshot,
+        entries=all_entries,
+        selection=all_entries,
         strategy=DefaultBetStrategy,
     )
 
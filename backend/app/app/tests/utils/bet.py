@@ -0,0 +1,53 @@
+from typing import List
+
+from app.models.bet import Bet
+from app.models.bet_tag import BetTag
+from app.models.race import Race
+from app.raceday.bet_strategy.bet_strategies import BetStrategyType, BetType
+
+BET_STRAT_TYPES = [BetStrategyType.BOOK_ALL_WIN_ARB, BetStrategyType.BOOK_BOX_WIN_ARB]
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args) -> None:
+        self.count += 1
+
+
+def create_bet(n: int, race: Race = None) -> Bet:
+    bet = Bet(
+        title=f"bet {n}",
+        description="",
+        predicted_odds=0.8,
+        min_reward=1.0,
+        max_reward=10.0,
+        avg_reward=5.0,
+        cost=float(n),
+        bet_type=str(BetType.WIN_BET),
+        bet_strategy_type=str(BET_STRAT_TYPES[n % len(BET_STRAT_TYPES)]),
+    )
+
+    if race:
+        bet.race = race
+        bet.active_entries = race.entries[0 : 1 + n % 3]
+        bet.inactive_entries = race.entries[1 + n % 3 :]
+
+    return bet
+
+
+def create_bets(races: List[Race], tags: List[BetTag]) -> List[Bet]:
+    bets = []
+
+    for n in range(60):
+        if n % 5 == 0:
+            bet = create_bet(n)
+            bet.sub_bets = [create_bet(1000 + n * 10 + i, races[i]) for i in range(2)]
+        else:
+            bet = create_bet(n, races[n % len(races)])
+
+        bet.tags = tags[: n % 3]
+        bets.append(bet)
+
+    return bets
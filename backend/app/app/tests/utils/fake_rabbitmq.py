@@ -0,0 +1,64 @@
+import asyncio
+from typing import List, Set, Tuple
+
+from app.rabbitmq.pika_client import PikaClient
+
+
+class FakeExchange:
+    def __init__(self, name: str, published: List[Tuple[str, bytes]]) -> None:
+        self.name = name
+        self.published = published
+        self.nacked: Set[bytes] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def publish(self, message, routing_key: str) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            # Wait for the broker's confirm
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+
+        if message.body in self.nacked:
+            raise RuntimeError("nacked")
+
+        self.published.append((self.name, message.body))
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.is_closed = False
+        self.published: List[Tuple[str, bytes]] = []
+        self.exchanges: List[FakeExchange] = []
+
+    async def declare_exchange(self, name: str, type) -> FakeExchange:
+        exchange = FakeExchange(name, self.published)
+        self.exchanges.append(exchange)
+        return exchange
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.is_closed = False
+        self.channels: List[FakeChannel] = []
+
+    async def channel(self, publisher_confirms: bool = True) -> FakeChannel:
+        assert publisher_confirms
+        self.channels.append(FakeChannel())
+        return self.channels[-1]
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class FakePikaClient(PikaClient):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.connections: List[FakeConnection] = []
+
+    async def get_connection(self) -> FakeConnection:
+        self.connections.append(FakeConnection())
+        return self.connections[-1]
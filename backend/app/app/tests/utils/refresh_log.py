@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.models.raceday_refresh_log import RaceDayRefreshLog
+
+
+def add_refresh_log(db: Session, next_check_time: datetime) -> None:
+    db.add(
+        RaceDayRefreshLog(
+            lookahead_start=next_check_time,
+            lookahead_end=next_check_time,
+            next_check_time=next_check_time,
+            race_count=0,
+            entry_count=0,
+            bet_count=0,
+            success=True,
+        )
+    )
+    db.commit()
@@ -1,15 +1,12 @@
-import random
-import string
-from datetime import datetime, timedelta
 from typing import Dict
 
 from fastapi.testclient import TestClient
 
 from app.core.config import settings
-
-
-def random_lower_string(length: int = 32) -> str:
-    return "".join(random.choices(string.ascii_lowercase, k=length))
+from app.lib.clients.demo_race_data import (  # noqa: F401
+    random_datetime_in_range,
+    random_lower_string,
+)
 
 
 def random_email() -> str:
@@ -26,28 +23,3 @@ def get_superuser_token_headers(client: TestClient) -> Dict[str, str]:
     a_token = tokens["access_token"]
     headers = {"Authorization": f"Bearer {a_token}"}
     return headers
-
-
-def random_datetime_in_range(
-    start: datetime, end: datetime, precision_modifier: str = "hours"
-) -> datetime:
-    delta = end - start
-
-    if precision_modifier == "days":
-        int_delta = delta.days
-    elif precision_modifier == "hours":
-        int_delta = delta.seconds / 60 / 60
-    elif precision_modifier == "minutes":
-        int_delta = delta.seconds / 60
-    elif precision_modifier == "seconds":
-        int_delta = delta.total_seconds()
-    else:
-        raise ValueError(
-            "Invalid precision_modifier provided (%s)." % precision_modifier
-        )
-
-    if int_delta < 1:
-        return start
-
-    random_val = random.randrange(int(int_delta))
-    return start + timedelta(**{precision_modifier: random_val})
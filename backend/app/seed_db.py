@@ -3,7 +3,7 @@ from app.db.session import SessionLocal
 from app.models.bet import Bet
 from app.models.race import Race
 from app.models.race_entry import RaceEntry
-from app.tests.utils.race_data import create_race_pool_totals, create_track_with_race_and_starter_details_n
+from app.lib.clients.demo_race_data import create_race_pool_totals, create_track_with_race_and_starter_details_n
 from app.raceday.race_canonical import LiveTrackExtendedCanonical
 from app.raceday.bet_strategy.generator import BetGen
 from app.raceday.bet_strategy.bet_tagger import BetTagger
@@ -50,18 +50,42 @@ export function narrowBetType(bet: MultiBet | SingleBet, type: string) {
   return converter();
 }
 
+export interface BetFacetCounts {
+  track_codes: Record<string, number>;
+  bet_types: Record<string, number>;
+  bet_strat_types: Record<string, number>;
+}
+
 export interface BetsListResponse {
   single_bets: SingleBet[];
   multi_bets: MultiBet[];
   skip: number;
   limit: number;
+  next_cursor: string | null;
   track_codes: string[];
   bet_types: string[];
   bet_strat_types: BetStratType[];
   all_track_codes: string[];
   all_bet_strat_types: BetStratType[];
   all_bet_types: string[];
+  facet_counts: BetFacetCounts | null;
+  next_refresh_ts: number;
+  feed_version: number | null;
+}
+
+export interface BetFeedItem {
+  data: MultiBet | SingleBet;
+  result_type: string;
+}
+
+// Data of the `bets` events of /bets/stream
+export interface BetFeedDelta {
+  version: number;
+  previous_version: number;
   next_refresh_ts: number;
+  added: BetFeedItem[];
+  updated: BetFeedItem[];
+  removed: number[];
 }
 
 export interface BetViewResponse {